@@ -0,0 +1,215 @@
+"""
+Нагрузочный тест чтения постов, комментариев и групп в режимах
+WSGI и ASGI с искусственной задержкой каждого запроса к базе.
+
+WSGI: пул из --threads потоков, как у многопоточного WSGI сервера,
+клиенты ждут свободный поток. ASGI: один событийный цикл
+и api.asgi.AsyncApiApplication с пулом чтения того же размера
+и очередью --max-pending; лишние запросы сразу получают 503
+(столбец errors, клиенты сразу повторяют запрос).
+Сервер в замер не входит, приложения вызываются в процессе.
+Запросы по умолчанию идут с токеном и не попадают в кеш ответов
+анонимных запросов, иначе база почти не читается (--anonymous).
+
+Запуск из корня репозитория:
+    python -m benchmarks.asgi --clients 64 --threads 8 --db-latency 5
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from .utils import setup_django
+
+
+def seed(posts, comments_per_post):
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Group, Post
+
+    author = get_user_model().objects.create_user(username='bench')
+    group = Group.objects.create(title='Группа', slug='bench')
+    # bulk_create в SQLite не возвращает первичные ключи
+    created = [
+        Post.objects.create(text=f'Пост {number}', author=author, group=group)
+        for number in range(posts)
+    ]
+    Comment.objects.bulk_create(
+        Comment(text='Коммент', author=author, post=post)
+        for post in created for _ in range(comments_per_post)
+    )
+    return [post.pk for post in created], group.pk, author
+
+
+def add_db_latency(seconds):
+    """Задержка перед каждым запросом к базе во всех потоках."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        connection.execute_wrappers.append(wrapper)
+
+
+def make_paths(post_ids, group_id):
+    paths = [
+        '/api/v1/posts/', '/api/v1/groups/', f'/api/v1/groups/{group_id}/'
+    ]
+    for pk in post_ids[:10]:
+        paths += [f'/api/v1/posts/{pk}/', f'/api/v1/posts/{pk}/comments/']
+    return paths
+
+
+def make_scope(path, headers):
+    return {
+        'type': 'http', 'method': 'GET', 'path': path, 'root_path': '',
+        'query_string': b'', 'http_version': '1.1',
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+
+
+def run_wsgi(paths, headers, clients, threads, total):
+    """Время каждого запроса, статусы и общее время в режиме WSGI."""
+    from django.core.wsgi import get_wsgi_application
+
+    from api.asgi import build_environ
+
+    application = get_wsgi_application()
+
+    def handle(path):
+        statuses = []
+        environ = build_environ(make_scope(path, headers), BytesIO())
+        result = application(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        try:
+            b''.join(result)
+        finally:
+            result.close()
+        return int(statuses[0].split(' ', 1)[0])
+
+    latencies, codes = [], []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client(pool):
+        for number in counter:
+            start = time.perf_counter()
+            code = pool.submit(handle, paths[number % len(paths)]).result()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                codes.append(code)
+
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        workers = [threading.Thread(target=client, args=(pool,))
+                   for _ in range(clients)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+    return latencies, codes, elapsed
+
+
+def run_asgi(paths, headers, clients, threads, max_pending, total):
+    """Время каждого запроса, статусы и общее время в режиме ASGI."""
+    from api.asgi import AsyncApiApplication
+
+    application = AsyncApiApplication(
+        read_threads=threads, max_pending=max_pending
+    )
+    latencies, codes = [], []
+    counter = iter(range(total))
+
+    async def handle(path):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        await application(make_scope(path, headers), receive, send)
+        return messages[0]['status']
+
+    async def client():
+        for number in counter:
+            start = time.perf_counter()
+            code = await handle(paths[number % len(paths)])
+            latencies.append(time.perf_counter() - start)
+            codes.append(code)
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    application.read_bridge.shutdown()
+    application.bridge.shutdown()
+    return latencies, codes, elapsed
+
+
+def report(mode, latencies, codes, elapsed):
+    ok = sorted(latency for latency, code in zip(latencies, codes)
+                if code == 200)
+    if not ok:
+        print(f'{mode:>5}: нет успешных ответов')
+        return
+    p99 = ok[min(len(ok) - 1, int(len(ok) * 0.99))]
+    print(f'{mode:>5} {len(ok) / elapsed:>9.1f} '
+          f'{statistics.median(ok) * 1000:>9.1f} {p99 * 1000:>9.1f} '
+          f'{len(codes) - len(ok):>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--max-pending', type=int, default=256)
+    parser.add_argument('--db-latency', type=float, default=5,
+                        help='задержка запроса к базе, мс')
+    parser.add_argument('--anonymous', action='store_true',
+                        help='запросы без токена, через кеш ответов')
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from api.authentication import get_token
+
+        post_ids, group_id, author = seed(args.posts, args.comments)
+        paths = make_paths(post_ids, group_id)
+        headers = []
+        if not args.anonymous:
+            access = get_token(author).access_token
+            headers.append((b'authorization', f'Bearer {access}'.encode()))
+        add_db_latency(args.db_latency / 1000)
+        print(f'{"mode":>5} {"req/s":>9} {"p50, ms":>9} '
+              f'{"p99, ms":>9} {"errors":>8}')
+        report('wsgi', *run_wsgi(
+            paths, headers, args.clients, args.threads, args.requests
+        ))
+        report('asgi', *run_asgi(
+            paths, headers, args.clients, args.threads, args.max_pending,
+            args.requests
+        ))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Пропускная способность создания постов и комментариев:
+по одному запросу на объект и массовыми запросами `bulk/`.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bulk --items 2000
+"""
+import argparse
+import time
+
+from .utils import setup_django
+
+
+def make_client():
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    user = get_user_model().objects.create_user(username='bench')
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}'
+    )
+    return client
+
+
+def rate(func, items):
+    start = time.perf_counter()
+    func()
+    return items / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=2000)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from posts.models import Post
+
+        client = make_client()
+        items = [{'text': f'Пост номер {number}'}
+                 for number in range(args.items)]
+        post = Post.objects.create(text='Пост', author_id=1)
+        comments_url = f'/api/v1/posts/{post.id}/comments/'
+
+        def single(url):
+            for item in items:
+                client.post(url, data=item, format='json')
+
+        def bulk(url):
+            client.post(f'{url}bulk/', data=items, format='json')
+
+        print(f'{"":>10} {"single, obj/s":>14} {"bulk, obj/s":>14}')
+        for name, url in (('posts', '/api/v1/posts/'),
+                          ('comments', comments_url)):
+            single_rate = rate(lambda: single(url), args.items)
+            bulk_rate = rate(lambda: bulk(url), args.items)
+            print(f'{name:>10} {single_rate:>14.0f} {bulk_rate:>14.0f}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
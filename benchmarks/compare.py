@@ -0,0 +1,107 @@
+"""
+Сравнение двух прогонов benchmarks.suite.
+
+Регрессия маршрута — рост p95 больше чем на --threshold (по умолчанию
+20%, задержки между запусками шумят) и больше чем на --min-ms
+(по умолчанию 1 мс, для быстрых маршрутов), рост числа SQL запросов,
+новые ошибки или маршрут, пропавший из прогона. Задержки сравнимы
+только между прогонами на одной машине с одним набором данных;
+число запросов от машины не зависит.
+
+Запуск из корня репозитория, код выхода 1 при регрессии:
+    python -m benchmarks.compare benchmarks/baselines/small.json out.json
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as report:
+        return json.load(report)
+
+
+def change(old, new):
+    if not old:
+        return None
+    return (new - old) / old
+
+
+def compare_route(old, new, threshold, min_ms):
+    """Список описаний регрессий маршрута."""
+    problems = []
+    growth = change(old['p95_ms'], new['p95_ms'])
+    if (growth is not None and growth > threshold
+            and new['p95_ms'] - old['p95_ms'] > min_ms):
+        problems.append(f'p95 +{growth:.0%}')
+    if (old['queries'] is not None and new['queries'] is not None
+            and new['queries'] > old['queries']):
+        problems.append(f'SQL {old["queries"]} -> {new["queries"]}')
+    if new['errors'] > old['errors']:
+        problems.append(f'ошибок {old["errors"]} -> {new["errors"]}')
+    return problems
+
+
+def format_change(old, new):
+    growth = change(old, new)
+    return '-' if growth is None else f'{growth:+.0%}'
+
+
+def compare(baseline, current, threshold, min_ms):
+    """Печатает таблицу сравнения, возвращает число регрессий."""
+    if baseline['meta']['dataset'] != current['meta']['dataset']:
+        print('внимание: прогоны на разных наборах данных')
+    if baseline['meta']['mode'] != current['meta']['mode']:
+        print('внимание: прогоны в разных режимах')
+
+    print(f'{"маршрут":<22} {"p95, ms":>17} {"":>5} {"req/s":>15} '
+          f'{"SQL":>7}')
+    regressions = 0
+    for name, old in baseline['routes'].items():
+        new = current['routes'].get(name)
+        if new is None:
+            print(f'{name:<22} нет в прогоне')
+            regressions += 1
+            continue
+        problems = compare_route(old, new, threshold, min_ms)
+        regressions += bool(problems)
+        print(
+            f'{name:<22} {old["p95_ms"]:>8} {new["p95_ms"]:>8} '
+            f'{format_change(old["p95_ms"], new["p95_ms"]):>5} '
+            f'{old["rps"]:>7} {new["rps"]:>7} '
+            f'{old["queries"] if old["queries"] is not None else "-":>3} '
+            f'{new["queries"] if new["queries"] is not None else "-":>3}'
+            + (f'  РЕГРЕССИЯ: {", ".join(problems)}' if problems else '')
+        )
+    for name in current['routes'].keys() - baseline['routes'].keys():
+        print(f'{name:<22} новый маршрут')
+
+    old_rss = baseline.get('peak_rss_mb')
+    new_rss = current.get('peak_rss_mb')
+    if old_rss and new_rss:
+        print(f'\nпиковый RSS {old_rss} -> {new_rss} МБ '
+              f'({format_change(old_rss, new_rss)})')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='допустимый рост p95, доля')
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='рост p95 меньше этого не считается регрессией')
+    args = parser.parse_args()
+
+    regressions = compare(load(args.baseline), load(args.current),
+                          args.threshold, args.min_ms)
+    if regressions:
+        print(f'\nрегрессий: {regressions}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Детерминированный набор данных для нагрузочных тестов.
+
+Имена и тексты — как в tests/fixtures (TestUser<N> с паролем 1234567,
+«Группа N» / group_N, «Тестовый пост N», «Коммент N»), первичные ключи
+задаются явно и совпадают при одинаковых seed и размерах, поэтому
+драйвер в режиме реального сервера знает id без запросов к базе.
+
+Распределения с перекосом, как в живой соцсети: число постов
+автора и комментариев поста — по закону Ципфа, подписки —
+с предпочтением популярных авторов, поэтому у нескольких авторов
+подписчиков больше FEED_FANOUT_LIMIT и их посты попадают в ленты
+при чтении (см. posts.timeline).
+
+Счетчики, ленты, сводки групп и поисковый индекс заполняются
+после вставки целиком, как это сделали бы сигналы и posts.bulk.
+"""
+import random
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+
+BATCH = 5000
+PASSWORD = '1234567'
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class DatasetSize:
+    users: int = 300
+    groups: int = 10
+    posts: int = 3000
+    comments: int = 15000
+    follows_per_user: int = 30
+    skew: float = 1.1
+    seed: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+SIZES = {
+    'small': DatasetSize(),
+    'medium': DatasetSize(users=3000, groups=50, posts=100000,
+                          comments=500000, follows_per_user=100),
+}
+
+
+def zipf_weights(count, skew):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def username(number):
+    return f'TestUser{number}'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Отключает auto_now_add у полей, иначе bulk_create заменяет
+    заданные даты текущим временем.
+    """
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def create_users(size):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    User = get_user_model()
+    # хеш пароля считается один раз, иначе создание пользователей
+    # занимает больше времени, чем все остальное
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [User(id=number, username=username(number), password=password,
+              date_joined=START)
+         for number in range(1, size.users + 1)]
+    )
+    # первый пользователь — администратор для выгрузки и статистики кеша
+    User.objects.filter(pk=1).update(is_staff=True, is_superuser=True)
+
+
+def create_groups(size):
+    from posts.models import Group
+
+    Group.objects.bulk_create(
+        Group(id=number, title=f'Группа {number}', slug=f'group_{number}',
+              description=f'Описание группы {number}')
+        for number in range(1, size.groups + 1)
+    )
+
+
+def create_posts(size, rng):
+    from posts.models import Post, make_preview
+
+    authors = rng.choices(
+        range(1, size.users + 1),
+        weights=zipf_weights(size.users, size.skew), k=size.posts
+    )
+    groups = [None, *range(1, size.groups + 1)]
+    for first in range(1, size.posts + 1, BATCH):
+        posts = []
+        for number in range(first, min(first + BATCH, size.posts + 1)):
+            text = f'Тестовый пост {number} ' + ' '.join(
+                rng.choices(('утро', 'кофе', 'код', 'город', 'кот'), k=20)
+            )
+            posts.append(Post(
+                id=number, text=text, preview=make_preview(text),
+                pub_date=START + timedelta(minutes=number),
+                author_id=authors[number - 1], group_id=rng.choice(groups)
+            ))
+        Post.objects.bulk_create(posts)
+
+
+def create_comments(size, rng):
+    from posts.models import Comment, make_comment_path
+
+    post_ids = rng.choices(
+        range(1, size.posts + 1),
+        weights=zipf_weights(size.posts, size.skew), k=size.comments
+    )
+    for first in range(1, size.comments + 1, BATCH):
+        Comment.objects.bulk_create(
+            # комментарии верхнего уровня, путь в дереве — свой id
+            Comment(id=number, text=f'Коммент {number}',
+                    path=make_comment_path('', number),
+                    post_id=post_ids[number - 1],
+                    author_id=rng.randint(1, size.users),
+                    created=START + timedelta(minutes=size.posts + number))
+            for number in range(first, min(first + BATCH, size.comments + 1))
+        )
+
+
+def create_follows(size, rng):
+    from posts.models import Follow
+
+    weights = zipf_weights(size.users, size.skew)
+    authors = range(1, size.users + 1)
+    pairs = []
+    for user in authors:
+        following = set(rng.choices(
+            authors, weights=weights, k=size.follows_per_user
+        ))
+        following.discard(user)
+        pairs.extend((user, author) for author in sorted(following))
+    Follow.objects.bulk_create(
+        [Follow(id=number, user_id=user, following_id=author)
+         for number, (user, author) in enumerate(pairs, start=1)]
+    )
+
+
+def fill_derived():
+    """
+    Счетчики комментариев, ленты, сводки групп и подписок,
+    поисковый индекс.
+    """
+    from django.conf import settings
+    from django.db import connection
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    from posts import follow_graph, search, summaries
+    from posts.models import Comment, Follow, Post, TimelineEntry
+
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('id')).values('total')
+    Post.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+    # fan-out-on-write для авторов, у которых подписчиков не больше лимита
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.following_id '
+            f'WHERE f.following_id IN ('
+            f'SELECT following_id FROM {Follow._meta.db_table} '
+            f'GROUP BY following_id HAVING COUNT(*) <= %s)',
+            [settings.FEED_FANOUT_LIMIT]
+        )
+
+    summaries.rebuild()
+    follow_graph.rebuild()
+    for model in search.SEARCH_FIELDS:
+        search.get_index(model).rebuild()
+
+
+def generate(size):
+    """Заполняет пустую базу набором данных размера size."""
+    from django.db import transaction
+    from posts.models import Comment, Post
+
+    rng = random.Random(size.seed)
+    with transaction.atomic(), explicit_dates(
+        Post._meta.get_field('pub_date'), Comment._meta.get_field('created')
+    ):
+        create_users(size)
+        create_groups(size)
+        create_posts(size, rng)
+        create_comments(size, rng)
+        create_follows(size, rng)
+        fill_derived()
@@ -0,0 +1,175 @@
+"""
+Загрузка картинок постов и построение уменьшенных копий.
+
+1. Процессорное время на одну картинку: копии из полного
+   декодирования оригинала против posts.images.generate
+   (уменьшенное декодирование JPEG и каскадное уменьшение).
+2. Загрузка через API: копии в запросе (POST_IMAGE_WORKERS = 0)
+   против пула потоков — загрузок в секунду и время до готовности
+   всех копий.
+3. Пик памяти Python при разборе загрузки: буфер в памяти
+   (обработчики Django по умолчанию) против записи во временный
+   файл блоками (FILE_UPLOAD_HANDLERS проекта).
+
+Запуск из корня репозитория:
+    python -m benchmarks.images --images 20 --width 4000 --height 3000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from .utils import setup_django
+
+MEMORY_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+
+def make_jpeg(width, height):
+    """Фото-подобная картинка: градиент с шумом, плохо сжимается."""
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(90)))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def naive_derivatives(content, widths):
+    from PIL import Image
+
+    with Image.open(BytesIO(content)) as image:
+        image = image.convert('RGB')
+        for width in widths:
+            height = round(image.height * width / image.width)
+            image.resize((width, height), Image.LANCZOS).save(
+                BytesIO(), 'JPEG', quality=80
+            )
+
+
+def cpu_per_image(content, repeat):
+    from django.conf import settings
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from posts.images import generate
+
+    name = default_storage.save('posts/bench.jpg', ContentFile(content))
+    results = {}
+    for title, func in (
+        ('полное декодирование', lambda: naive_derivatives(
+            content, settings.POST_IMAGE_WIDTHS
+        )),
+        ('posts.images', lambda: generate(name)),
+    ):
+        start = time.process_time()
+        for _ in range(repeat):
+            func()
+        results[title] = (time.process_time() - start) / repeat
+    return results
+
+
+def upload(client, content, count):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    for number in range(count):
+        response = client.post('/api/v1/posts/', data={
+            'text': f'Пост {number}',
+            'image': SimpleUploadedFile(
+                f'photo{number}.jpg', content, content_type='image/jpeg'
+            ),
+        }, format='multipart')
+        assert response.status_code == 201, response.content
+
+
+def wait_for_derivatives():
+    from posts.models import Post
+
+    while Post.objects.filter(image_widths='').exists():
+        time.sleep(0.01)
+
+
+def upload_throughput(client, content, count, workers):
+    from django.test.utils import override_settings
+    from posts import images
+    from posts.models import Post
+
+    Post.objects.all().delete()
+    with override_settings(POST_IMAGE_WORKERS=workers):
+        images._executor = None
+        start = time.perf_counter()
+        upload(client, content, count)
+        uploaded = time.perf_counter() - start
+        wait_for_derivatives()
+        ready = time.perf_counter() - start
+    return count / uploaded, ready
+
+
+def upload_peak_memory(client, content, handlers):
+    from django.test.utils import override_settings
+
+    with override_settings(FILE_UPLOAD_HANDLERS=handlers,
+                           POST_IMAGE_WORKERS=0):
+        tracemalloc.start()
+        upload(client, content, 1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.test.utils import override_settings
+        from rest_framework.test import APIClient
+
+        content = make_jpeg(args.width, args.height)
+        print(f'картинка {args.width}x{args.height}, '
+              f'{len(content) / 1024 / 1024:.1f} МБ, '
+              f'копии {settings.POST_IMAGE_WIDTHS}')
+        user = get_user_model().objects.create_user(username='bench')
+        client = APIClient()
+        client.force_authenticate(user)
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            print('\nпроцессорное время на картинку')
+            for title, seconds in cpu_per_image(
+                content, args.repeat
+            ).items():
+                print(f'{title:>22} {seconds * 1000:>9.1f} ms')
+
+            print(f'\n{"режим":>22} {"загрузок/с":>11} {"копии, с":>9}')
+            for title, workers in (('в запросе', 0),
+                                   (f'пул {args.workers}', args.workers)):
+                rate, ready = upload_throughput(
+                    client, content, args.images, workers
+                )
+                print(f'{title:>22} {rate:>11.1f} {ready:>9.2f}')
+
+            print('\nпик памяти при загрузке')
+            for title, handlers in (
+                ('буфер в памяти', MEMORY_HANDLERS),
+                ('временный файл', settings.FILE_UPLOAD_HANDLERS),
+            ):
+                peak = upload_peak_memory(client, content, handlers)
+                print(f'{title:>22} {peak / 1024 / 1024:>9.1f} МБ')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
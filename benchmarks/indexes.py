@@ -0,0 +1,157 @@
+"""
+Планы и время запросов постов, комментариев и подписок
+без составных индексов и с ними.
+
+База наполняется напрямую через executemany, минуя ORM,
+чтобы миллион строк создавался за секунды. Сначала индексы
+из Meta.indexes удаляются и замеряются запросы, затем индексы
+создаются заново и замеры повторяются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.indexes --posts 1000000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from .utils import best_of, setup_django
+
+BATCH = 50000
+
+
+def seed(posts, comments, authors, groups, follows):
+    from django.db import connection, transaction
+    from posts.models import make_comment_path
+
+    random.seed(0)
+    start = datetime(2020, 1, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (id, username, password, first_name, '
+            'last_name, email, is_superuser, is_staff, is_active, '
+            'date_joined) VALUES (%s, %s, \'\', \'\', \'\', \'\', '
+            '0, 0, 1, %s)',
+            [(number, f'user{number}', start)
+             for number in range(1, authors + 1)]
+        )
+        cursor.executemany(
+            'INSERT INTO posts_group (id, title, slug, description) '
+            'VALUES (%s, %s, %s, \'\')',
+            [(number, f'Группа {number}', f'group-{number}')
+             for number in range(1, groups + 1)]
+        )
+        for first in range(1, posts + 1, BATCH):
+            cursor.executemany(
+                'INSERT INTO posts_post (id, text, preview, pub_date, '
+                'author_id, group_id, comment_count, version, '
+                'image_widths) VALUES (%s, %s, %s, %s, %s, %s, 0, 1, \'\')',
+                [(number, f'Пост {number}', f'Пост {number}',
+                  start + timedelta(seconds=number),
+                  random.randint(1, authors),
+                  random.choice((None, random.randint(1, groups))))
+                 for number in range(first, min(first + BATCH, posts + 1))]
+            )
+        for first in range(1, comments + 1, BATCH):
+            cursor.executemany(
+                'INSERT INTO posts_comment (id, text, created, author_id, '
+                'post_id, path, depth, reply_count) '
+                'VALUES (%s, \'Коммент\', %s, %s, %s, %s, 0, 0)',
+                [(number, start + timedelta(seconds=posts + number),
+                  random.randint(1, authors), random.randint(1, posts),
+                  make_comment_path('', number))
+                 for number in range(first, min(first + BATCH, comments + 1))]
+            )
+        pairs = set()
+        while len(pairs) < follows:
+            user, following = random.sample(range(1, authors + 1), 2)
+            pairs.add((user, following))
+        cursor.executemany(
+            'INSERT INTO posts_follow (user_id, following_id) '
+            'VALUES (%s, %s)', sorted(pairs)
+        )
+
+
+def make_queries(page_size):
+    from posts.models import Comment, Follow, Post
+
+    newest = ('-pub_date', '-id')
+    return {
+        'posts, new first': Post.objects.order_by(*newest)[:page_size],
+        'posts, default': Post.objects.all()[:page_size],
+        'posts of author': (
+            Post.objects.filter(author_id=1).order_by(*newest)[:page_size]
+        ),
+        'posts of group': (
+            Post.objects.filter(group_id=1).order_by(*newest)[:page_size]
+        ),
+        'post comments': Comment.objects.filter(post_id=1)[:page_size],
+        'followers': Follow.objects.filter(following_id=1).values('user_id'),
+        'following': Follow.objects.filter(user_id=1).values('following_id'),
+    }
+
+
+def explain(queryset):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def measure(title, page_size):
+    print(f'\n{title}')
+    for name, queryset in make_queries(page_size).items():
+        elapsed = best_of(lambda: list(queryset.all()))
+        print(f'{name:>17} {elapsed * 1000:>9.2f} ms  {explain(queryset)}')
+
+
+def set_indexes(models, create):
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model in models:
+            for index in model._meta.indexes:
+                if create:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+
+
+def analyze():
+    """Обновляет статистику, по которой планировщик выбирает индексы."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--authors', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--follows', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from posts.models import Comment, Follow, Post
+
+        models = (Post, Comment, Follow)
+        set_indexes(models, create=False)
+        seed(args.posts, args.comments, args.authors, args.groups,
+             args.follows)
+        analyze()
+        measure('без индексов', args.page_size)
+        set_indexes(models, create=True)
+        analyze()
+        measure('с индексами', args.page_size)
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
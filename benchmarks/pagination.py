@@ -0,0 +1,67 @@
+"""
+Сравнение LimitOffset и keyset пагинации постов на разной глубине.
+
+Запуск из корня репозитория:
+    python -m benchmarks.pagination --posts 200000
+"""
+import argparse
+
+from .utils import best_of, setup_django
+
+
+def seed(total):
+    from django.contrib.auth import get_user_model
+    from posts.models import Post
+
+    author = get_user_model().objects.create_user(username='bench')
+    batch = 10000
+    for start in range(0, total, batch):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(start, min(start + batch, total))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from rest_framework.test import APIClient
+        from api.pagination import PostPagination
+
+        seed(args.posts)
+        client = APIClient()
+        print(f'{"depth":>10} {"offset, ms":>12} {"keyset, ms":>12}')
+        for depth in (0, args.posts // 10, args.posts // 2, args.posts - 100):
+            offset_url = (
+                f'/api/v1/posts/?limit={args.page_size}&offset={depth}'
+            )
+            offset_time = best_of(lambda: client.get(offset_url))
+
+            # курсор на позицию depth: сортировка от новых к старым
+            from posts.models import Post
+            anchor = Post.objects.order_by(
+                *PostPagination.ordering
+            ).values_list('pub_date', 'id')[max(depth - 1, 0)]
+            paginator = PostPagination()
+            paginator.fields = [
+                Post._meta.get_field(name.lstrip('-'))
+                for name in paginator.ordering
+            ]
+            cursor = paginator.encode_cursor(list(anchor))
+            keyset_url = (
+                f'/api/v1/posts/?page_size={args.page_size}&cursor={cursor}'
+            )
+            keyset_time = best_of(lambda: client.get(keyset_url))
+            print(f'{depth:>10} {offset_time * 1000:>12.2f} '
+                  f'{keyset_time * 1000:>12.2f}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
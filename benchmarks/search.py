@@ -0,0 +1,81 @@
+"""
+Время поиска постов: LIKE '%...%' и полнотекстовый индекс.
+
+Запуск из корня репозитория:
+    python -m benchmarks.search --posts 1000000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from .utils import best_of, setup_django
+
+BATCH = 50000
+LETTERS = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+def make_words(count):
+    random.seed(0)
+    return sorted({
+        ''.join(random.choices(LETTERS, k=random.randint(4, 10)))
+        for _ in range(count)
+    })
+
+
+def seed(total, words):
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+
+    author = get_user_model().objects.create_user(username='bench')
+    start = datetime(2020, 1, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for first in range(1, total + 1, BATCH):
+            rows = []
+            for number in range(first, min(first + BATCH, total + 1)):
+                text = ' '.join(random.choices(words, k=30))
+                rows.append((number, text, text[:100],
+                             start + timedelta(seconds=number), author.pk))
+            cursor.executemany(
+                'INSERT INTO posts_post (id, text, preview, pub_date, '
+                'author_id, comment_count, version, image_widths) '
+                'VALUES (%s, %s, %s, %s, %s, 0, 1, \'\')',
+                rows
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from posts.models import Post
+        from posts.search import LikeSearchIndex, get_index
+
+        words = make_words(20000)
+        seed(args.posts, words)
+        index = get_index(Post)
+        index.rebuild()
+        like = LikeSearchIndex(Post, 'text')
+        print(f'{"query":>22} {"LIKE, ms":>10} {"index, ms":>10}')
+        # слово целиком, префикс, два слова и слово, которого нет
+        queries = (words[100], words[200][:4], f'{words[1]} {words[2]}',
+                   'отсутствует')
+        for query in queries:
+            timings = [
+                best_of(lambda: list(
+                    backend.search(Post.objects.all(), query)
+                    .values('id', 'search_highlight')[:args.page_size]
+                ))
+                for backend in (like, index)
+            ]
+            print(f'{query:>22} {timings[0] * 1000:>10.2f} '
+                  f'{timings[1] * 1000:>10.2f}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
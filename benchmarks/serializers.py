@@ -0,0 +1,85 @@
+"""
+Сравнение скорости сериализации списков: DRF сериализаторы
+и быстрый путь api.fastpath, в объектах в секунду.
+
+Запуск из корня репозитория:
+    python -m benchmarks.serializers --rows 5000
+"""
+import argparse
+
+from .utils import best_of, setup_django
+
+
+def seed(total):
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'user{number}') for number in range(100)
+    )
+    users = list(User.objects.all())
+    group = Group.objects.create(title='Группа', slug='group')
+    Post.objects.bulk_create(
+        Post(text='Текст поста ' * (number % 30 + 1),
+             author=users[number % 100],
+             group=group if number % 2 else None)
+        for number in range(total)
+    )
+    post = Post.objects.first()
+    Comment.objects.bulk_create(
+        Comment(text='Комментарий', author=users[number % 100], post=post)
+        for number in range(total)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=user, following=following)
+        for user in users
+        for following in users
+        if user != following
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from api import fastpath, serializers
+        from posts.models import Comment, Follow, Post
+        from rest_framework.renderers import JSONRenderer
+
+        seed(args.rows)
+        cases = (
+            ('posts', Post.objects.select_related('author', 'group'),
+             serializers.PostSerializer, fastpath.PostListSerializer),
+            ('comments', Comment.objects.select_related('author'),
+             serializers.CommentSerializer, fastpath.CommentListSerializer),
+            ('follows', Follow.objects.select_related('user', 'following'),
+             serializers.FollowSerializer, fastpath.FollowListSerializer),
+        )
+        render = JSONRenderer().render
+        print(f'{"":>10} {"DRF, obj/s":>14} {"fast, obj/s":>14} {"x":>6}')
+        for name, queryset, drf_class, fast_class in cases:
+            queryset = queryset.order_by('id')
+            total = queryset.count()
+            drf_time = best_of(
+                lambda: render(drf_class(queryset.all(), many=True).data), 3
+            )
+            fast_time = best_of(
+                lambda: render(fast_class(
+                    queryset.values(*fast_class.values)
+                ).data), 3
+            )
+            assert render(drf_class(queryset.all(), many=True).data) == render(
+                fast_class(queryset.values(*fast_class.values)).data
+            )
+            print(f'{name:>10} {total / drf_time:>14.0f} '
+                  f'{total / fast_time:>14.0f} {drf_time / fast_time:>6.1f}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,627 @@
+"""
+Нагрузочный прогон всех маршрутов API на наборе данных benchmarks.data.
+
+Для каждого маршрута: запросов в секунду, задержка p50/p95/p99,
+число SQL запросов на запрос (медиана и максимум) и пиковый RSS
+процесса с приложением. Результат пишется в JSON и сравнивается
+с сохраненным командой python -m benchmarks.compare.
+
+В процессе (тестовый клиент Django, база в памяти):
+    python -m benchmarks.suite --size small --output out.json
+
+Реальный сервер: база из настроек проекта заполняется командой seed
+с тем же размером, что и при прогоне, первичные ключи набора данных
+детерминированы; id новых подписок API не отдает, их прогон читает
+из той же базы. Число SQL запросов сервер отдает в Server-Timing,
+если включено профилирование (API_PROFILING_SAMPLE_RATE = 1.0), RSS
+читается из /proc/<pid>/status процесса сервера:
+    python -m benchmarks.suite --size small seed
+    python -m benchmarks.suite --size small \\
+        --server http://127.0.0.1:8000 --pid 1234 --concurrency 8
+
+Маршруты подтверждения почты и смены пароля или имени не проверяются,
+см. SKIPPED; остальные маршруты api/urls.py без проверки
+перечисляются в отчете.
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import platform
+import re
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import quote, urlsplit
+
+from . import data as dataset
+from .utils import setup_django
+
+# письма и изменение учетных данных пользователя
+SKIPPED = {
+    'user-activation', 'user-resend-activation', 'user-reset-password',
+    'user-reset-password-confirm', 'user-reset-username',
+    'user-reset-username-confirm', 'user-set-password', 'user-set-username',
+}
+
+BULK_SIZE = 10
+# на каждый запрос массовой подписки нужны свои авторы, поэтому
+# без повторов прогон выдерживает до (users - 2) / 5 таких запросов
+FOLLOW_BULK_SIZE = 5
+_queries = re.compile(r'desc="(\d+) queries')
+_placeholder = re.compile(r'\{(\w+)\}')
+
+
+@dataclass
+class Reply:
+    status: int
+    content: bytes
+    queries: int = None
+
+    def json(self):
+        return json.loads(self.content) if self.content else None
+
+
+class InProcessDriver:
+    """Запросы через тестовый клиент DRF, SQL запросы считаются напрямую."""
+    mode = 'in-process'
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+
+    def send(self, method, path, data=None, token=None):
+        from django.db import connection
+
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        with connection.execute_wrapper(count):
+            if method == 'GET':
+                response = self.client.get(path, **extra)
+            else:
+                response = getattr(self.client, method.lower())(
+                    path, data, format='json', **extra
+                )
+            # потоковые ответы выполняют запросы при чтении
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+        return Reply(response.status_code, content, queries)
+
+    def peak_rss(self):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ServerDriver:
+    """
+    Запросы к запущенному серверу, одно постоянное соединение
+    на поток.
+    """
+    mode = 'server'
+
+    def __init__(self, url, pid=None):
+        parts = urlsplit(url)
+        self.connection_class = (
+            HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.pid = pid
+        self.local = threading.local()
+
+    def get_connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.connection_class(self.netloc, timeout=60)
+            self.local.connection = connection
+        return connection
+
+    def send(self, method, path, data=None, token=None):
+        headers = {'Accept': 'application/json'}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        connection = self.get_connection()
+        try:
+            connection.request(
+                method, quote(self.prefix + path, safe='/?&=%'), body, headers
+            )
+            response = connection.getresponse()
+            content = response.read()
+        except (HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+        timing = _queries.search(response.getheader('Server-Timing', ''))
+        return Reply(response.status, content,
+                     int(timing.group(1)) if timing else None)
+
+    def peak_rss(self):
+        if self.pid is None:
+            return None
+        with open(f'/proc/{self.pid}/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+        return None
+
+
+@dataclass
+class Route:
+    """
+    Маршрут прогона. В path и строках data подставляются значения
+    из Targets и результата prepare(runner) — подготовки
+    отдельного запроса, которая не входит в замер.
+    """
+    name: str
+    method: str
+    path: str
+    data: object = None
+    status: int = 200
+    auth: bool = True
+    prepare: object = None
+    # предел числа запросов для маршрутов с хешированием пароля
+    limit: int = None
+
+
+@dataclass
+class Targets:
+    """Объекты, к которым обращаются маршруты."""
+    hot_post: int
+    cold_post: int
+    group: int
+    username: str
+    own_post: int = None
+    own_comment: int = None
+    comment: int = None
+    follow: int = None
+    token: str = None
+    refresh: str = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def fill(value, params):
+    if isinstance(value, str):
+        # строка из одной подстановки заменяется значением целиком,
+        # например списком id для массового удаления
+        match = _placeholder.fullmatch(value)
+        if match:
+            return params[match.group(1)]
+        return value.format(**params)
+    if isinstance(value, list):
+        return [fill(item, params) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, params) for key, item in value.items()}
+    return value
+
+
+def first_id(data):
+    items = data['results'] if isinstance(data, dict) else data
+    return items[0]['id']
+
+
+class Runner:
+    """Подготовка объектов и прогон маршрутов через драйвер."""
+
+    def __init__(self, driver, size):
+        self.driver = driver
+        self.size = size
+        self.token = None
+        # авторы для подписок: от наименее популярных, без первого
+        # пользователя, от имени которого идут запросы
+        self.authors = itertools.cycle(
+            dataset.username(number)
+            for number in range(size.users, 1, -1)
+        )
+        self.counter = itertools.count()
+
+    def call(self, method, path, data=None, status=None):
+        reply = self.driver.send(method, path, data, self.token)
+        if status is not None and reply.status != status:
+            raise RuntimeError(
+                f'{method} {path}: {reply.status} {reply.content[:200]!r}'
+            )
+        return reply.json()
+
+    def login(self):
+        tokens = self.call('POST', '/api/v1/jwt/create/', {
+            'username': dataset.username(1), 'password': dataset.PASSWORD
+        }, status=200)
+        self.token = tokens['access']
+        return tokens['refresh']
+
+    def find_targets(self):
+        targets = Targets(
+            hot_post=1, cold_post=self.size.posts, group=1,
+            username=dataset.username(self.size.users),
+        )
+        targets.refresh = self.login()
+        targets.token = self.token
+        targets.own_post = self.create_post()
+        targets.comment = first_id(self.call(
+            'GET', '/api/v1/posts/1/comments/?page_size=1', status=200
+        ))
+        targets.own_comment = self.create_comment()
+        targets.follow = self.follow(next(self.authors))
+        return targets
+
+    def create_post(self):
+        return self.call('POST', '/api/v1/posts/', {
+            'text': f'Тестовый пост {next(self.counter)}', 'group': 1
+        }, status=201)['id']
+
+    def create_comment(self):
+        return self.call('POST', '/api/v1/posts/1/comments/', {
+            'text': f'Коммент {next(self.counter)}'
+        }, status=201)['id']
+
+    def follow(self, username):
+        from posts.models import Follow
+
+        self.unfollow(username)
+        self.call('POST', '/api/v1/follow/', {'following': username},
+                  status=201)
+        # API не отдает id подписки, он нужен для маршрутов /follow/<id>/
+        return Follow.objects.values_list('pk', flat=True).get(
+            user__username=dataset.username(1), following__username=username
+        )
+
+    def unfollow(self, *usernames):
+        self.call('DELETE', '/api/v1/follow/bulk/', list(usernames),
+                  status=200)
+
+    def run_route(self, route, targets, count, warmup, concurrency):
+        if route.limit is not None:
+            count = min(count, route.limit)
+        params = targets.as_dict()
+        jobs = []
+        for _ in range(warmup + count):
+            values = dict(params)
+            if route.prepare is not None:
+                values.update(route.prepare(self))
+            jobs.append((fill(route.path, values), fill(route.data, values)))
+        token = self.token if route.auth else None
+
+        def send(job):
+            path, data = job
+            start = time.perf_counter()
+            reply = self.driver.send(route.method, path, data, token)
+            return time.perf_counter() - start, reply
+
+        for job in jobs[:warmup]:
+            send(job)
+        # мусор от подготовки не собирается во время замера
+        gc.collect()
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(send, jobs[warmup:]))
+        else:
+            results = [send(job) for job in jobs[warmup:]]
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(duration for duration, _ in results)
+        queries = sorted(reply.queries for _, reply in results
+                         if reply.queries is not None)
+        errors = [reply for _, reply in results
+                  if reply.status != route.status]
+        if errors:
+            print(f'  {route.name}: {len(errors)} ответов не '
+                  f'{route.status}, например {errors[0].status} '
+                  f'{errors[0].content[:200]!r}')
+        return {
+            'method': route.method,
+            'path': route.path,
+            'requests': count,
+            'errors': len(errors),
+            'rps': round(count / elapsed, 1),
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': queries[len(queries) // 2] if queries else None,
+            'max_queries': queries[-1] if queries else None,
+            'peak_rss_mb': rss(self.driver),
+        }
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу, в миллисекундах."""
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return round(values[rank - 1] * 1000, 2)
+
+
+def rss(driver):
+    peak = driver.peak_rss()
+    return None if peak is None else round(peak, 1)
+
+
+def prepare_post(runner):
+    return {'post': runner.create_post()}
+
+
+def prepare_comment(runner):
+    return {'comment': runner.create_comment()}
+
+
+def prepare_posts(runner):
+    created = runner.call('POST', '/api/v1/posts/bulk/', [
+        {'text': f'Тестовый пост {index}'} for index in range(BULK_SIZE)
+    ], status=201)['created']
+    return {'ids': [item['id'] for item in created]}
+
+
+def prepare_comments(runner):
+    created = runner.call('POST', '/api/v1/posts/1/comments/bulk/', [
+        {'text': f'Коммент {index}'} for index in range(BULK_SIZE)
+    ], status=201)['created']
+    return {'ids': [item['id'] for item in created]}
+
+
+def prepare_unfollowed(runner):
+    username = next(runner.authors)
+    runner.unfollow(username)
+    return {'author': username}
+
+
+def prepare_follow(runner):
+    return {'follow': runner.follow(next(runner.authors))}
+
+
+def prepare_followed(runner):
+    username = next(runner.authors)
+    runner.follow(username)
+    return {'author': username}
+
+
+def prepare_unfollowed_many(runner):
+    usernames = [next(runner.authors) for _ in range(FOLLOW_BULK_SIZE)]
+    runner.unfollow(*usernames)
+    return {'items': [{'following': username} for username in usernames]}
+
+
+def prepare_followed_many(runner):
+    usernames = [next(runner.authors) for _ in range(FOLLOW_BULK_SIZE)]
+    runner.unfollow(*usernames)
+    runner.call('POST', '/api/v1/follow/bulk/', [
+        {'following': username} for username in usernames
+    ], status=201)
+    return {'authors': usernames}
+
+
+def prepare_new_user(runner):
+    return {'new_user': f'BenchUser{next(runner.counter)}'}
+
+
+def get_routes():
+    posts = '/api/v1/posts/'
+    comments = '/api/v1/posts/{hot_post}/comments/'
+    jwt = '/api/v1/jwt/'
+    credentials = {'username': dataset.username(1),
+                   'password': dataset.PASSWORD}
+    return [
+        Route('api-root', 'GET', '/api/v1/'),
+        Route('posts-list-anonymous', 'GET', posts + '?page_size=20',
+              auth=False),
+        Route('posts-list', 'GET', posts + '?page_size=20'),
+        Route('posts-list-offset', 'GET', posts + '?limit=20&offset=1000'),
+        Route('posts-search', 'GET', posts + '?search=кофе&page_size=20'),
+        Route('posts-detail', 'GET', posts + '{hot_post}/'),
+        Route('posts-detail-cold', 'GET', posts + '{cold_post}/'),
+        Route('posts-create', 'POST', posts,
+              {'text': 'Тестовый пост', 'group': '{group}'}, status=201),
+        Route('posts-update', 'PATCH', posts + '{own_post}/',
+              {'text': 'Измененный пост'}),
+        Route('posts-delete', 'DELETE', posts + '{post}/', status=204,
+              prepare=prepare_post),
+        Route('posts-bulk-create', 'POST', posts + 'bulk/',
+              [{'text': 'Тестовый пост'}] * BULK_SIZE, status=201),
+        Route('posts-bulk-delete', 'DELETE', posts + 'bulk/', '{ids}',
+              prepare=prepare_posts),
+        Route('feed', 'GET', '/api/v1/feed/?page_size=20'),
+        Route('groups-list-anonymous', 'GET', '/api/v1/groups/',
+              auth=False),
+        Route('groups-list', 'GET', '/api/v1/groups/'),
+        Route('groups-detail', 'GET', '/api/v1/groups/{group}/'),
+        Route('comments-list', 'GET', comments + '?page_size=20'),
+        Route('comments-list-cold', 'GET',
+              '/api/v1/posts/{cold_post}/comments/?page_size=20'),
+        Route('comments-detail', 'GET', comments + '{comment}/'),
+        Route('comments-tree', 'GET', comments + 'tree/?page_size=100'),
+        Route('comments-create', 'POST', comments, {'text': 'Коммент'},
+              status=201),
+        Route('comments-update', 'PATCH', comments + '{own_comment}/',
+              {'text': 'Измененный коммент'}),
+        Route('comments-delete', 'DELETE', comments + '{comment}/',
+              status=204, prepare=prepare_comment),
+        Route('comments-bulk-create', 'POST', comments + 'bulk/',
+              [{'text': 'Коммент'}] * BULK_SIZE, status=201),
+        Route('comments-bulk-delete', 'DELETE', comments + 'bulk/', '{ids}',
+              prepare=prepare_comments),
+        Route('follow-list', 'GET', '/api/v1/follow/?page_size=20'),
+        Route('follow-detail', 'GET', '/api/v1/follow/{follow}/'),
+        Route('follow-create', 'POST', '/api/v1/follow/',
+              {'following': '{author}'}, status=201,
+              prepare=prepare_unfollowed),
+        Route('follow-delete', 'DELETE', '/api/v1/follow/{follow}/',
+              status=204, prepare=prepare_follow),
+        Route('follow-bulk-create', 'POST', '/api/v1/follow/bulk/',
+              '{items}', status=201,
+              prepare=prepare_unfollowed_many),
+        Route('follow-bulk-delete', 'DELETE', '/api/v1/follow/bulk/',
+              '{authors}', prepare=prepare_followed_many),
+        Route('cache-stats', 'GET', '/api/v1/cache/stats/'),
+        Route('export-posts', 'GET',
+              '/api/v1/export/posts/?author={username}'),
+        Route('export-comments', 'GET',
+              '/api/v1/export/comments/?group=group_{group}'),
+        Route('users-list', 'GET', '/api/v1/users/'),
+        Route('users-me', 'GET', '/api/v1/users/me/'),
+        Route('users-detail', 'GET', '/api/v1/users/1/'),
+        Route('users-followers', 'GET',
+              '/api/v1/users/' + dataset.username(1) + '/followers/'),
+        Route('users-following', 'GET',
+              '/api/v1/users/' + dataset.username(1) + '/following/'),
+        Route('users-follow-put', 'PUT', '/api/v1/users/{author}/follow/',
+              status=201, prepare=prepare_unfollowed),
+        Route('users-follow-delete', 'DELETE',
+              '/api/v1/users/{author}/follow/', status=204,
+              prepare=prepare_followed),
+        Route('users-create', 'POST', '/api/v1/users/',
+              {'username': '{new_user}', 'password': 'Bench-password-42'},
+              status=201, auth=False, prepare=prepare_new_user, limit=5),
+        Route('api-token-auth', 'POST', '/api/v1/api-token-auth/',
+              credentials, auth=False, limit=5),
+        Route('jwt-create', 'POST', jwt + 'create/', credentials,
+              auth=False, limit=5),
+        Route('jwt-refresh', 'POST', jwt + 'refresh/',
+              {'refresh': '{refresh}'}, auth=False),
+        Route('jwt-verify', 'POST', jwt + 'verify/',
+              {'token': '{token}'}, auth=False),
+    ]
+
+
+def get_uncovered(routes, targets):
+    """Шаблоны api/urls.py, ни один маршрут прогона которых не вызывает."""
+    from django.urls import URLResolver, get_resolver, resolve
+
+    names = set()
+
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            # так же, как ResolverMatch.route
+            route = prefix + str(pattern.pattern).lstrip('^')
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, route)
+                continue
+            # одноименный шаблон ниже перекрыт первым, как в reverse()
+            shadowed = pattern.name is not None and pattern.name in names
+            if pattern.name is not None:
+                names.add(pattern.name)
+            if (route.startswith('api/') and 'format' not in route
+                    and pattern.name not in SKIPPED and not shadowed):
+                yield route
+
+    params = targets.as_dict()
+    params.update(post=1, ids=None, items=None, authors=None, new_user='',
+                  author=dataset.username(2))
+    covered = {
+        resolve(route.path.format(**params).split('?')[0]).route
+        for route in routes
+    }
+    return sorted(set(walk(get_resolver().url_patterns)) - covered)
+
+
+def run(driver, size, count, warmup, concurrency, names=None):
+    runner = Runner(driver, size)
+    targets = runner.find_targets()
+    routes = get_routes()
+    uncovered = []
+    if driver.mode == InProcessDriver.mode:
+        uncovered = get_uncovered(routes, targets)
+        for route in uncovered:
+            print(f'маршрут без проверки: {route}')
+    if names:
+        routes = [route for route in routes if route.name in names]
+
+    print(f'{"маршрут":<22} {"req/s":>8} {"p50":>8} {"p95":>8} '
+          f'{"p99":>8} {"SQL":>4} {"RSS, МБ":>8}')
+    results = {}
+    for route in routes:
+        result = runner.run_route(route, targets, count, warmup, concurrency)
+        results[route.name] = result
+        queries = result['queries']
+        print(f'{route.name:<22} {result["rps"]:>8} {result["p50_ms"]:>8} '
+              f'{result["p95_ms"]:>8} {result["p99_ms"]:>8} '
+              f'{"-" if queries is None else queries:>4} '
+              f'{result["peak_rss_mb"] or "-":>8}')
+    return {
+        'meta': {
+            'mode': driver.mode,
+            'created': datetime.now(timezone.utc).isoformat(
+                timespec='seconds'
+            ),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': size.as_dict(),
+            'requests': count,
+            'warmup': warmup,
+            'concurrency': concurrency,
+            'uncovered': uncovered,
+        },
+        'peak_rss_mb': rss(driver),
+        'routes': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('command', nargs='?', choices=('run', 'seed'),
+                        default='run')
+    parser.add_argument('--size', choices=dataset.SIZES, default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--server', help='адрес запущенного сервера')
+    parser.add_argument('--pid', type=int, help='pid процесса сервера')
+    parser.add_argument('--route', action='append', dest='routes',
+                        help='прогнать только этот маршрут')
+    parser.add_argument('--output', help='файл для результата в JSON')
+    args = parser.parse_args()
+    size = replace(dataset.SIZES[args.size], seed=args.seed)
+
+    if args.command == 'seed':
+        setup_django(test_database=False)
+        start = time.perf_counter()
+        dataset.generate(size)
+        print(f'набор {args.size} создан за '
+              f'{time.perf_counter() - start:.1f} с')
+        return
+
+    if args.server:
+        setup_django(test_database=False)
+        driver = ServerDriver(args.server, args.pid)
+        teardown = None
+    else:
+        if args.concurrency > 1:
+            parser.error('--concurrency работает только с --server')
+        teardown = setup_django()
+        start = time.perf_counter()
+        dataset.generate(size)
+        print(f'набор {args.size} создан за '
+              f'{time.perf_counter() - start:.1f} с')
+        driver = InProcessDriver()
+    try:
+        report = run(driver, size, args.requests, args.warmup,
+                     args.concurrency, args.routes)
+    finally:
+        if teardown is not None:
+            teardown()
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+            output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
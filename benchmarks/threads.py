@@ -0,0 +1,166 @@
+"""
+Загрузка дерева комментариев поста со 100 тысячами вложенных ответов:
+страницы дерева и ветка с ограничением глубины одним запросом
+по материализованному пути (posts.threads) против загрузки ветки
+по уровням через parent_id, по запросу на уровень.
+
+Запуск из корня репозитория:
+    python -m benchmarks.threads --comments 100000
+"""
+import argparse
+import random
+from collections import Counter
+
+from .utils import best_of, setup_django
+
+BATCH = 5000
+
+
+def seed(total, roots, chain, seed_value):
+    """
+    Пост с total комментариями: первые roots — верхнего уровня,
+    остальные отвечают на предыдущий комментарий с вероятностью chain
+    (длинные цепочки) или на случайный из уже созданных.
+    Возвращает пост, автора и корень самой большой ветки.
+    """
+    from django.contrib.auth import get_user_model
+    from posts.models import (COMMENT_MAX_DEPTH, Comment, Post,
+                              make_comment_path)
+
+    rng = random.Random(seed_value)
+    author = get_user_model().objects.create_user(username='bench')
+    post = Post.objects.create(text='Пост', author=author)
+    parents, paths, depths, tops = [None], [''], [0], [None]
+    replies = [0] * (total + 1)
+    for number in range(1, total + 1):
+        parent = None
+        if number > roots:
+            parent = number - 1 if rng.random() < chain else (
+                rng.randint(1, number - 1)
+            )
+            if depths[parent] >= COMMENT_MAX_DEPTH:
+                parent = parents[parent]
+        parents.append(parent)
+        depths.append(0 if parent is None else depths[parent] + 1)
+        paths.append(make_comment_path(paths[parent or 0], number))
+        tops.append(number if parent is None else tops[parent])
+        if parent is not None:
+            replies[parent] += 1
+    for first in range(1, total + 1, BATCH):
+        Comment.objects.bulk_create(
+            Comment(id=number, post=post, author=author,
+                    text=f'Коммент {number}', parent_id=parents[number],
+                    path=paths[number], depth=depths[number],
+                    reply_count=replies[number])
+            for number in range(first, min(first + BATCH, total + 1))
+        )
+    Post.objects.filter(pk=post.pk).update(comment_count=total)
+    return post, author, Counter(tops[1:]).most_common(1)[0][0]
+
+
+def load_by_levels(post_id, root, depth):
+    """Ветка по уровням: запрос на каждый уровень через parent_id."""
+    from posts.models import Comment
+
+    rows = list(Comment.objects.filter(pk=root, post_id=post_id).values())
+    level = [row['id'] for row in rows]
+    for _ in range(depth):
+        if not level:
+            break
+        children = list(
+            Comment.objects.filter(parent_id__in=level).values()
+        )
+        rows.extend(children)
+        level = [row['id'] for row in children]
+    return rows
+
+
+def count_queries(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--roots', type=int, default=1000)
+    parser.add_argument('--chain', type=float, default=0.3,
+                        help='доля ответов на предыдущий комментарий')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='глубина загружаемой ветки')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.db.models import Max
+        from rest_framework.test import APIClient
+        from api.authentication import get_token
+        from api.pagination import CommentTreePagination
+        from posts import threads
+        from posts.models import Comment
+
+        post, author, root = seed(
+            args.comments, args.roots, args.chain, args.seed
+        )
+        levels = Comment.objects.aggregate(depth=Max('depth'))['depth'] + 1
+        print(f'комментариев: {args.comments}, уровней: {levels}, '
+              f'ветка {root}: '
+              f'{len(load_by_levels(post.pk, root, levels))} комментариев')
+
+        # с токеном ответы не берутся из кеша анонимных запросов
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(author).access_token}'
+        )
+        url = f'/api/v1/posts/{post.pk}/comments/tree/'
+        paginator = CommentTreePagination()
+        middle = Comment.objects.order_by('path').values_list(
+            'path', flat=True
+        )[args.comments // 2]
+        cases = {
+            'дерево, 1-я страница': f'{url}?page_size={args.page_size}',
+            'дерево, середина': (
+                f'{url}?page_size={args.page_size}'
+                f'&cursor={paginator.encode_cursor([middle])}'
+            ),
+            f'ветка, глубина {args.depth}': (
+                f'{url}?root={root}&depth={args.depth}&page_size=1000'
+            ),
+        }
+        print(f'{"API":<28} {"ms":>8} {"SQL":>5}')
+        for name, case_url in cases.items():
+            def request(case_url=case_url):
+                response = client.get(case_url)
+                assert response.status_code == 200, response.content
+            elapsed = best_of(request)
+            print(f'{name:<28} {elapsed * 1000:>8.2f} '
+                  f'{count_queries(request):>5}')
+
+        # та же выборка ветки без HTTP и сериализации
+        print(f'\n{"ORM, ветка " + str(root):<28} {"ms":>8} {"SQL":>5} '
+              f'{"строк":>6}')
+        for depth in (args.depth, levels):
+            loaders = {
+                f'путь, глубина {depth}': lambda depth=depth: list(
+                    threads.get_tree(post.pk, root, depth).values()
+                ),
+                f'по уровням, глубина {depth}': lambda depth=depth: (
+                    load_by_levels(post.pk, root, depth)
+                ),
+            }
+            for name, load in loaders.items():
+                elapsed = best_of(load)
+                print(f'{name:<28} {elapsed * 1000:>8.2f} '
+                      f'{count_queries(load):>5} {len(load()):>6}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
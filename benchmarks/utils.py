@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube_api')
+
+
+def setup_django(test_database=True):
+    """
+    Настраивает Django и создает чистую тестовую базу в памяти.
+    Возвращает функцию, удаляющую базу. С test_database=False
+    работает с базой из настроек проекта.
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube_api.settings')
+    import django
+    django.setup()
+    if not test_database:
+        return lambda: None
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    return lambda: connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def best_of(func, repeat=5):
+    """Минимальное время выполнения func за repeat запусков, в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -30,6 +30,8 @@ if FILENAME not in project_dir_content:
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_cache',
+    'tests.fixtures.fixture_plan',
 ]
 
 # test .md
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def get_with_plan():
+    """
+    GET запрос клиентом: возвращает ответ и план последнего запроса,
+    читающего посты.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def get(client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        sql = [query['sql'] for query in context.captured_queries
+               if 'FROM "posts_post"' in query['sql']][-1]
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        return response, plan
+
+    return get
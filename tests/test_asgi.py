@@ -0,0 +1,246 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+def call(app, method, path, body=b'', headers=(), query_string=b''):
+    """Выполняет один запрос к ASGI приложению, возвращает статус, заголовки, тело."""
+    messages = []
+    request = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return request.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [('host', 'testserver'), *headers]
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'root_path': '',
+        'query_string': query_string, 'http_version': '1.1',
+        'headers': [(name.encode(), value.encode()) for name, value in headers],
+    }
+    asyncio.run(app(scope, receive, send))
+    start, *chunks = messages
+    return (
+        start['status'], dict(start['headers']),
+        b''.join(chunk.get('body', b'') for chunk in chunks)
+    )
+
+
+@pytest.fixture
+def asgi_app():
+    from api.asgi import AsyncApiApplication
+
+    app = AsyncApiApplication(read_threads=2, threads=2)
+    yield app
+    app.read_bridge.shutdown()
+    app.bridge.shutdown()
+
+
+class TestAsyncApiApplication:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_endpoints(self, client, asgi_app, post, comment_1_post, group_1):
+        for path in ('/api/v1/posts/', f'/api/v1/posts/{post.id}/',
+                     f'/api/v1/posts/{post.id}/comments/', '/api/v1/groups/',
+                     f'/api/v1/groups/{group_1.id}/'):
+            status, headers, body = call(asgi_app, 'GET', path)
+            assert status == 200, (
+                f'Проверьте, что GET запрос к `{path}` через ASGI возвращает статус 200'
+            )
+            assert json.loads(body) == client.get(path).json(), (
+                f'Проверьте, что ответ на `{path}` через ASGI совпадает с ответом WSGI'
+            )
+
+        status, _, _ = call(asgi_app, 'GET', f'/api/v1/posts/{post.id + 100}/')
+        assert status == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_through_asgi(self, asgi_app, token, post):
+        status, _, body = call(
+            asgi_app, 'POST', f'/api/v1/posts/{post.id}/comments/',
+            body=json.dumps({'text': 'Через ASGI'}).encode(),
+            headers=[('content-type', 'application/json'),
+                     ('authorization', f'Bearer {token["access"]}')]
+        )
+        assert status == 201, (
+            'Проверьте, что POST запрос через ASGI создает комментарий'
+        )
+        assert json.loads(body)['text'] == 'Через ASGI'
+        assert post.comments.filter(text='Через ASGI').exists()
+
+    def test_read_body_spools_to_file(self, settings, asgi_app):
+        settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 10
+        messages = [
+            {'type': 'http.request', 'body': b'0123456789', 'more_body': True},
+            {'type': 'http.request', 'body': b'abcdef', 'more_body': False},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        body = asyncio.run(asgi_app.read_body(receive))
+        assert body._rolled, (
+            'Проверьте, что тело запроса больше предела пишется во временный файл'
+        )
+        assert body.read() == b'0123456789abcdef'
+        body.close()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_streaming_response(self, asgi_app, admin_user, post, another_post):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        access = RefreshToken.for_user(admin_user).access_token
+        status, headers, body = call(
+            asgi_app, 'GET', '/api/v1/export/posts/',
+            headers=[('authorization', f'Bearer {access}')]
+        )
+        assert status == 200
+        assert headers[b'content-type'] == b'application/x-ndjson'
+        assert len(body.decode().splitlines()) == 2
+
+    def test_streaming_single_thread(self):
+        from api.asgi import STREAM_BUFFER, AsyncApiApplication
+
+        threads = set()
+        closed = []
+
+        class Streaming:
+            streaming = True
+
+            def __iter__(self):
+                for number in range(STREAM_BUFFER * 3):
+                    threads.add(threading.get_ident())
+                    yield b'%d\n' % number
+
+            def close(self):
+                threads.add(threading.get_ident())
+                closed.append(True)
+
+        def streaming_application(environ, start_response):
+            threads.add(threading.get_ident())
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Streaming()
+
+        app = AsyncApiApplication(streaming_application, read_threads=4, threads=4)
+        status, _, body = call(app, 'GET', '/api/v1/export/posts/')
+        assert status == 200
+        assert len(body.splitlines()) == STREAM_BUFFER * 3
+        assert len(threads) == 1 and closed, (
+            'Проверьте, что потоковый ответ читается и закрывается в потоке представления'
+        )
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message.get('more_body'):
+                raise OSError('клиент отключился')
+
+        closed.clear()
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/v1/export/posts/',
+                 'query_string': b'', 'headers': []}
+        with pytest.raises(OSError):
+            asyncio.run(app(scope, receive, send))
+        assert closed, 'Проверьте, что при отключении клиента потоковый ответ закрывается'
+        app.read_bridge.shutdown()
+        app.bridge.shutdown()
+
+    def test_overloaded_pool(self):
+        from api.asgi import AsyncApiApplication
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_application(environ, start_response):
+            started.set()
+            release.wait(5)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        app = AsyncApiApplication(
+            slow_application, read_threads=1, threads=1, max_pending=1
+        )
+        results = []
+        worker = threading.Thread(
+            target=lambda: results.append(call(app, 'GET', '/api/v1/posts/'))
+        )
+        worker.start()
+        assert started.wait(5)
+
+        status, headers, _ = call(app, 'GET', '/api/v1/posts/')
+        assert status == 503, (
+            'Проверьте, что при заполненной очереди пула чтения запрос получает 503'
+        )
+        assert headers[b'retry-after'] == b'1'
+        # запись идет через свой пул и не ждет потоков чтения
+        assert app.get_bridge({'method': 'POST', 'path': '/api/v1/posts/'}) is app.bridge
+
+        release.set()
+        worker.join(5)
+        assert results[0][0] == 200
+        app.read_bridge.shutdown()
+        app.bridge.shutdown()
+
+    def test_pending_counts_body_reading(self):
+        from api.asgi import AsyncApiApplication
+
+        def application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [environ['wsgi.input'].read()]
+
+        app = AsyncApiApplication(application, threads=1, max_pending=1)
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/posts/',
+                 'query_string': b'', 'headers': []}
+
+        async def upload(receive):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            await app(scope, receive, send)
+            return messages[0]['status'], b''.join(
+                message.get('body', b'') for message in messages[1:]
+            )
+
+        async def main():
+            uploaded = asyncio.Event()
+
+            async def slow_receive():
+                await uploaded.wait()
+                return {'type': 'http.request', 'body': b'data'}
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            slow = asyncio.ensure_future(upload(slow_receive))
+            await asyncio.sleep(0)
+            overloaded = await upload(receive)
+            uploaded.set()
+            return overloaded, await slow
+
+        overloaded, uploaded = asyncio.run(main())
+        assert overloaded[0] == 503, (
+            'Проверьте, что запрос, тело которого еще читается, занимает место в очереди'
+        )
+        assert uploaded == (200, b'data')
+        assert app.bridge.pending == 0
+        app.read_bridge.shutdown()
+        app.bridge.shutdown()
+
+    def test_lifespan(self, asgi_app):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(asgi_app({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
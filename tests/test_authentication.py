@@ -0,0 +1,93 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+def make_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+class TestTokenUserAuthentication:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_token_claims(self, client, django_assert_num_queries, user, follow_1):
+        response = client.post(
+            '/api/v1/jwt/create/', data={'username': user.username, 'password': '1234567'}
+        )
+        assert response.status_code == 200
+        api_client = make_client(response.json()['access'])
+
+        # пользователь собирается из токена, запрос только за подписками
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/v1/follow/')
+        assert response.status_code == 200
+        assert response.json() == [
+            {'user': user.username, 'following': follow_1.following.username}
+        ]
+
+        refresh = client.post('/api/v1/jwt/refresh/', data={
+            'refresh': client.post('/api/v1/jwt/create/', data={
+                'username': user.username, 'password': '1234567'
+            }).json()['refresh']
+        })
+        with django_assert_num_queries(1):
+            make_client(refresh.json()['access']).get('/api/v1/follow/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_cache(self, user_client, django_assert_num_queries, user):
+        # в токене из фикстуры нет утверждений, запись берется из кеша
+        with django_assert_num_queries(2):
+            user_client.get('/api/v1/follow/')
+        with django_assert_num_queries(1):
+            user_client.get('/api/v1/follow/')
+
+        user.is_active = False
+        user.save()
+        response = user_client.get('/api/v1/follow/')
+        assert response.status_code == 401, (
+            'Проверьте, что кеш пользователей сбрасывается при изменении пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_token_user_writes(self, user_client, user, another_user, post):
+        response = user_client.post(
+            f'/api/v1/posts/{post.id}/comments/', data={'text': 'Коммент'}
+        )
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+
+        response = user_client.post('/api/v1/follow/', data={'following': user.username})
+        assert response.status_code == 400
+        response = user_client.post('/api/v1/follow/', data={'following': another_user.username})
+        assert response.status_code == 201
+        response = user_client.post('/api/v1/follow/', data={'following': another_user.username})
+        assert response.status_code == 400
+
+        response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unsafe_methods_check_user(self, django_assert_num_queries, user, post):
+        from api.authentication import get_token, user_cache
+
+        api_client = make_client(get_token(user).access_token)
+        # чтение обходится утверждениями токена, запрос только за подписками
+        with django_assert_num_queries(1):
+            assert api_client.get('/api/v1/follow/').status_code == 200
+
+        user.is_active = False
+        user.save()
+        response = api_client.post(
+            f'/api/v1/posts/{post.id}/comments/', data={'text': 'Коммент'}
+        )
+        assert response.status_code == 401, (
+            'Проверьте, что токен отключенного пользователя не дает изменять данные'
+        )
+
+        user.delete()
+        user_cache.clear()
+        response = api_client.post('/api/v1/posts/', data={'text': 'Пост'})
+        assert response.status_code == 401, (
+            'Проверьте, что токен удаленного пользователя не дает изменять данные'
+        )
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+class TestBulkAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_bulk_create(self, client, user_client, user, group_1, follow_2):
+        group_url = f'/api/v1/groups/{group_1.id}/'
+        assert client.get(group_url).json()['post_count'] == 0
+        data = [
+            {'text': 'Пост 1', 'group': group_1.id},
+            {'text': ''},
+            {'text': 'Пост 3 ' * 30},
+        ]
+        response = user_client.post('/api/v1/posts/bulk/', data=data, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что при POST запросе на `/api/v1/posts/bulk/` возвращается статус 201'
+        )
+        test_data = response.json()
+        assert [item['index'] for item in test_data['created']] == [0, 2]
+        assert [item['index'] for item in test_data['errors']] == [1], (
+            'Проверьте, что ошибки валидации возвращаются по индексам объектов'
+        )
+
+        posts = Post.objects.order_by('id')
+        assert [post.id for post in posts] == [item['id'] for item in test_data['created']]
+        assert posts[0].group == group_1 and posts[0].author == user
+        assert posts[1].preview.endswith('[...]'), (
+            'Проверьте, что при массовом создании заполняется превью'
+        )
+        assert TimelineEntry.objects.filter(user=follow_2.user).count() == 2, (
+            'Проверьте, что при массовом создании посты попадают в ленты подписчиков'
+        )
+        assert client.get(group_url).json()['post_count'] == 1, (
+            'Проверьте, что массовое создание сбрасывает кеш ответов групп'
+        )
+
+        response = user_client.post('/api/v1/posts/bulk/', data=[{}], format='json')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_bulk_ndjson(self, user_client):
+        body = '\n'.join(json.dumps({'text': f'Пост {number}'}) for number in range(3))
+        response = user_client.post(
+            '/api/v1/posts/bulk/', data=body, content_type='application/x-ndjson'
+        )
+        assert response.status_code == 201, (
+            'Проверьте, что `/api/v1/posts/bulk/` принимает NDJSON'
+        )
+        assert Post.objects.count() == 3
+
+        response = user_client.post(
+            '/api/v1/posts/bulk/', data='{"text": 1}\nnot json', content_type='application/x-ndjson'
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ndjson_max_items(self, settings, user_client):
+        from io import BytesIO
+
+        from api.parsers import NDJSONParser
+        from rest_framework.exceptions import ParseError
+
+        settings.API_BULK_MAX_ITEMS = 2
+        body = '\n'.join(json.dumps({'text': f'Пост {number}'}) for number in range(3))
+        response = user_client.post(
+            '/api/v1/posts/bulk/', data=body, content_type='application/x-ndjson'
+        )
+        assert response.status_code == 400
+        assert not Post.objects.exists()
+
+        stream = BytesIO('\n'.join(['{"text": "Пост"}'] * 10000).encode())
+        with pytest.raises(ParseError):
+            NDJSONParser().parse(stream)
+        assert stream.tell() < len(stream.getvalue()) // 10, (
+            'Проверьте, что разбор NDJSON останавливается после API_BULK_MAX_ITEMS объектов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_bulk_delete(self, user_client, post, post_2, another_post):
+        response = user_client.delete(
+            '/api/v1/posts/bulk/', data=[post.id, another_post.id], format='json'
+        )
+        assert response.json() == {'deleted': 1}, (
+            'Проверьте, что массовое удаление удаляет только свои посты'
+        )
+        assert list(Post.objects.values_list('id', flat=True).order_by('id')) == [
+            post_2.id, another_post.id
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_bulk(self, user_client, post, comment_2_post):
+        url = f'/api/v1/posts/{post.id}/comments/bulk/'
+        response = user_client.post(url, data=[{'text': 'Раз'}, {'text': 'Два'}], format='json')
+        assert response.status_code == 201
+        post.refresh_from_db()
+        assert post.comment_count == 3, (
+            'Проверьте, что при массовом создании комментариев обновляется `Post.comment_count`'
+        )
+
+        ids = [item['id'] for item in response.json()['created']]
+        response = user_client.delete(url, data=ids + [comment_2_post.id], format='json')
+        assert response.json() == {'deleted': 2}
+        post.refresh_from_db()
+        assert post.comment_count == 1
+        assert Comment.objects.get().id == comment_2_post.id
+
+        assert user_client.post('/api/v1/posts/100500/comments/bulk/', data=[],
+                                format='json').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_bulk(self, user_client, user, user_2, another_user, follow_1):
+        data = [
+            {'following': user_2.username},
+            {'following': user.username},
+            {'following': user_2.username},
+        ]
+        response = user_client.post('/api/v1/follow/bulk/', data=data, format='json')
+        assert response.status_code == 201
+        test_data = response.json()
+        assert test_data['created'] == [{'index': 0, 'following': user_2.username}]
+        assert [item['index'] for item in test_data['errors']] == [1]
+        assert Follow.objects.filter(user=user).count() == 2
+
+        response = user_client.delete(
+            '/api/v1/follow/bulk/', data=[user_2.username, another_user.username], format='json'
+        )
+        assert response.json() == {'deleted': 2}, (
+            'Проверьте, что `/api/v1/follow/bulk/` отписывает от всех переданных авторов'
+        )
+        assert not Follow.objects.filter(user=user).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_not_auth(self, client, post):
+        response = client.post('/api/v1/posts/bulk/', data='[]', content_type='application/json')
+        assert response.status_code == 401
+        response = client.delete('/api/v1/follow/bulk/', data='[]', content_type='application/json')
+        assert response.status_code == 401
@@ -0,0 +1,179 @@
+import pytest
+from posts.models import Comment
+
+
+class TestResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_get_cached(self, client, django_assert_num_queries, post, group_1):
+        response = client.get('/api/v1/posts/')
+        assert response.status_code == 200
+
+        with django_assert_num_queries(0):
+            cached = client.get('/api/v1/posts/')
+        assert cached.status_code == 200
+        assert cached.content == response.content, (
+            'Проверьте, что из кеша отдается тот же ответ'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_invalidated_by_signals(self, client, user, post, group_1):
+        url = f'/api/v1/posts/{post.id}/comments/'
+        assert client.get(url).json() == []
+
+        Comment.objects.create(author=user, post=post, text='Коммент')
+        assert len(client.get(url).json()) == 1, (
+            'Проверьте, что кеш комментариев сбрасывается при создании комментария'
+        )
+        assert client.get('/api/v1/posts/').json()[0]['comments'] == 1, (
+            'Проверьте, что кеш постов сбрасывается при создании комментария'
+        )
+
+        group_1.title = 'Новое название'
+        group_1.save()
+        assert client.get(f'/api/v1/groups/{group_1.id}/').json()['title'] == group_1.title, (
+            'Проверьте, что кеш групп сбрасывается при изменении группы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_key_includes_host_and_scheme(self, settings, client, post, post_2):
+        settings.ALLOWED_HOSTS = ['testserver', 'example.com']
+        url = '/api/v1/posts/?limit=1&offset=0'
+        assert client.get(url).json()['next'].startswith('http://testserver/')
+        response = client.get(url, HTTP_HOST='example.com')
+        assert response.json()['next'].startswith('http://example.com/'), (
+            'Проверьте, что ответы с абсолютными ссылками кешируются отдельно для каждого хоста'
+        )
+        response = client.get(url, secure=True)
+        assert response.json()['next'].startswith('https://testserver/'), (
+            'Проверьте, что ответы кешируются отдельно для http и https'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidated_after_commit(self, user, post):
+        from api.cache import get_version
+        from django.db import transaction
+
+        version = get_version('comments')
+        with transaction.atomic():
+            Comment.objects.create(author=user, post=post, text='Коммент')
+            assert get_version('comments') == version, (
+                'Проверьте, что версия кеша увеличивается только после фиксации транзакции'
+            )
+        assert get_version('comments') > version
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_not_modified(self, client, post):
+        response = client.get(f'/api/v1/posts/{post.id}/')
+        etag = response['ETag']
+
+        response = client.get(f'/api/v1/posts/{post.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении If-None-Match возвращается статус 304'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authenticated_not_cached(self, user_client, client, post):
+        client.get('/api/v1/posts/')
+        response = user_client.get('/api/v1/posts/')
+        assert 'ETag' not in response, (
+            'Проверьте, что запросы с токеном не обслуживаются кешем'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_stats(self, client, admin_client, post, django_user_model):
+        client.get('/api/v1/posts/')
+        client.get('/api/v1/posts/')
+
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+        admin = django_user_model.objects.get(username='admin')
+        admin_api = APIClient()
+        admin_api.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}'
+        )
+        response = admin_api.get('/api/v1/cache/stats/')
+        assert response.status_code == 200
+        assert response.json() == {'hits': 1, 'misses': 1}
+
+        assert client.get('/api/v1/cache/stats/').status_code == 401
+
+
+class TestConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_not_modified(self, user_client, django_assert_num_queries, post):
+        url = f'/api/v1/posts/{post.id}/'
+        response = user_client.get(url)
+        etag = response['ETag']
+
+        # пользователь по токену уже в кеше, остается чтение версии поста
+        with django_assert_num_queries(1):
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            f'Проверьте, что при GET запросе `{url}` с актуальным If-None-Match возвращается статус 304'
+        )
+        assert not response.content
+
+        user_client.patch(url, data={'text': 'Поменяли текст'})
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения поста ETag меняется'
+        )
+        assert response.json()['text'] == 'Поменяли текст'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_not_modified(self, user_client, post, comment_1_post):
+        url = f'/api/v1/posts/{post.id}/comments/'
+        etag = user_client.get(url)['ETag']
+        assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        user_client.patch(f'{url}{comment_1_post.id}/', data={'text': 'Новый текст'})
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения комментария ETag списка комментариев меняется'
+        )
+        etag = response['ETag']
+
+        comment_1_post.delete()
+        assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что после удаления комментария ETag списка комментариев меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_related_changes(self, user_client, client, user, another_user,
+                             post, group_1, another_post):
+        from posts.models import Comment
+
+        Comment.objects.create(author=another_user, post=post, text='Коммент')
+        post_url = f'/api/v1/posts/{post.id}/'
+        comments_url = f'{post_url}comments/'
+        etags = [user_client.get(url)['ETag'] for url in (post_url, comments_url)]
+        assert client.get('/api/v1/posts/').status_code == 200
+
+        group_1.title = 'Новое название'
+        group_1.save()
+        response = user_client.get(post_url, HTTP_IF_NONE_MATCH=etags[0])
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения группы ETag поста меняется'
+        )
+        assert response.json()['group_info']['title'] == group_1.title
+
+        another_user.username = 'renamed'
+        another_user.save()
+        response = user_client.get(comments_url, HTTP_IF_NONE_MATCH=etags[1])
+        assert response.status_code == 200, (
+            'Проверьте, что после смены имени комментатора ETag комментариев меняется'
+        )
+        response = client.get('/api/v1/posts/')
+        assert {item['author'] for item in response.json()} == {
+            user.username, 'renamed'
+        }, 'Проверьте, что кеш списка постов сбрасывается при смене имени автора'
+
+        etag = user_client.get(post_url)['ETag']
+        group_1.delete()
+        response = user_client.get(post_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после удаления группы ETag поста меняется'
+        )
+        assert response.json()['group'] is None
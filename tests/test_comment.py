@@ -180,3 +180,50 @@ class TestCommentAPI:
             'Проверьте, что при DELETE запросе `/api/v1/posts/{post.id}/comments/{comment.id}/` '
             'для не своего комментария возвращаете статус 403'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_count(self, user_client, post, comment_1_post, comment_2_post, another_user):
+        post.refresh_from_db()
+        assert post.comment_count == 2, (
+            'Проверьте, что при создании комментария увеличивается `Post.comment_count`'
+        )
+
+        user_client.post(f'/api/v1/posts/{post.id}/comments/', data={'text': 'Новый коммент'})
+        post.refresh_from_db()
+        assert post.comment_count == 3, (
+            'Проверьте, что при POST запросе на `/api/v1/posts/{post.id}/comments/` '
+            'увеличивается `Post.comment_count`'
+        )
+
+        user_client.delete(f'/api/v1/posts/{post.id}/comments/{comment_1_post.id}/')
+        post.refresh_from_db()
+        assert post.comment_count == 2, (
+            'Проверьте, что при DELETE запросе на `/api/v1/posts/{post.id}/comments/{comment.id}/` '
+            'уменьшается `Post.comment_count`'
+        )
+
+        another_user.delete()
+        post.refresh_from_db()
+        assert post.comment_count == 1, (
+            'Проверьте, что при каскадном удалении комментариев уменьшается `Post.comment_count`'
+        )
+
+        user_client.patch(f'/api/v1/posts/{post.id}/', data={'text': 'Новый текст'})
+        post.refresh_from_db()
+        assert post.comment_count == 1, (
+            'Проверьте, что изменение поста не перезаписывает `Post.comment_count`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_comment_counts(self, post, another_post, comment_1_post, comment_2_post):
+        from django.core.management import call_command
+        from posts.models import Post
+
+        Post.objects.update(comment_count=10)
+        call_command('reconcile_comment_counts', batch_size=1)
+
+        post.refresh_from_db()
+        another_post.refresh_from_db()
+        assert (post.comment_count, another_post.comment_count) == (2, 0), (
+            'Проверьте, что команда `reconcile_comment_counts` исправляет расхождения счетчика'
+        )
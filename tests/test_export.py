@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+def read_ndjson(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+@pytest.fixture
+def admin_api(admin_user):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin_user).access_token}'
+    )
+    return client
+
+
+class TestExport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_permissions(self, client, user_client, admin_api):
+        assert client.get('/api/v1/export/posts/').status_code == 401
+        assert user_client.get('/api/v1/export/posts/').status_code == 403, (
+            'Проверьте, что выгрузка доступна только администратору'
+        )
+        assert admin_api.get('/api/v1/export/posts/').status_code == 200
+        assert client.get('/api/v1/export/users/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_posts(self, admin_api, post, post_2, another_post, comment_1_post):
+        response = admin_api.get('/api/v1/export/posts/')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдается потоком'
+        )
+        rows = read_ndjson(b''.join(response.streaming_content))
+        assert [row['id'] for row in rows] == [post.id, post_2.id, another_post.id]
+        assert rows[0] == {
+            'id': post.id,
+            'author': post.author.username,
+            'text': post.text,
+            'pub_date': rows[0]['pub_date'],
+            'group': post.group_id,
+            'comments': 1,
+        }
+
+        response = admin_api.get('/api/v1/export/posts/?group=group_2')
+        rows = read_ndjson(b''.join(response.streaming_content))
+        assert [row['id'] for row in rows] == [another_post.id], (
+            'Проверьте, что выгрузка фильтруется по slug группы'
+        )
+
+        response = admin_api.get(f'/api/v1/export/posts/?author={post.author.username}')
+        rows = read_ndjson(b''.join(response.streaming_content))
+        assert [row['id'] for row in rows] == [post.id, post_2.id]
+
+        response = admin_api.get('/api/v1/export/posts/?until=2000-01-01')
+        assert b''.join(response.streaming_content) == b''
+
+        assert admin_api.get('/api/v1/export/posts/?since=вчера').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_comments_gzip(self, admin_api, comment_1_post, comment_2_post,
+                                  comment_1_another_post):
+        response = admin_api.get(
+            '/api/v1/export/comments/?group=group_1', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что выгрузка сжимается, если клиент принимает gzip'
+        )
+        rows = read_ndjson(gzip.decompress(b''.join(response.streaming_content)))
+        assert [row['id'] for row in rows] == [comment_1_post.id, comment_2_post.id]
+        assert rows[1]['author'] == comment_2_post.author.username
+        assert rows[1]['post'] == comment_2_post.post_id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_command(self, tmp_path, post, another_post):
+        output = tmp_path / 'posts.ndjson.gz'
+        call_command(
+            'export_ndjson', 'posts', '--group', 'group_1', '--gzip',
+            '--output', str(output), '--chunk-size', '1'
+        )
+        rows = read_ndjson(gzip.decompress(output.read_bytes()))
+        assert [row['id'] for row in rows] == [post.id]
@@ -0,0 +1,61 @@
+import pytest
+from posts.models import Comment, Follow, Post
+from rest_framework.renderers import JSONRenderer
+
+
+class TestFastPath:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_identical(self, user, group_1):
+        from api.fastpath import PostListSerializer
+        from api.serializers import PostSerializer
+
+        Post.objects.create(text='Короткий пост', author=user, group=group_1)
+        Post.objects.create(text='Пост   без\n\tгруппы ', author=user)
+        Post.objects.create(text='слово ' * 100, author=user, group=group_1)
+        Post.objects.create(text='длинное' * 50, author=user)
+        Post.objects.create(text=' ', author=user)
+
+        queryset = Post.objects.order_by('id')
+        expected = JSONRenderer().render(PostSerializer(queryset, many=True).data)
+        rows = queryset.values(*PostListSerializer.values)
+        assert JSONRenderer().render(PostListSerializer(rows).data) == expected, (
+            'Проверьте, что быстрый путь для постов совпадает с PostSerializer'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_identical(self, comment_1_post, comment_2_post, comment_1_another_post):
+        from api.fastpath import CommentListSerializer
+        from api.serializers import CommentSerializer
+
+        queryset = Comment.objects.order_by('id')
+        expected = JSONRenderer().render(CommentSerializer(queryset, many=True).data)
+        rows = queryset.values(*CommentListSerializer.values)
+        assert JSONRenderer().render(CommentListSerializer(rows).data) == expected, (
+            'Проверьте, что быстрый путь для комментариев совпадает с CommentSerializer'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follows_identical(self, follow_1, follow_2, follow_3):
+        from api.fastpath import FollowListSerializer
+        from api.serializers import FollowSerializer
+
+        queryset = Follow.objects.order_by('id')
+        expected = JSONRenderer().render(FollowSerializer(queryset, many=True).data)
+        rows = queryset.values(*FollowListSerializer.values)
+        assert JSONRenderer().render(FollowListSerializer(rows).data) == expected, (
+            'Проверьте, что быстрый путь для подписок совпадает с FollowSerializer'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_endpoint_identical(self, settings, client, post, another_post, comment_1_post):
+        urls = ('/api/v1/posts/', '/api/v1/posts/?limit=1&offset=1',
+                '/api/v1/posts/?page_size=1', f'/api/v1/posts/{post.id}/comments/')
+        fast = [client.get(url).content for url in urls]
+
+        from django.core.cache import cache
+        cache.clear()
+        settings.API_FAST_LIST_SERIALIZATION = False
+        assert [client.get(url).content for url in urls] == fast, (
+            'Проверьте, что ответы со включенным быстрым путем не меняются'
+        )
@@ -0,0 +1,121 @@
+import pytest
+from posts.models import Follow, Post, TimelineEntry
+
+
+class TestFeedAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_not_auth(self, client):
+        response = client.get('/api/v1/feed/')
+        assert response.status_code == 401, (
+            'Проверьте, что `/api/v1/feed/` при GET запросе без токена возвращает статус 401'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_fan_out_on_write(self, user_client, user, user_2, another_user,
+                                   another_post, group_1):
+        user_client.post('/api/v1/follow/', data={'following': another_user.username})
+        assert TimelineEntry.objects.filter(user=user, post=another_post).exists(), (
+            'Проверьте, что при подписке в ленту добавляются последние посты автора'
+        )
+
+        new_post = Post.objects.create(text='Чужой пост', author=user_2)
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+        author_client = APIClient()
+        author_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(another_user).access_token}'
+        )
+        response = author_client.post('/api/v1/posts/', data={'text': 'Новый пост'})
+        assert response.status_code == 201
+
+        response = user_client.get('/api/v1/feed/?limit=1&offset=1')
+        assert response.status_code == 200
+        test_data = response.json()['results']
+        expected = [Post.objects.get(text='Новый пост').id, another_post.id]
+        assert [item['id'] for item in test_data] == expected, (
+            'Проверьте, что `/api/v1/feed/` возвращает посты авторов из подписок от новых к старым'
+        )
+        assert set(response.json()) == {'next', 'results'}, (
+            'Проверьте, что лента всегда пагинируется курсором, без LimitOffset'
+        )
+        assert new_post.id not in [item['id'] for item in test_data]
+
+        follow = Follow.objects.get(user=user, following=another_user)
+        user_client.delete(f'/api/v1/follow/{follow.id}/')
+        assert user_client.get('/api/v1/feed/').json()['results'] == [], (
+            'Проверьте, что после отписки посты автора пропадают из ленты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_uses_timeline_index(self, user_client, get_with_plan, user, another_user):
+        posts = [Post.objects.create(text=f'Пост {number}', author=another_user)
+                 for number in range(3)]
+        user_client.post('/api/v1/follow/', data={'following': another_user.username})
+
+        response, plan = get_with_plan(user_client, '/api/v1/feed/?page_size=2')
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [posts[2].id, posts[1].id]
+        assert 'timeline_user_pub_date_idx' in plan, plan
+        assert 'TEMP B-TREE' not in plan, (
+            'Проверьте, что лента сортируется по индексу ленты без временной сортировки: '
+            + plan
+        )
+
+        response, plan = get_with_plan(user_client, data['next'])
+        assert [item['id'] for item in response.json()['results']] == [posts[0].id], (
+            'Проверьте, что курсор ленты продолжает выдачу по колонкам ленты'
+        )
+        assert 'timeline_user_pub_date_idx' in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_fan_out_on_read(self, settings, user_client, user, another_user, another_post):
+        settings.FEED_FANOUT_LIMIT = 0
+        Follow.objects.create(user=user, following=another_user)
+        assert not TimelineEntry.objects.exists()
+
+        response = user_client.get('/api/v1/feed/?page_size=10')
+        assert [item['id'] for item in response.json()['results']] == [another_post.id], (
+            'Проверьте, что посты авторов с большим числом подписчиков попадают в ленту при чтении'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_refilled_below_limit(self, settings, user_client, user, user_2,
+                                       another_user, another_post):
+        settings.FEED_FANOUT_LIMIT = 1
+        Follow.objects.create(user=user, following=another_user)
+        follow = Follow.objects.create(user=user_2, following=another_user)
+        new_post = Post.objects.create(text='Новый пост', author=another_user)
+        assert not TimelineEntry.objects.exists()
+
+        follow.delete()
+        response = user_client.get('/api/v1/feed/')
+        assert [item['id'] for item in response.json()['results']] == [
+            new_post.id, another_post.id
+        ], (
+            'Проверьте, что посты автора раскладываются по лентам, когда подписчиков '
+            'снова становится не больше FEED_FANOUT_LIMIT'
+        )
+        assert TimelineEntry.objects.filter(user=user).count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fan_out_many_entries(self, another_user):
+        from django.contrib.auth import get_user_model
+        from posts import timeline
+
+        User = get_user_model()
+        followers = User.objects.bulk_create(
+            User(username=f'follower{number}') for number in range(200)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=follower, following=another_user)
+            for follower in User.objects.filter(username__startswith='follower')
+        )
+        posts = [Post.objects.create(text=f'Пост {number}', author=another_user)
+                 for number in range(3)]
+        TimelineEntry.objects.all().delete()
+        timeline.fan_out(*posts)
+        assert TimelineEntry.objects.count() == len(followers) * len(posts), (
+            'Проверьте, что раскладка по лентам не упирается в лимит параметров запроса'
+        )
@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class TestSparseFieldsets:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_fields(self, client, post, comment_1_post, comment_2_post):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/v1/posts/{post.id}/?fields=id,text')
+        assert response.status_code == 200
+        assert response.json() == {'id': post.id, 'text': post.text}, (
+            'Проверьте, что `?fields=` оставляет в ответе только выбранные поля'
+        )
+        sql = context.captured_queries[-1]['sql']
+        assert 'posts_comment' not in sql and 'auth_user' not in sql, (
+            'Проверьте, что невыбранные поля не читаются из базы'
+        )
+        assert '"posts_post"."group_id"' not in sql
+
+        response = client.get('/api/v1/posts/?fields=id,comments')
+        assert response.json() == [{'id': post.id, 'comments': 2}]
+
+        response = client.get('/api/v1/posts/?fields=id,unknown')
+        assert response.status_code == 400
+        assert 'fields' in response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_expand(self, client, django_assert_max_num_queries,
+                         post, post_2, comment_1_post, comment_2_post):
+        with django_assert_max_num_queries(2):
+            response = client.get('/api/v1/posts/?expand=comments,author,group')
+        assert response.status_code == 200
+        test_post = response.json()[0]
+        assert test_post['author'] == {
+            'id': post.author.id,
+            'username': post.author.username,
+            'first_name': '',
+            'last_name': '',
+        }, 'Проверьте, что `?expand=author` встраивает автора'
+        assert test_post['group']['slug'] == post.group.slug
+        assert [comment['text'] for comment in test_post['comments']] == [
+            comment_1_post.text, comment_2_post.text
+        ], 'Проверьте, что `?expand=comments` встраивает комментарии'
+        assert response.json()[1]['comments'] == []
+
+        response = client.get(f'/api/v1/posts/{post.id}/?fields=id,comments&expand=comments')
+        assert response.json()['comments'][1]['author'] == comment_2_post.author.username
+
+        response = client.get('/api/v1/posts/?expand=post')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_fields(self, client, post, comment_1_post):
+        url = f'/api/v1/posts/{post.id}/comments/'
+        response = client.get(f'{url}?fields=id,text')
+        assert response.json() == [{'id': comment_1_post.id, 'text': comment_1_post.text}]
+
+        response = client.get(f'{url}{comment_1_post.id}/?expand=author&fields=author')
+        assert response.json() == {'author': {
+            'id': comment_1_post.author.id,
+            'username': comment_1_post.author.username,
+            'first_name': '',
+            'last_name': '',
+        }}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fields_ignored_on_write(self, user_client, post):
+        response = user_client.patch(
+            f'/api/v1/posts/{post.id}/?fields=id', data={'text': 'Новый текст'}
+        )
+        assert response.status_code == 200
+        assert response.json()['text'] == 'Новый текст'
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from posts.models import Post
+
+
+class TestPostFilters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_filter_author(self, client, get_with_plan, post, post_2, another_post):
+        response, plan = get_with_plan(client, f'/api/v1/posts/?author={post.author.username}')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [post.id, post_2.id], (
+            'Проверьте, что `/api/v1/posts/?author=` возвращает посты автора'
+        )
+        assert 'post_author_pub_date_idx' in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+
+    @pytest.mark.django_db(transaction=True)
+    def test_filter_group(self, client, get_with_plan, django_assert_max_num_queries,
+                          post, another_post, group_2):
+        response, plan = get_with_plan(client, f'/api/v1/posts/?group={group_2.slug}')
+        assert [item['id'] for item in response.json()] == [another_post.id], (
+            'Проверьте, что `/api/v1/posts/?group=` возвращает посты группы по slug'
+        )
+        assert 'post_group_pub_date_idx' in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+
+        with django_assert_max_num_queries(2):
+            # id группы по slug берется из кеша, запросы — COUNT и выборка
+            client.get(f'/api/v1/posts/?group={group_2.slug}&limit=5')
+
+        response = client.get('/api/v1/posts/?group=unknown')
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_slug_cache_invalidation(self, client, another_post, group_2):
+        client.get(f'/api/v1/posts/?group={group_2.slug}')
+        group_2.slug = 'renamed'
+        group_2.save()
+        response = client.get('/api/v1/posts/?group=renamed')
+        assert [item['id'] for item in response.json()] == [another_post.id], (
+            'Проверьте, что кеш slug группы сбрасывается при изменении группы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_filter_dates(self, client, get_with_plan, user, post, post_2):
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=10)
+        )
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response, plan = get_with_plan(client, f'/api/v1/posts/?since={since}')
+        assert [item['id'] for item in response.json()] == [post_2.id], (
+            'Проверьте, что `since` отбирает посты, опубликованные не раньше даты'
+        )
+        assert 'post_pub_date_id_idx' in plan, plan
+
+        response, plan = get_with_plan(
+            client, f'/api/v1/posts/?author={user.username}&until={since}'
+        )
+        assert [item['id'] for item in response.json()] == [post.id]
+        assert 'post_author_pub_date_idx' in plan, plan
+
+        response = client.get('/api/v1/posts/?since=позавчера')
+        assert response.status_code == 400
+        assert 'since' in response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unindexed_combination(self, client, post, group_1):
+        response = client.get(
+            f'/api/v1/posts/?author={post.author.username}&group={group_1.slug}'
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что фильтры без подходящего индекса отклоняются'
+        )
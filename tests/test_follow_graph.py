@@ -0,0 +1,232 @@
+from io import StringIO
+
+import pytest
+from posts.models import Follow, FollowSummary
+
+
+def get_counts(user):
+    summary = FollowSummary.objects.get(user=user)
+    return summary.follower_count, summary.following_count
+
+
+class TestFollowGraph:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counts_follow_and_unfollow(self, user_client, user, user_2, another_user):
+        response = user_client.post('/api/v1/follow/', data={'following': another_user.username})
+        assert response.status_code == 201
+        assert get_counts(another_user) == (1, 0), (
+            'Проверьте, что подписка увеличивает количество подписчиков автора'
+        )
+        assert get_counts(user) == (0, 1), (
+            'Проверьте, что подписка увеличивает количество подписок пользователя'
+        )
+
+        Follow.objects.create(user=user_2, following=another_user)
+        assert get_counts(another_user) == (2, 0)
+
+        follow = Follow.objects.get(user=user, following=another_user)
+        response = user_client.delete(f'/api/v1/follow/{follow.id}/')
+        assert response.status_code == 204
+        assert get_counts(another_user) == (1, 0), (
+            'Проверьте, что отписка уменьшает количество подписчиков автора'
+        )
+        assert get_counts(user) == (0, 0)
+
+        user_2.delete()
+        assert get_counts(another_user) == (0, 0), (
+            'Проверьте, что подписки удаленного пользователя не учитываются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_and_rebuild(self, user_client, user, user_2, another_user):
+        from django.core.management import call_command
+
+        response = user_client.post('/api/v1/follow/bulk/', data=[
+            {'following': user_2.username}, {'following': another_user.username},
+        ], format='json')
+        assert response.status_code == 201
+        assert get_counts(user) == (0, 2), (
+            'Проверьте, что массовая подписка обновляет счетчики'
+        )
+        assert get_counts(user_2) == (1, 0)
+
+        response = user_client.delete(
+            '/api/v1/follow/bulk/', data=[user_2.username], format='json'
+        )
+        assert response.status_code == 200
+        assert get_counts(user) == (0, 1)
+        assert get_counts(user_2) == (0, 0)
+
+        FollowSummary.objects.update(follower_count=10, following_count=10)
+        call_command('rebuild_follow_summaries', stdout=StringIO())
+        assert get_counts(user) == (0, 1)
+        assert get_counts(another_user) == (1, 0)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_is_following_cached(self, user, user_2, another_user, follow_1,
+                                 django_assert_num_queries):
+        from posts import follow_graph
+
+        assert follow_graph.is_following(user.id, another_user.id)
+        with django_assert_num_queries(0):
+            assert follow_graph.is_following(user.id, another_user.id), (
+                'Проверьте, что множество подписок читается из кеша'
+            )
+            assert not follow_graph.is_following(user.id, user_2.id)
+
+        Follow.objects.create(user=user, following=user_2)
+        assert follow_graph.is_following(user.id, user_2.id), (
+            'Проверьте, что кеш подписок сбрасывается при подписке'
+        )
+        follow_1.delete()
+        assert not follow_graph.is_following(user.id, another_user.id), (
+            'Проверьте, что кеш подписок сбрасывается при отписке'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_followers_and_following(self, client, user, user_2, another_user,
+                                     follow_1, follow_3, follow_4,
+                                     django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/users/{another_user.username}/followers/')
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/users/{username}/followers/` доступен без токена'
+        )
+        data = response.json()
+        assert data['followers_count'] == 2
+        assert data['following_count'] == 1
+        assert [item['username'] for item in data['results']] == [
+            user.username, user_2.username
+        ], 'Проверьте, что возвращаются подписчики в порядке подписки'
+        assert data['next'] is None
+
+        response = client.get(
+            f'/api/v1/users/{another_user.username}/following/?page_size=1'
+        )
+        data = response.json()
+        assert [item['username'] for item in data['results']] == [user.username]
+
+        response = client.get(f'/api/v1/users/{another_user.username}/followers/?page_size=1')
+        data = response.json()
+        assert [item['username'] for item in data['results']] == [user.username]
+        assert data['next'] is not None, 'Проверьте, что список подписчиков постраничный'
+        data = client.get(data['next']).json()
+        assert [item['username'] for item in data['results']] == [user_2.username]
+
+        response = client.get('/api/v1/users/nobody/followers/')
+        assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counts_without_summary(self, client, user, user_2, another_user, follow_1):
+        from django.core.management import call_command
+        from posts import follow_graph
+
+        FollowSummary.objects.all().delete()
+        data = client.get(f'/api/v1/users/{user.username}/following/').json()
+        assert data['following_count'] == 0
+        assert not FollowSummary.objects.exists(), (
+            'Проверьте, что чтение счетчиков подписок не пишет в базу'
+        )
+        call_command('rebuild_follow_summaries', stdout=StringIO())
+        assert get_counts(user) == (0, 1)
+
+        FollowSummary.objects.filter(user=another_user).delete()
+        follow_graph.followed(Follow(user=user_2, following=another_user))
+        assert get_counts(another_user) == (1, 0), (
+            'Проверьте, что недостающая сводка создается при подписке'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_create_single_insert(self, user_client, user, another_user):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from posts import follow_graph
+
+        user_client.get('/api/v1/follow/')
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                '/api/v1/follow/', data={'following': another_user.username}
+            )
+        assert response.status_code == 201
+        assert response.json() == {
+            'user': user.username, 'following': another_user.username
+        }
+        sql = [query['sql'] for query in context.captured_queries]
+        insert = next(index for index, query in enumerate(sql)
+                      if query.startswith('INSERT INTO "posts_follow"'))
+        assert insert <= 2, (
+            'Проверьте, что перед INSERT подписки выполняется только '
+            'поиск автора, без проверок повтора'
+        )
+
+        # подписка появилась в обход сигналов, кеш графа ее не видит
+        Follow.objects.all().delete()
+        assert not follow_graph.is_following(user.id, another_user.id)
+        Follow.objects.bulk_create([Follow(user=user, following=another_user)])
+        response = user_client.post(
+            '/api/v1/follow/', data={'following': another_user.username}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что повтор подписки, пойманный ограничением '
+            'базы, возвращает статус 400'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Такая подписка уже есть.']
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_self_follow_constraint(self, user, another_user):
+        from posts import follow_graph
+
+        with pytest.raises(follow_graph.SelfFollowError):
+            follow_graph.follow(user.id, user.id)
+        follow, created = follow_graph.follow(user.id, another_user.id)
+        assert created and follow.pk is not None
+        follow, created = follow_graph.follow(user.id, another_user.id)
+        assert not created
+        assert Follow.objects.filter(user=user).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_put_and_delete(self, user_client, user, another_user, post):
+        from posts.models import TimelineEntry
+
+        url = f'/api/v1/users/{another_user.username}/follow/'
+        response = user_client.put(url)
+        assert response.status_code == 201, (
+            'Проверьте, что PUT на `/api/v1/users/{username}/follow/` '
+            'создает подписку и возвращает статус 201'
+        )
+        assert response.json() == {
+            'user': user.username, 'following': another_user.username
+        }
+        response = user_client.put(url)
+        assert response.status_code == 200, (
+            'Проверьте, что повторный PUT не создает подписку '
+            'и возвращает статус 200'
+        )
+        assert Follow.objects.filter(user=user).count() == 1
+        assert get_counts(another_user) == (1, 0)
+
+        TimelineEntry.objects.all().delete()
+        Follow.objects.all().delete()
+        post.author = another_user
+        post.save()
+        user_client.put(url)
+        assert TimelineEntry.objects.filter(user=user, post=post).exists(), (
+            'Проверьте, что подписка через PUT дополняет ленту'
+        )
+
+        response = user_client.put(f'/api/v1/users/{user.username}/follow/')
+        assert response.status_code == 400
+        assert response.json() == {
+            'following': ['Нельзя подписываться на самого себя.']
+        }
+        assert user_client.put('/api/v1/users/nobody/follow/').status_code == 404
+
+        assert user_client.delete(url).status_code == 204
+        assert not Follow.objects.filter(user=user).exists()
+        assert user_client.delete(url).status_code == 204, (
+            'Проверьте, что повторная отписка тоже возвращает статус 204'
+        )
+        assert get_counts(another_user) == (0, 0)
@@ -1,5 +1,12 @@
+from datetime import timedelta
+
 import pytest
-from posts.models import Group
+from api.fastpath import datetime_formatter
+from django.core.management import call_command
+from posts.models import Group, GroupSummary, Post
+
+# поля сводки по постам, которых нет в самой модели Group
+SUMMARY_FIELDS = {'post_count', 'last_post_at'}
 
 
 class TestGroupAPI:
@@ -93,7 +100,7 @@ class TestGroupAPI:
 
         g = Group.objects.filter(id=group_2.id)
         json_response = response.json()
-        for k in json_response:
+        for k in json_response.keys() - SUMMARY_FIELDS:
             assert k in g.values()[0] and json_response[k] == g.values()[0][k], (
                 'Проверьте, что при GET запросе на `/api/v1/groups/{id}/` '
                 'возвращается информация о соответствующем сообществе'
@@ -105,8 +112,54 @@ class TestGroupAPI:
         )
         g = Group.objects.filter(id=group_1.id)
         json_response = response.json()
-        for k in json_response:
+        for k in json_response.keys() - SUMMARY_FIELDS:
             assert k in g.values()[0] and json_response[k] == g.values()[0][k], (
                 'Проверьте, что при GET запросе на `/api/v1/groups/{id}/` '
                 'возвращается информация о соответствующем сообществе'
             )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_summaries(self, client, django_assert_num_queries, user,
+                             post, post_2, another_post, group_1, group_2):
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/groups/')
+        test_data = {group['id']: group for group in response.json()}
+        assert test_data[group_1.id]['post_count'] == 2, (
+            'Проверьте, что список групп возвращает количество постов `post_count`'
+        )
+        assert test_data[group_1.id]['last_post_at'] == (
+            datetime_formatter()(post_2.pub_date)
+        ), 'Проверьте, что список групп возвращает дату последнего поста `last_post_at`'
+
+        post.group = group_2
+        post.save()
+        post_2.delete()
+        response = client.get(f'/api/v1/groups/{group_1.id}/')
+        assert response.json()['post_count'] == 0, (
+            'Проверьте, что сводка обновляется при переносе и удалении постов'
+        )
+        assert response.json()['last_post_at'] is None
+        response = client.get(f'/api/v1/groups/{group_2.id}/')
+        assert response.json()['post_count'] == 2
+
+        group_2.delete()
+        assert Post.objects.filter(group__isnull=True).count() == 2
+        assert not GroupSummary.objects.filter(group_id=group_2.id).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_group_summaries(self, user, post, post_2, group_1):
+        Post.objects.filter(pk=post.pk).update(
+            group=None, pub_date=post.pub_date - timedelta(days=1)
+        )
+        GroupSummary.objects.all().delete()
+        call_command('rebuild_group_summaries')
+        summary = GroupSummary.objects.get(group=group_1)
+        assert summary.post_count == 1
+        assert summary.last_post_at == post_2.pub_date
+
+        GroupSummary.objects.all().delete()
+        new_post = Post.objects.create(text='Новый пост', author=user, group=group_1)
+        summary = GroupSummary.objects.get(group=group_1)
+        assert summary.last_post_at == new_post.pub_date, (
+            'Проверьте, что недостающая сводка группы создается при публикации'
+        )
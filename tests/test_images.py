@@ -0,0 +1,119 @@
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+def make_image(width, height, name='photo.jpg', image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), (200, 100, 50)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.POST_IMAGE_WORKERS = 0
+    settings.POST_IMAGE_WIDTHS = (320, 640, 1280)
+    return tmp_path
+
+
+class TestImageDerivatives:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_upload_builds_derivatives(self, user_client, media_root):
+        from posts.images import derivative_name, get_format
+        from posts.models import Post
+
+        response = user_client.post(
+            '/api/v1/posts/', data={'text': 'С картинкой', 'image': make_image(1000, 500)},
+            format='multipart'
+        )
+        assert response.status_code == 201, (
+            'Проверьте, что POST запрос с картинкой создает пост'
+        )
+        post = Post.objects.get(pk=response.json()['id'])
+        assert post.image_widths == '320,640', (
+            'Проверьте, что строятся копии только уже оригинала'
+        )
+        image_format, _ = get_format()
+        for width in (320, 640):
+            path = os.path.join(media_root, derivative_name(post.image.name, width))
+            with Image.open(path) as derivative:
+                assert derivative.width == width
+                assert derivative.height == width // 2
+                assert derivative.format == image_format
+
+        data = user_client.get(f'/api/v1/posts/{post.id}/').json()
+        assert data['image'] == f'http://testserver/media/{post.image.name}'
+        assert list(data['images']) == ['320', '640'], (
+            'Проверьте, что `images` содержит адреса копий по ширине'
+        )
+        assert data['images']['320'].startswith('http://testserver/media/posts/derivatives/')
+
+        listed = user_client.get('/api/v1/posts/').json()[0]
+        assert listed['image'] == data['image']
+        assert listed['images'] == data['images'], (
+            'Проверьте, что быстрый путь списка отдает те же адреса копий'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update_keeps_and_replace_resets(self, user_client, media_root):
+        from posts.models import Post
+
+        post_id = user_client.post(
+            '/api/v1/posts/', data={'text': 'С картинкой', 'image': make_image(700, 700)},
+            format='multipart'
+        ).json()['id']
+        assert Post.objects.get(pk=post_id).image_widths == '320,640'
+
+        response = user_client.patch(f'/api/v1/posts/{post_id}/', data={'text': 'Новый'})
+        assert response.status_code == 200
+        assert Post.objects.get(pk=post_id).image_widths == '320,640', (
+            'Проверьте, что изменение текста не сбрасывает копии картинки'
+        )
+
+        response = user_client.patch(
+            f'/api/v1/posts/{post_id}/', data={'image': make_image(400, 200, 'small.jpg')},
+            format='multipart'
+        )
+        assert response.status_code == 200
+        post = Post.objects.get(pk=post_id)
+        assert post.image.name.startswith('posts/small')
+        assert post.image_widths == '320', (
+            'Проверьте, что новая картинка получает свои копии'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_image(self, user_client, media_root):
+        data = user_client.post('/api/v1/posts/', data={'text': 'Без картинки'}).json()
+        assert data['image'] is None
+        assert data['images'] == {}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_worker_pool(self, user, media_root, settings):
+        from posts import images
+        from posts.models import Post
+
+        settings.POST_IMAGE_WORKERS = 1
+        post = Post.objects.create(text='В пуле', author=user, image=make_image(800, 600))
+        # задачи пула выполняются по порядку, пустая задача ждет построения копий
+        images.get_executor().submit(lambda: None).result(timeout=30)
+        post.refresh_from_db()
+        assert post.image_widths == '320,640'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_replaced_before_processing(self, user, media_root):
+        from posts import images
+        from posts.models import Post
+
+        post = Post.objects.create(text='Пост', author=user, image=make_image(800, 600))
+        old_name = post.image.name
+        post.image = make_image(500, 500, 'new.jpg')
+        post.save()
+        # задача для старой картинки не записывает ее ширины новой
+        images.process(post.pk, old_name)
+        post.refresh_from_db()
+        assert post.image_widths == '320'
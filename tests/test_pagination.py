@@ -0,0 +1,76 @@
+import base64
+import json
+
+import pytest
+from posts.models import Comment, Follow, Post
+
+
+class TestKeysetPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_cursor_pagination(self, client, user, group_1):
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=user, group=group_1)
+            for number in range(5)
+        ]
+
+        response = client.get('/api/v1/posts/?page_size=2')
+        assert response.status_code == 200
+        test_data = response.json()
+        assert 'count' not in test_data, (
+            'Проверьте, что курсорная пагинация не считает общее количество постов'
+        )
+        assert [item['id'] for item in test_data['results']] == [posts[4].id, posts[3].id], (
+            'Проверьте, что курсорная пагинация отдает посты от новых к старым'
+        )
+
+        # новый пост не должен сдвигать уже выданные страницы
+        Post.objects.create(text='Свежий пост', author=user, group=group_1)
+        seen = [item['id'] for item in test_data['results']]
+        while test_data['next']:
+            test_data = client.get(test_data['next']).json()
+            seen.extend(item['id'] for item in test_data['results'])
+        assert seen == [post.id for post in reversed(posts)], (
+            'Проверьте, что при курсорной пагинации посты не повторяются и не пропускаются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_cursor(self, client, post):
+        response = client.get('/api/v1/posts/?cursor=not-a-cursor')
+        assert response.status_code == 404, (
+            'Проверьте, что при неверном курсоре возвращается статус 404'
+        )
+
+        for payload in ([None, None], {'a': 1}, 5, [[1], 2], [post.id]):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = client.get(f'/api/v1/posts/?cursor={cursor}')
+            assert response.status_code == 404, (
+                f'Проверьте, что курсор {payload} отклоняется со статусом 404'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_cursor_pagination(self, client, post, user):
+        comments = [
+            Comment.objects.create(author=user, post=post, text=f'Коммент {number}')
+            for number in range(3)
+        ]
+        url = f'/api/v1/posts/{post.id}/comments/'
+
+        assert type(client.get(url).json()) == list, (
+            f'Проверьте, что без параметров пагинации `{url}` возвращает список'
+        )
+
+        test_data = client.get(f'{url}?page_size=2').json()
+        assert [item['id'] for item in test_data['results']] == [comments[0].id, comments[1].id]
+        test_data = client.get(test_data['next']).json()
+        assert [item['id'] for item in test_data['results']] == [comments[2].id]
+        assert test_data['next'] is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_cursor_pagination(self, user_client, follow_1, follow_5):
+        test_data = user_client.get('/api/v1/follow/?page_size=1').json()
+        assert len(test_data['results']) == 1
+        test_data = user_client.get(test_data['next']).json()
+        assert len(test_data['results']) == 1
+        assert test_data['next'] is None
+        assert Follow.objects.count() == 2
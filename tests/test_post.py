@@ -230,3 +230,35 @@ class TestPostAPI:
         assert response.status_code == 403, (
             'Проверьте, что при DELETE запросе `/api/v1/posts/{id}/` для не своей статьи возвращаете статус 403'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_preview(self, user_client, user):
+        import textwrap
+
+        texts = (
+            'Короткий пост',
+            '  Пост\n\nс   лишними\tпробелами  ',
+            'слово ' * 50,
+            'оченьдлинноеслово' * 10,
+            'а' * 100,
+            'а' * 99 + ' б',
+        )
+        for text in texts:
+            post = Post.objects.create(text=text, author=user)
+            assert post.preview == textwrap.shorten(text, width=100), (
+                'Проверьте, что `Post.preview` совпадает с textwrap.shorten(text, width=100)'
+            )
+
+        post.text = 'Новый текст поста'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        assert post.preview == 'Новый текст поста', (
+            'Проверьте, что `Post.preview` пересчитывается при изменении текста'
+        )
+
+        response = user_client.get('/api/v1/posts/')
+        assert [item['text'] for item in response.json()] == [
+            textwrap.shorten(post.text, width=100) for post in Post.objects.order_by('id')
+        ], (
+            'Проверьте, что при GET запросе на `/api/v1/posts/` текст постов сокращается до 100 символов'
+        )
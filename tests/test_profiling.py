@@ -0,0 +1,91 @@
+import json
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def profile_log(settings, caplog):
+    settings.API_PROFILING_SAMPLE_RATE = 1.0
+    logger = logging.getLogger('api.profiling')
+    logger.addHandler(caplog.handler)
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def get_lines(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records
+            if record.name == 'api.profiling']
+
+
+class TestProfiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing_and_log(self, client, profile_log, post, comment_1_post):
+        response = client.get('/api/v1/posts/?limit=5')
+        assert response.status_code == 200
+        timing = response['Server-Timing']
+        for name in ('db', 'auth', 'paginate', 'serialize', 'render', 'total'):
+            assert f'{name};dur=' in timing, (
+                f'Проверьте, что заголовок Server-Timing содержит этап `{name}`'
+            )
+
+        line, = get_lines(profile_log)
+        assert line['method'] == 'GET'
+        assert line['path'] == '/api/v1/posts/'
+        assert line['status'] == 200
+        # COUNT и страница постов
+        assert line['queries'] == 2
+        assert line['phases_sql_ms']['paginate'] == pytest.approx(line['sql_ms'], abs=0.05), (
+            'Проверьте, что запросы выборки учитываются в этапе paginate'
+        )
+        assert line['duplicates'] == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_detail_phases(self, client, profile_log, post, comment_1_post):
+        response = client.get(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 200
+        line, = get_lines(profile_log)
+        # версия для ETag, пост и id комментариев
+        assert line['queries'] == 3
+        assert set(line['phases_ms']) >= {'auth', 'queryset', 'serialize', 'render'}
+        assert line['duration_ms'] >= line['sql_ms']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sampling_off(self, client, settings, caplog, post):
+        settings.API_PROFILING_SAMPLE_RATE = 0
+        response = client.get('/api/v1/posts/')
+        assert response.status_code == 200
+        assert not response.has_header('Server-Timing'), (
+            'Проверьте, что без выборки запрос не профилируется'
+        )
+        assert get_lines(caplog) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_duplicates(self, settings, post, another_post):
+        from api.profiling import RequestProfile
+        from django.db import connection
+        from posts.models import Post
+
+        settings.API_PROFILING_DUPLICATE_THRESHOLD = 2
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile.execute):
+            # N+1: один и тот же запрос на каждый пост, IN с разной длиной
+            for pk in (post.id, another_post.id):
+                list(Post.objects.filter(pk=pk))
+            list(Post.objects.filter(pk__in=[post.id]))
+            list(Post.objects.filter(pk__in=[post.id, another_post.id]))
+        assert profile.queries == 4
+        duplicates = profile.get_duplicates()
+        assert [item['count'] for item in duplicates] == [2, 2], (
+            'Проверьте, что повторы запросов группируются без учета параметров'
+        )
+        assert 'IN (...)' in duplicates[1]['sql']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_headers_can_be_disabled(self, client, profile_log, settings, post):
+        settings.API_PROFILING_SERVER_TIMING = False
+        response = client.get('/api/v1/groups/')
+        assert response.status_code == 200
+        assert not response.has_header('Server-Timing')
+        assert len(get_lines(profile_log)) == 1
@@ -0,0 +1,249 @@
+import pytest
+from posts.models import Comment, Follow, Post
+
+
+def create_posts(author, group, commentator, count):
+    posts = []
+    for number in range(count):
+        post = Post.objects.create(
+            text=f'Пост номер {number}', author=author, group=group
+        )
+        Comment.objects.create(author=commentator, post=post, text='Коммент')
+        Comment.objects.create(author=author, post=post, text='Коммент 2')
+        posts.append(post)
+    return posts
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('size', [1, 5, 20])
+    def test_posts_list_query_budget(self, client, django_assert_max_num_queries,
+                                     user, another_user, group_1, size):
+        create_posts(user, group_1, another_user, size)
+
+        with django_assert_max_num_queries(1):
+            response = client.get('/api/v1/posts/')
+        assert response.status_code == 200
+        assert len(response.json()) == size, (
+            'Проверьте, что при GET запросе на `/api/v1/posts/` возвращается весь список статей'
+        )
+        assert response.json()[0]['comments'] == 2, (
+            'Проверьте, что `comments` сериализатора модели Post возвращает количество комментариев'
+        )
+
+        with django_assert_max_num_queries(2):
+            response = client.get(f'/api/v1/posts/?limit={size}&offset=0')
+        assert len(response.json()['results']) == size
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('size', [1, 5, 20])
+    def test_post_detail_query_budget(self, client, django_assert_max_num_queries,
+                                      user, another_user, group_1, size):
+        post = create_posts(user, group_1, another_user, 1)[0]
+        for _ in range(size):
+            Comment.objects.create(author=another_user, post=post, text='Коммент')
+
+        # первый запрос читает версию поста для ETag
+        with django_assert_max_num_queries(3):
+            response = client.get(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 200
+        assert len(response.json()['comments']) == size + 2, (
+            'Проверьте, что `comments` сериализатора поста возвращает список комментариев'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('size', [1, 5, 20])
+    def test_comments_list_query_budget(self, client, django_assert_max_num_queries,
+                                        user, another_user, group_1, size):
+        post = create_posts(user, group_1, another_user, 1)[0]
+        for _ in range(size):
+            Comment.objects.create(author=another_user, post=post, text='Коммент')
+
+        # версия поста для ETag, она же проверка поста, и комментарии
+        with django_assert_max_num_queries(2):
+            response = client.get(f'/api/v1/posts/{post.id}/comments/')
+        assert response.status_code == 200
+        assert len(response.json()) == size + 2
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('size', [1, 5, 20])
+    def test_follow_list_query_budget(self, user_client, django_assert_max_num_queries,
+                                      django_user_model, user, size):
+        for number in range(size):
+            following = django_user_model.objects.create_user(
+                username=f'Author{number}', password='1234567'
+            )
+            Follow.objects.create(user=user, following=following)
+
+        # один запрос уходит на получение пользователя по токену
+        with django_assert_max_num_queries(2):
+            response = user_client.get('/api/v1/follow/')
+        assert response.status_code == 200
+        assert len(response.json()) == size
+
+
+class TestWriteQueryBudget:
+    """
+    Права на изменение проверяются по author_id в том же запросе,
+    которым читается объект, без загрузки автора.
+    """
+
+    @pytest.fixture
+    def owner_client(self, user):
+        from api.authentication import get_token, user_cache
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        token = get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # запись для проверки пользователя при записи уже в кеше,
+        # как у активного клиента; промах кеша — еще один запрос
+        user_cache.get(user.pk)
+        return client
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('method', ['put', 'patch'])
+    def test_post_update_query_budget(self, owner_client, django_assert_max_num_queries,
+                                      user, another_user, group_1, method):
+        post = create_posts(user, group_1, another_user, 1)[0]
+
+        # пост с автором и группой, UPDATE, поисковый индекс (2),
+        # версия после UPDATE и комментарии для ответа
+        with django_assert_max_num_queries(6):
+            response = getattr(owner_client, method)(
+                f'/api/v1/posts/{post.id}/', data={'text': 'Новый текст'}
+            )
+        assert response.status_code == 200
+        assert response.json()['text'] == 'Новый текст'
+        assert len(response.json()['comments']) == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_delete_query_budget(self, owner_client, django_assert_max_num_queries,
+                                      user, another_user, group_1):
+        post = create_posts(user, group_1, another_user, 1)[0]
+
+        # пост, комментарии для сигналов, ответы на них, записи ленты
+        # одним DELETE, по два запроса сигналов на каждый из двух
+        # комментариев, удаление поста, поисковый индекс и сводка группы
+        with django_assert_max_num_queries(13):
+            response = owner_client.delete(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 204
+        assert not Post.objects.filter(pk=post.id).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('method', ['put', 'patch', 'delete'])
+    def test_post_foreign_query_budget(self, owner_client, django_assert_num_queries,
+                                       user, another_user, group_1, method):
+        post = create_posts(another_user, group_1, user, 1)[0]
+
+        # поиск своего поста и проверка, что чужой пост существует
+        with django_assert_num_queries(2):
+            response = getattr(owner_client, method)(
+                f'/api/v1/posts/{post.id}/', data={'text': 'Чужой'}
+            )
+        assert response.status_code == 403, (
+            'Проверьте, что изменение чужого поста возвращает статус 403'
+        )
+        with django_assert_num_queries(2):
+            response = getattr(owner_client, method)(
+                f'/api/v1/posts/{post.id + 100}/', data={'text': 'Нет'}
+            )
+        assert response.status_code == 404, (
+            'Проверьте, что изменение несуществующего поста возвращает статус 404'
+        )
+        post.refresh_from_db()
+        assert post.text != 'Чужой'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('method', ['put', 'patch'])
+    def test_comment_update_query_budget(self, owner_client, django_assert_max_num_queries,
+                                         user, another_user, group_1, method):
+        post = create_posts(another_user, group_1, user, 1)[0]
+        comment = post.comments.get(author=user)
+
+        # комментарий с автором, UPDATE, версия поста, поисковый индекс (2)
+        with django_assert_max_num_queries(5):
+            response = getattr(owner_client, method)(
+                f'/api/v1/posts/{post.id}/comments/{comment.id}/',
+                data={'text': 'Новый текст'}
+            )
+        assert response.status_code == 200
+        assert response.json()['text'] == 'Новый текст'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_delete_query_budget(self, owner_client, django_assert_max_num_queries,
+                                         user, another_user, group_1):
+        post = create_posts(another_user, group_1, user, 1)[0]
+        comment = post.comments.get(author=user)
+
+        # комментарий, ответы на него, транзакция, DELETE, счетчик поста,
+        # поисковый индекс
+        with django_assert_max_num_queries(6):
+            response = owner_client.delete(
+                f'/api/v1/posts/{post.id}/comments/{comment.id}/'
+            )
+        assert response.status_code == 204
+        assert not Comment.objects.filter(pk=comment.id).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_create_query_budget(self, owner_client, django_assert_max_num_queries,
+                                         user, another_user, group_1):
+        post = create_posts(another_user, group_1, user, 1)[0]
+
+        # проверка поста, транзакция, INSERT, путь в дереве ответов,
+        # счетчик поста, поисковый индекс (2) и автор для ответа;
+        # пост не читается
+        with django_assert_max_num_queries(8):
+            response = owner_client.post(
+                f'/api/v1/posts/{post.id}/comments/', data={'text': 'Новый'}
+            )
+        assert response.status_code == 201
+        assert response.json()['post'] == post.id
+
+        with django_assert_max_num_queries(1):
+            response = owner_client.post(
+                f'/api/v1/posts/{post.id + 100}/comments/', data={'text': 'Нет'}
+            )
+        assert response.status_code == 404, (
+            'Проверьте, что комментарий к несуществующему посту возвращает статус 404'
+        )
+        assert not Comment.objects.filter(text='Нет').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_list_missing_post(self, client, django_assert_max_num_queries,
+                                       user, group_1, another_user):
+        post = Post.objects.create(text='Без комментариев', author=user)
+
+        with django_assert_max_num_queries(2):
+            response = client.get(f'/api/v1/posts/{post.id}/comments/')
+        assert response.status_code == 200
+        assert response.json() == []
+
+        with django_assert_max_num_queries(2):
+            response = client.get(f'/api/v1/posts/{post.id + 100}/comments/')
+        assert response.status_code == 404, (
+            'Проверьте, что комментарии несуществующего поста возвращают статус 404'
+        )
+        response = client.get(f'/api/v1/posts/{post.id + 100}/comments/?limit=5')
+        assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('method', ['put', 'patch', 'delete'])
+    def test_comment_foreign_query_budget(self, owner_client, django_assert_num_queries,
+                                          user, another_user, group_1, method):
+        post = create_posts(user, group_1, another_user, 1)[0]
+        comment = post.comments.get(author=another_user)
+
+        # поиск своего комментария и проверка существования чужого,
+        # пост не читается
+        with django_assert_num_queries(2):
+            response = getattr(owner_client, method)(
+                f'/api/v1/posts/{post.id}/comments/{comment.id}/',
+                data={'text': 'Чужой'}
+            )
+        assert response.status_code == 403, (
+            'Проверьте, что изменение чужого комментария возвращает статус 403'
+        )
+        comment.refresh_from_db()
+        assert comment.text == 'Коммент'
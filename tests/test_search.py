@@ -0,0 +1,101 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from posts import search
+from posts.models import Comment, Post
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_search(self, client, user, group_1):
+        first = Post.objects.create(text='Котики и собаки', author=user)
+        second = Post.objects.create(
+            text='Котики, котики, котики ' * 10, author=user, group=group_1
+        )
+        Post.objects.create(text='Только собаки', author=user)
+
+        response = client.get('/api/v1/posts/?search=котики')
+        assert response.status_code == 200
+        test_data = response.json()
+        assert [post['id'] for post in test_data] == [second.id, first.id], (
+            'Проверьте, что поиск возвращает подходящие посты по убыванию релевантности'
+        )
+        assert '<mark>Котики</mark>' in test_data[1]['highlight'], (
+            'Проверьте, что в результатах поиска подсвечиваются совпадения'
+        )
+        assert test_data[0]['group_info'] == {'id': group_1.id, 'title': group_1.title}
+
+        response = client.get('/api/v1/posts/?search=соба')
+        assert len(response.json()) == 2, (
+            'Проверьте, что последнее слово запроса ищется как префикс'
+        )
+        response = client.get('/api/v1/posts/?search=котики собаки')
+        assert [post['id'] for post in response.json()] == [first.id]
+        response = client.get('/api/v1/posts/?search="*)')
+        assert response.json() == []
+
+        response = client.get('/api/v1/posts/?search=котики&limit=1&offset=0')
+        assert response.json()['count'] == 2
+        assert response.json()['results'][0]['id'] == second.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_highlight_escaped(self, client, settings, user):
+        Post.objects.create(text='<img src=x onerror=alert(1)> котики', author=user)
+
+        # быстрый путь списка и сериализатор PostSearchSerializer
+        for fast in (True, False):
+            settings.API_FAST_LIST_SERIALIZATION = fast
+            cache.clear()
+            highlight = client.get('/api/v1/posts/?search=котики').json()[0]['highlight']
+            assert '<img' not in highlight and '&lt;img' in highlight, (
+                'Проверьте, что текст поста в подсветке экранируется'
+            )
+            assert '<mark>котики</mark>' in highlight
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_serializers_match(self, client, settings, user):
+        Post.objects.create(text='Поиск по постам', author=user)
+        url = '/api/v1/posts/?search=поиск'
+        fast = client.get(url).content
+        settings.API_FAST_LIST_SERIALIZATION = False
+        assert client.get(url).content == fast
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_index_sync(self, user_client, post, comment_1_post):
+        response = user_client.patch(
+            f'/api/v1/posts/{post.id}/', data={'text': 'Новый текст'}
+        )
+        assert response.status_code == 200
+        assert list(search.search(Post.objects.all(), 'новый')) == [post], (
+            'Проверьте, что индекс обновляется при изменении поста'
+        )
+        assert not search.search(Post.objects.all(), 'тестовый').exists()
+
+        assert list(search.search(Comment.objects.all(), 'коммент')) == [
+            comment_1_post
+        ]
+        post.delete()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT count(*) FROM posts_comment_search WHERE rowid = %s',
+                    [comment_1_post.id]
+                )
+                assert cursor.fetchone() == (0,), (
+                    'Проверьте, что удаленные записи убираются из индекса'
+                )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_bulk_and_rebuild(self, user_client):
+        response = user_client.post(
+            '/api/v1/posts/bulk/', data=[{'text': 'Массовый пост'}], format='json'
+        )
+        assert response.status_code == 201
+        assert search.search(Post.objects.all(), 'массовый').count() == 1
+
+        Post.objects.update(text='Обновлено в обход сигналов')
+        assert search.search(Post.objects.all(), 'обход').count() == 0
+        call_command('rebuild_search_index')
+        assert search.search(Post.objects.all(), 'обход').count() == 1
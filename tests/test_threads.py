@@ -0,0 +1,131 @@
+import pytest
+from posts.models import Comment
+
+
+def reply(client, post, parent, text='Ответ'):
+    response = client.post(
+        f'/api/v1/posts/{post.id}/comments/',
+        data={'text': text, 'parent': parent.id}
+    )
+    assert response.status_code == 201, response.json()
+    return Comment.objects.get(pk=response.json()['id'])
+
+
+def ids(nodes):
+    return [(node['id'], ids(node['replies'])) for node in nodes]
+
+
+class TestCommentThreads:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_replies(self, user_client, post, comment_1_post, comment_2_post,
+                     comment_1_another_post):
+        answer = reply(user_client, post, comment_1_post)
+        nested = reply(user_client, post, answer)
+        assert (answer.depth, nested.depth) == (1, 2)
+        assert nested.path.startswith(answer.path), (
+            'Проверьте, что путь ответа начинается с пути родителя'
+        )
+        comment_1_post.refresh_from_db()
+        assert comment_1_post.reply_count == 1, (
+            'Проверьте, что ответ увеличивает счетчик ответов родителя'
+        )
+
+        data = user_client.get(f'/api/v1/posts/{post.id}/comments/').json()
+        assert {item['id']: item['parent'] for item in data}[nested.id] == answer.id, (
+            'Проверьте, что в списке комментариев есть поле `parent`'
+        )
+
+        response = user_client.post(f'/api/v1/posts/{post.id}/comments/', data={
+            'text': 'Ответ', 'parent': comment_1_another_post.id
+        })
+        assert response.status_code == 400, (
+            'Проверьте, что нельзя ответить на комментарий другого поста'
+        )
+        response = user_client.patch(
+            f'/api/v1/posts/{post.id}/comments/{nested.id}/',
+            data={'parent': comment_1_post.id}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что комментарий нельзя перенести в другую ветку'
+        )
+        response = user_client.patch(
+            f'/api/v1/posts/{post.id}/comments/{nested.id}/',
+            data={'text': 'Новый текст'}
+        )
+        assert response.status_code == 200
+        nested.refresh_from_db()
+        assert (nested.path, nested.depth) == (answer.path + nested.path[-10:], 2)
+
+        response = user_client.delete(f'/api/v1/posts/{post.id}/comments/{answer.id}/')
+        assert response.status_code == 204
+        assert not Comment.objects.filter(pk=nested.id).exists(), (
+            'Проверьте, что ответы удаляются вместе с комментарием'
+        )
+        comment_1_post.refresh_from_db()
+        post.refresh_from_db()
+        assert comment_1_post.reply_count == 0
+        assert post.comment_count == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_tree(self, user_client, client, post, comment_1_post, comment_2_post,
+                  django_assert_num_queries):
+        first = reply(user_client, post, comment_1_post)
+        first_nested = reply(user_client, post, first)
+        second = reply(user_client, post, comment_1_post)
+        url = f'/api/v1/posts/{post.id}/comments/tree/'
+
+        data = client.get(url).json()
+        assert ids(data['results']) == [
+            (comment_1_post.id, [(first.id, [(first_nested.id, [])]), (second.id, [])]),
+            (comment_2_post.id, []),
+        ], 'Проверьте, что дерево комментариев вложено в `replies` в порядке добавления'
+        assert data['next'] is None
+
+        data = client.get(url + '?depth=0').json()
+        assert ids(data['results']) == [(comment_1_post.id, []), (comment_2_post.id, [])]
+        assert data['results'][0]['reply_count'] == 2, (
+            'Проверьте, что у обрезанной ветки виден счетчик ответов'
+        )
+
+        with django_assert_num_queries(2):
+            response = client.get(url + f'?root={first.id}&depth=1&page_size=10')
+        assert ids(response.json()['results']) == [(first.id, [(first_nested.id, [])])], (
+            'Проверьте, что ветка комментария читается одним запросом'
+        )
+        data = client.get(url + f'?root={comment_1_post.id}&depth=1').json()
+        assert ids(data['results']) == [(comment_1_post.id, [(first.id, []), (second.id, [])])]
+
+        data = client.get(url + '?page_size=2').json()
+        assert ids(data['results']) == [(comment_1_post.id, [(first.id, [])])]
+        data = client.get(data['next']).json()
+        assert ids(data['results']) == [(first_nested.id, []), (second.id, [])], (
+            'Проверьте, что продолжение ветки выводится на верхнем уровне'
+        )
+        assert [node['parent'] for node in data['results']] == [first.id, comment_1_post.id]
+        data = client.get(data['next']).json()
+        assert ids(data['results']) == [(comment_2_post.id, [])]
+        assert data['next'] is None
+
+        assert client.get(url + '?root=100500').status_code == 404
+        assert client.get(url + '?depth=-1').status_code == 400
+        assert client.get('/api/v1/posts/100500/comments/tree/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_replies(self, user_client, post, comment_1_post):
+        response = user_client.post(f'/api/v1/posts/{post.id}/comments/bulk/', data=[
+            {'text': 'Ответ 1', 'parent': comment_1_post.id},
+            {'text': 'Ответ 2', 'parent': comment_1_post.id},
+            {'text': 'Коммент'},
+        ], format='json')
+        assert response.status_code == 201
+        created = Comment.objects.filter(
+            pk__in=[item['id'] for item in response.json()['created']]
+        ).order_by('id')
+        assert [(comment.depth, comment.path) for comment in created] == [
+            (1, f'{comment_1_post.path}{created[0].id:010d}'),
+            (1, f'{comment_1_post.path}{created[1].id:010d}'),
+            (0, f'{created[2].id:010d}'),
+        ], 'Проверьте, что массовое создание заполняет пути ответов'
+        comment_1_post.refresh_from_db()
+        assert comment_1_post.reply_count == 2
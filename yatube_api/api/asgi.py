@@ -0,0 +1,327 @@
+"""
+ASGI приложение для Django 2.2, в которой нет django.core.asgi
+и асинхронных представлений.
+
+Представления и ORM остаются синхронными и выполняются в пулах
+потоков фиксированного размера, а событийный цикл только принимает
+запросы и отдает ответы. Чтение постов, комментариев и групп идет
+через отдельный пул, поэтому медленные записи не занимают потоки
+чтения. Когда очередь пула заполнена, запрос сразу получает 503
+с Retry-After вместо ожидания в очереди.
+
+Потоковый ответ читается в том же потоке пула, что выполнил
+представление: курсор .iterator() принадлежит соединению этого
+потока. Блоки передаются в событийный цикл через очередь
+ResponseStream, поток ждет, пока клиент не заберет отправленное.
+
+Размеры пулов и очередей задаются настройками API_ASGI_*.
+"""
+import asyncio
+import json
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import SEEK_END
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+# GET запросы к этим адресам выполняются в пуле чтения
+READ_PATH = re.compile(r'^/api/v1/(posts|groups)/')
+READ_METHODS = ('GET', 'HEAD')
+# блоков потокового ответа, отправленных клиенту с опережением
+STREAM_BUFFER = 8
+
+OVERLOADED_BODY = json.dumps(
+    {'detail': 'Сервер перегружен, повторите запрос позже.'},
+    ensure_ascii=False
+).encode()
+
+
+class ThreadPoolBridge:
+    """
+    Выполняет синхронный код в пуле из `threads` потоков.
+    `max_pending` ограничивает число принятых запросов: их тело
+    читается, они выполняются или ждут свободного потока. Место
+    занимает reserve() до чтения тела; счетчик меняется только
+    в событийном цикле, поэтому блокировка не нужна.
+    """
+
+    def __init__(self, threads, max_pending, name):
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix=name)
+        self.max_pending = max_pending
+        self.pending = 0
+
+    def reserve(self):
+        """Занимает место для запроса; False, если мест нет."""
+        if self.pending >= self.max_pending:
+            return False
+        self.pending += 1
+        return True
+
+    def release(self):
+        self.pending -= 1
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope и тела запроса."""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode().decode('latin1'),
+        'PATH_INFO': path.encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    # тело уже прочитано целиком, в том числе при chunked передаче
+    size = body.seek(0, SEEK_END)
+    body.seek(0)
+    environ.setdefault('CONTENT_LENGTH', str(size))
+    return environ
+
+
+class Response:
+    """Статус, заголовки и тело ответа WSGI приложения."""
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.body = None
+
+    def start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [
+            (name.lower().encode('latin1'), value.encode('latin1'))
+            for name, value in headers
+        ]
+
+
+class ResponseStream:
+    """
+    Очередь блоков потокового ответа из потока пула в событийный цикл.
+    Семафор на STREAM_BUFFER блоков останавливает поток, пока цикл
+    не отправит предыдущие; None в очереди — конец ответа.
+    """
+
+    def __init__(self, buffer=STREAM_BUFFER):
+        self.loop = asyncio.get_running_loop()
+        self.started = self.loop.create_future()
+        self.queue = asyncio.Queue()
+        self.slots = threading.Semaphore(buffer)
+        self.cancelled = False
+
+    def start(self, response):
+        """Из потока пула: статус и заголовки готовы."""
+        self.loop.call_soon_threadsafe(self.started.set_result, response)
+
+    def put(self, chunk):
+        """Из потока пула; False, если клиент больше не читает ответ."""
+        self.slots.acquire()
+        if self.cancelled:
+            return False
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, chunk)
+        return True
+
+    def finish(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def get(self):
+        chunk = await self.queue.get()
+        self.slots.release()
+        return chunk
+
+    def cancel(self):
+        """Будит поток, если он ждет места в очереди."""
+        self.cancelled = True
+        self.slots.release()
+
+
+class AsyncApiApplication:
+    """ASGI приложение поверх синхронного WSGI приложения Django."""
+
+    def __init__(self, wsgi_application=None, read_threads=None,
+                 threads=None, max_pending=None):
+        if wsgi_application is None:
+            wsgi_application = get_wsgi_application()
+        if max_pending is None:
+            max_pending = settings.API_ASGI_MAX_PENDING
+        self.wsgi_application = wsgi_application
+        self.read_bridge = ThreadPoolBridge(
+            read_threads or settings.API_ASGI_READ_THREADS,
+            max_pending, 'asgi-read'
+        )
+        self.bridge = ThreadPoolBridge(
+            threads or settings.API_ASGI_THREADS, max_pending, 'asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        bridge = self.get_bridge(scope)
+        # место занимается до чтения тела: медленные загрузки тоже
+        # учитываются в API_ASGI_MAX_PENDING
+        if not bridge.reserve():
+            await self.send_overloaded(send)
+            return
+        try:
+            body = await self.read_body(receive)
+            try:
+                await self.respond(send, bridge, build_environ(scope, body))
+            finally:
+                # временный файл большого тела удаляется при закрытии
+                body.close()
+        finally:
+            bridge.release()
+
+    async def respond(self, send, bridge, environ):
+        stream = ResponseStream()
+        task = asyncio.ensure_future(
+            bridge.run(self.call_application, environ, stream)
+        )
+        await asyncio.wait(
+            (task, stream.started), return_when=asyncio.FIRST_COMPLETED
+        )
+        if not stream.started.done():
+            # ответ целиком или исключение представления
+            response = task.result()
+            await self.send_start(send, response)
+            await send({'type': 'http.response.body', 'body': response.body})
+            return
+        await self.send_start(send, stream.started.result())
+        try:
+            while True:
+                chunk = await stream.get()
+                if chunk is None:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        finally:
+            stream.cancel()
+            # поток пула закрывает ответ и освобождается
+            await task
+        await send({'type': 'http.response.body'})
+
+    async def send_start(self, send, response):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status,
+            'headers': response.headers,
+        })
+
+    def get_bridge(self, scope):
+        if (scope['method'] in READ_METHODS
+                and READ_PATH.match(scope['path'])):
+            return self.read_bridge
+        return self.bridge
+
+    async def read_body(self, receive):
+        """
+        Тело запроса до FILE_UPLOAD_MAX_MEMORY_SIZE остается в памяти,
+        большее (загрузки изображений) пишется во временный файл.
+        """
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def call_application(self, environ, stream):
+        """
+        Выполняется в потоке пула. Потоковый ответ передается через
+        stream и читается здесь же до конца или до отключения клиента.
+        """
+        response = Response()
+        result = self.wsgi_application(environ, response.start_response)
+        if getattr(result, 'streaming', False):
+            stream.start(response)
+            try:
+                for chunk in result:
+                    if chunk and not stream.put(chunk):
+                        break
+            finally:
+                self.close(result)
+                stream.finish()
+            return response
+        try:
+            response.body = b''.join(result)
+        finally:
+            # request_finished: Django закрывает соединения с базой
+            self.close(result)
+        return response
+
+    def close(self, result):
+        close = getattr(result, 'close', None)
+        if close is not None:
+            close()
+
+    async def send_overloaded(self, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'retry-after', b'1'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': OVERLOADED_BODY})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_bridge.shutdown()
+                self.bridge.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def get_asgi_application():
+    """Аналог django.core.asgi.get_asgi_application() из Django 3.0."""
+    return AsyncApiApplication()
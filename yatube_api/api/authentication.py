@@ -0,0 +1,179 @@
+"""
+Аутентификация по JWT без запроса к auth_user на каждый запрос.
+
+request.user собирается из утверждений токена (id, username, is_active),
+полная запись пользователя читается только при обращении к другим
+атрибутам и хранится в LRU кеше процесса с коротким временем жизни.
+Токены с этими утверждениями выдает /api/v1/jwt/create/
+(см. TokenObtainPairSerializer). Для токенов без них запись
+пользователя читается из кеша при первой проверке.
+
+Запросы, изменяющие данные, дополнительно сверяются с записью
+из кеша: токен удаленного или отключенного пользователя перестает
+работать для записи не позже чем через API_USER_CACHE_TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# утверждения токена, которых достаточно для request.user
+USER_CLAIMS = ('username', 'is_active')
+
+
+class UserCache:
+    """LRU кеш записей пользователей с временем жизни, в памяти процесса."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Пользователь по id или None, если его нет."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is not None and item[0] > now:
+                self._items.move_to_end(user_id)
+                return item[1]
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            with self._lock:
+                self._items[user_id] = (now + self.ttl, user)
+                self._items.move_to_end(user_id)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(
+    settings.API_USER_CACHE_SIZE, settings.API_USER_CACHE_TTL
+)
+
+
+def get_token(user):
+    """Refresh токен с утверждениями USER_CLAIMS."""
+    token = RefreshToken.for_user(user)
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class TokenObtainPairSerializer(serializers.TokenObtainPairSerializer):
+    """Выдает пару токенов с утверждениями USER_CLAIMS."""
+
+    @classmethod
+    def get_token(cls, user):
+        return get_token(user)
+
+
+class TokenUser:
+    """
+    Пользователь из утверждений токена.
+    Атрибуты, которых нет в токене, берутся у полной записи
+    пользователя из user_cache; каждый TokenUser работает
+    со своей копией записи.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.token = token
+
+    def __str__(self):
+        return self.username
+
+    def __eq__(self, other):
+        return isinstance(other, (TokenUser, User)) and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    @cached_property
+    def id(self):
+        return self.token[api_settings.USER_ID_CLAIM]
+
+    @property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def username(self):
+        if 'username' in self.token:
+            return self.token['username']
+        return self.user.username
+
+    @cached_property
+    def is_active(self):
+        if 'is_active' in self.token:
+            return self.token['is_active']
+        return self.user.is_active
+
+    @cached_property
+    def user(self):
+        user = user_cache.get(self.id)
+        if user is None:
+            raise AuthenticationFailed(
+                'Пользователь не найден.', code='user_not_found'
+            )
+        return copy.deepcopy(user)
+
+    def __getattr__(self, name):
+        # вызывается только для атрибутов, которых нет у TokenUser
+        if name.startswith('__') or name == 'token':
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, которая не читает пользователя из базы,
+    а возвращает TokenUser. Для небезопасных методов пользователь
+    проверяется по записи из user_cache.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and request.method not in SAFE_METHODS:
+            self.check_user(result[0])
+        return result
+
+    def check_user(self, user):
+        """Запись пользователя существует и активна."""
+        if not user.user.is_active:
+            raise AuthenticationFailed(
+                'Пользователь неактивен.', code='user_inactive'
+            )
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('В токене нет идентификатора пользователя.')
+        user = TokenUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                'Пользователь неактивен.', code='user_inactive'
+            )
+        return user
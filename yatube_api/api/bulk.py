@@ -0,0 +1,54 @@
+from django.conf import settings
+from rest_framework import serializers, status
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+
+from .parsers import NDJSONParser
+
+BULK_PARSER_CLASSES = (JSONParser, NDJSONParser)
+
+
+def get_items(request):
+    """Список объектов из тела массового запроса."""
+    items = request.data
+    if not isinstance(items, list):
+        raise serializers.ValidationError('Ожидается список объектов.')
+    if len(items) > settings.API_BULK_MAX_ITEMS:
+        raise serializers.ValidationError(
+            f'Не больше {settings.API_BULK_MAX_ITEMS} объектов за запрос.'
+        )
+    return items
+
+
+def get_ids(request, child=None):
+    """Список идентификаторов из тела запроса на массовое удаление."""
+    field = serializers.ListField(child=child or serializers.IntegerField())
+    return field.run_validation(get_items(request))
+
+
+def validate_items(serializer, items):
+    """
+    Валидирует каждый объект отдельно, как ListSerializer с many=True,
+    но не отбрасывает корректные объекты из-за ошибок в соседних.
+    Возвращает пары (индекс, validated_data) и список ошибок.
+    """
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+def bulk_response(created, errors):
+    """
+    201, если создан хотя бы один объект, иначе 400;
+    в ответе — созданные объекты и ошибки по индексам исходного списка.
+    """
+    status_code = (
+        status.HTTP_201_CREATED if created or not errors
+        else status.HTTP_400_BAD_REQUEST
+    )
+    return Response({'created': created, 'errors': errors},
+                    status=status_code)
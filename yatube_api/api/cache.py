@@ -0,0 +1,154 @@
+"""
+Кеш ответов API для анонимных GET запросов.
+
+Ключ кеша строится из схемы, хоста и URL с параметрами (в ответах
+есть абсолютные ссылки), заголовка Accept, классов аутентификации
+представления и версий пространств имен, от которых зависит ответ.
+Сигналы (см. api.signals) увеличивают версию пространства имен
+при изменении моделей, и старые ключи перестают читаться, не требуя
+перебора и удаления.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+KEY_PREFIX = 'api-response'
+STATS_KEYS = ('hits', 'misses')
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _incr(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключа еще нет или его вытеснили из кеша
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def invalidate(*namespaces):
+    """Делает недействительными все ответы из указанных пространств имен."""
+    cache = get_cache()
+    for namespace in namespaces:
+        _incr(cache, f'{KEY_PREFIX}:version:{namespace}')
+
+
+def get_version(namespace):
+    """Текущая версия пространства имен, для ключей вне кеша ответов."""
+    return get_cache().get(f'{KEY_PREFIX}:version:{namespace}', 0)
+
+
+def get_stats():
+    """Счетчики попаданий и промахов кеша для мониторинга."""
+    cache = get_cache()
+    keys = {f'{KEY_PREFIX}:stats:{name}': name for name in STATS_KEYS}
+    values = cache.get_many(keys)
+    return {name: values.get(key, 0) for key, name in keys.items()}
+
+
+def count(name):
+    _incr(get_cache(), f'{KEY_PREFIX}:stats:{name}')
+
+
+class CachedResponseMixin:
+    """
+    Отдает анонимные GET запросы из кеша,
+    поддерживает ETag/If-None-Match с ответом 304.
+    """
+    cache_namespaces = ()
+
+    def is_cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and 'HTTP_AUTHORIZATION' not in request.META
+        )
+
+    def get_cache_key(self, request, cache):
+        version_keys = [f'{KEY_PREFIX}:version:{namespace}'
+                        for namespace in self.cache_namespaces]
+        versions = cache.get_many(version_keys)
+        source = '|'.join([
+            request.scheme,
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            ','.join(auth.__name__ for auth in self.authentication_classes),
+            *(str(versions.get(key, 0)) for key in version_keys),
+        ])
+        digest = hashlib.md5(source.encode()).hexdigest()
+        return f'{KEY_PREFIX}:{digest}'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request, cache)
+        cached = cache.get(key)
+        if cached is not None:
+            count('hits')
+            content, content_type, etag = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+        else:
+            count('misses')
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.render()
+            if not response.has_header('ETag'):
+                digest = hashlib.md5(response.content).hexdigest()
+                response['ETag'] = f'"{digest}"'
+            cache.set(
+                key,
+                (response.content, response['Content-Type'],
+                 response['ETag']),
+                settings.API_CACHE_TIMEOUT
+            )
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return get_conditional_response(
+            request, etag=response['ETag'], response=response
+        )
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET запросы: ETag строится по дешевому валидатору
+    (например, версии поста) до выборки и сериализации ответа,
+    при совпадении If-None-Match сразу отдается 304.
+    """
+
+    def get_etag_validator(self):
+        return None
+
+    def get_etag(self, request):
+        validator = self.get_etag_validator()
+        if validator is None:
+            return None
+        accept = request.META.get('HTTP_ACCEPT', '')
+        digest = hashlib.md5(accept.encode()).hexdigest()[:8]
+        return f'"{validator}-{digest}"'
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                response['ETag'] = etag
+                return response
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,197 @@
+"""
+Быстрый путь сериализации списков только для чтения.
+
+Словари строятся из строк `.values()` без создания объектов моделей
+и без полей DRF. JSON на выходе совпадает побайтно с PostSerializer,
+CommentSerializer и FollowSerializer (см. tests/test_fastpath.py),
+поэтому при изменении этих сериализаторов нужно менять и этот модуль.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from posts.images import derivative_urls
+from posts.search import render_highlight
+from rest_framework.response import Response
+
+from yatube_api.settings import DATETIME_FORMAT
+
+
+def datetime_formatter(output_format=DATETIME_FORMAT):
+    """Форматирует дату так же, как serializers.DateTimeField."""
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if tz is not None:
+            value = value.astimezone(tz)
+        return value.strftime(output_format)
+
+    return format_datetime
+
+
+class FastListSerializer:
+    """
+    Базовый класс: `values` — поля для queryset.values(),
+    `to_representation` строит словарь ответа из строки.
+    Запрос из `context` нужен для абсолютных адресов файлов.
+    """
+    values = ()
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+        self.format_datetime = datetime_formatter()
+
+    def build_url(self, url):
+        """Как serializers.FileField: абсолютный адрес, если есть запрос."""
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    @property
+    def data(self):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in self.rows]
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+
+class PostListSerializer(FastListSerializer):
+    """
+    Аналог PostSerializer(many=True),
+    при поиске — PostSearchSerializer(many=True).
+    """
+    values = (
+        'id', 'author__username', 'preview', 'pub_date',
+        'group_id', 'group__title', 'comment_count',
+        'image', 'image_widths',
+    )
+
+    def to_representation(self, row):
+        group_id = row['group_id']
+        data = {
+            'id': row['id'],
+            'author': row['author__username'],
+            'text': row['preview'],
+            'pub_date': self.format_datetime(row['pub_date']),
+            'group': group_id,
+            'group_info': None if group_id is None else {
+                'id': group_id,
+                'title': row['group__title'],
+            },
+            'comments': row['comment_count'],
+            'image': self.get_image(row['image']),
+            'images': {
+                width: self.build_url(url)
+                for width, url in derivative_urls(
+                    row['image'], row['image_widths']
+                ).items()
+            },
+        }
+        if 'search_highlight' in row:
+            data['highlight'] = render_highlight(row['search_highlight'])
+        return data
+
+    def get_image(self, name):
+        if not name:
+            return None
+        return self.build_url(default_storage.url(name))
+
+
+class CommentListSerializer(FastListSerializer):
+    """Аналог CommentSerializer(many=True)."""
+    values = ('id', 'author__username', 'created', 'text', 'post_id',
+              'parent_id', 'reply_count')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'created': self.format_datetime(row['created']),
+            'text': row['text'],
+            'post': row['post_id'],
+            'parent': row['parent_id'],
+            'reply_count': row['reply_count'],
+        }
+
+
+class CommentTreeSerializer(CommentListSerializer):
+    """
+    Дерево из строк в порядке обхода в глубину (см. posts.threads):
+    ответы вложены в `replies` родителя. Строка, родителя которой
+    среди строк нет (корень ветки или продолжение ветки с прошлой
+    страницы), выводится на верхнем уровне.
+    """
+    # путь нужен курсору пагинации, в ответ не выводится
+    values = CommentListSerializer.values + ('path',)
+
+    @property
+    def data(self):
+        nodes = {}
+        tree = []
+        for row in self.rows:
+            node = self.to_representation(row)
+            node['replies'] = []
+            nodes[row['id']] = node
+            parent = nodes.get(row['parent_id'])
+            (tree if parent is None else parent['replies']).append(node)
+        return tree
+
+
+class FollowListSerializer(FastListSerializer):
+    """Аналог FollowSerializer(many=True)."""
+    values = ('id', 'user__username', 'following__username')
+
+    def to_representation(self, row):
+        return {
+            'user': row['user__username'],
+            'following': row['following__username'],
+        }
+
+
+class FollowerListSerializer(FastListSerializer):
+    """Подписчики пользователя, см. FollowGraphView."""
+    values = ('id', 'user__username')
+
+    def to_representation(self, row):
+        return {'username': row['user__username']}
+
+
+class FollowingListSerializer(FastListSerializer):
+    """Авторы, на которых подписан пользователь, см. FollowGraphView."""
+    values = ('id', 'following__username')
+
+    def to_representation(self, row):
+        return {'username': row['following__username']}
+
+
+class FastListMixin:
+    """
+    Отдает список через `fast_serializer_class`, если быстрый путь
+    включен настройкой API_FAST_LIST_SERIALIZATION.
+    """
+    fast_serializer_class = None
+
+    def get_fast_serializer_class(self):
+        if not settings.API_FAST_LIST_SERIALIZATION:
+            return None
+        return self.fast_serializer_class
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_fast_serializer_class()
+        if serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # поля из extra(select=...), например ранг и подсветка поиска
+        rows = queryset.values(
+            *serializer_class.values, *queryset.query.extra_select
+        )
+        context = {'request': request}
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer_class(page, context).data
+            )
+        return Response(serializer_class(rows, context).data)
@@ -0,0 +1,146 @@
+"""
+Разреженные наборы полей (`?fields=id,text`) и встраивание связанных
+объектов (`?expand=comments,author,group`) в ответах на GET запросы.
+
+Представление описывает, какие поля модели нужны каждому полю
+ответа и каждому встраиванию, и по ним строит only(), select_related()
+и prefetch_related(), поэтому из базы читается только то, что
+попадет в ответ. Сериализатор с ExpandableFieldsMixin убирает
+невыбранные поля и подменяет встраиваемые вложенными сериализаторами.
+"""
+from collections import OrderedDict
+
+from django.db.models import Prefetch
+from rest_framework import permissions, serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class ExpandableFieldsMixin:
+    """
+    Сериализатор, поля которого выбираются контекстом:
+    `fields` — список выводимых полей (None — все),
+    `expand` — поля из `expandable_fields`, которые встраиваются.
+    Действует только на корневой сериализатор, вложенные
+    выводятся целиком.
+    """
+    # имя поля -> функция, создающая вложенный сериализатор
+    expandable_fields = {}
+
+    def is_root(self):
+        parent = self.parent
+        return parent is None or (
+            parent is self.root
+            and isinstance(parent, serializers.ListSerializer)
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_root():
+            return fields
+        for name in self.context.get('expand', ()):
+            if name in fields and name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name]()
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in selected
+        )
+
+
+class SparseFieldsetMixin:
+    """
+    Представление с параметрами `fields` и `expand`.
+    `field_sources` сопоставляет полю ответа поля модели:
+    'author__username' — через select_related, обратные связи
+    и Prefetch — через prefetch_related. `expand_sources` —
+    то же для встраиваемых полей.
+    """
+    field_sources = {}
+    expand_sources = {}
+
+    def get_field_sources(self):
+        return self.field_sources
+
+    def get_fieldset(self):
+        """Выбранные поля (None — все) и встраивания, уже проверенные."""
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        params = self.request.query_params
+        fields = None
+        expand = []
+        if self.request.method in permissions.SAFE_METHODS:
+            if FIELDS_PARAM in params:
+                fields = parse_names(params[FIELDS_PARAM])
+                self.check_names(
+                    FIELDS_PARAM, fields, self.get_field_sources()
+                )
+            expand = parse_names(params.get(EXPAND_PARAM, ''))
+            self.check_names(EXPAND_PARAM, expand, self.expand_sources)
+        self._fieldset = (fields, expand)
+        return self._fieldset
+
+    def check_names(self, param, names, allowed):
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError({
+                param: [f'Неизвестные поля: {", ".join(unknown)}.']
+            })
+
+    def is_sparse(self):
+        fields, expand = self.get_fieldset()
+        return fields is not None or bool(expand)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_fieldset()
+        context.update(fields=fields, expand=expand)
+        return context
+
+    def get_fast_serializer_class(self):
+        # быстрый путь выводит только полный набор полей
+        if self.is_sparse():
+            return None
+        return super().get_fast_serializer_class()
+
+    def apply_fieldset(self, queryset):
+        """Ограничивает выборку полями выбранного набора."""
+        if not self.is_sparse():
+            return queryset
+        fields, expand = self.get_fieldset()
+        sources = self.get_field_sources()
+        names = list(sources) if fields is None else fields
+
+        meta = queryset.model._meta
+        only = {meta.pk.name}
+        related = set()
+        prefetch = []
+        for name in names:
+            if name in expand:
+                lookups = self.expand_sources[name]
+            else:
+                lookups = sources[name]
+            for lookup in lookups:
+                if isinstance(lookup, Prefetch):
+                    prefetch.append(lookup)
+                    continue
+                relation, _, rest = lookup.partition('__')
+                if meta.get_field(relation).one_to_many:
+                    prefetch.append(lookup)
+                elif rest:
+                    related.add(relation)
+                    only.update((relation, lookup))
+                else:
+                    only.add(lookup)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            # select_related() без аргументов соединил бы все связи
+            queryset = queryset.select_related(*related)
+        return queryset.prefetch_related(*prefetch).only(*only)
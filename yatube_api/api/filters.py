@@ -0,0 +1,90 @@
+from django.conf import settings
+from posts import search
+from posts.export import parse_moment
+from posts.models import Group
+from rest_framework import filters, serializers
+from rest_framework.settings import api_settings
+
+from .cache import get_cache, get_version
+
+
+def get_group_id(slug):
+    """
+    id группы по slug, 0 — если группы нет. Кешируется с версией
+    пространства имен 'groups', которую сбрасывают сигналы
+    при изменении групп.
+    """
+    cache = get_cache()
+    key = f'group-slug:{get_version("groups")}:{slug}'
+    group_id = cache.get(key)
+    if group_id is None:
+        group_id = Group.objects.filter(slug=slug).values_list(
+            'id', flat=True
+        ).first() or 0
+        cache.set(key, group_id, settings.API_CACHE_TIMEOUT)
+    return group_id
+
+
+class PostSearchFilter(filters.BaseFilterBackend):
+    """
+    Полнотекстовый поиск по параметру `search`
+    через поисковый индекс (см. posts.search).
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search.search(queryset, query)
+
+
+class PostFilter(filters.BaseFilterBackend):
+    """
+    Фильтры постов по автору (`author`, имя пользователя),
+    группе (`group`, slug) и дате публикации (`since` включительно,
+    `until` не включительно).
+    Каждый фильтр вместе с интервалом дат читается по своему индексу:
+    post_author_pub_date_idx, post_group_pub_date_idx
+    или post_pub_date_id_idx. Для автора и группы вместе
+    составного индекса нет, такой запрос отклоняется.
+    """
+    date_params = ('since', 'until')
+    unindexed_combinations = (
+        ({'author', 'group'},
+         'Нельзя фильтровать одновременно по автору и группе.'),
+    )
+
+    def get_params(self, request):
+        params = {
+            name: request.query_params[name]
+            for name in ('author', 'group', *self.date_params)
+            if request.query_params.get(name)
+        }
+        for names, message in self.unindexed_combinations:
+            if names <= params.keys():
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [message]
+                })
+        for name in self.date_params:
+            if name in params:
+                try:
+                    params[name] = parse_moment(params[name])
+                except ValueError as exc:
+                    raise serializers.ValidationError({name: [str(exc)]})
+        return params
+
+    def filter_queryset(self, request, queryset, view):
+        params = self.get_params(request)
+        if 'author' in params:
+            queryset = queryset.filter(author__username=params['author'])
+        if 'group' in params:
+            group_id = get_group_id(params['group'])
+            if not group_id:
+                return queryset.none()
+            queryset = queryset.filter(group_id=group_id)
+        if 'since' in params:
+            queryset = queryset.filter(pub_date__gte=params['since'])
+        if 'until' in params:
+            queryset = queryset.filter(pub_date__lt=params['until'])
+        return queryset
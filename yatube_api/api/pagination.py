@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Пагинация по ключу сортировки (keyset/cursor).
+    Следующая страница выбирается условием `WHERE (поля) > (курсор)`
+    вместо OFFSET, поэтому время выборки не зависит от глубины,
+    а общее количество записей не считается.
+    Включается параметром `cursor` или `page_size`,
+    иначе ответ не пагинируется либо отдается `fallback_class`.
+    """
+    ordering = ('-pk',)
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    fallback_class = None
+    invalid_cursor_message = 'Неверный курсор.'
+    # выражения для ORDER BY и условия на курсор, если сортировать нужно
+    # не по полям ordering, а по их копиям (например, аннотациям
+    # из другой таблицы); значения курсора берутся из полей ordering
+    order_by = None
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if not self.is_requested(request):
+            if self.fallback_class is None:
+                return None
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+        queryset = queryset.order_by(*self.get_order_by())
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        # одна лишняя запись показывает, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.next_position = None
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(
+            url, self.page_size_query_param, self.page_size
+        )
+        cursor = self.encode_cursor(self.next_position)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_position(self, obj):
+        if isinstance(obj, dict):
+            # строка из queryset.values()
+            return [obj[field.attname] for field in self.fields]
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def get_order_by(self):
+        if self.order_by is not None:
+            return self.order_by
+        return [
+            ('-' if name.startswith('-') else '') + field.attname
+            for name, field in zip(self.ordering, self.fields)
+        ]
+
+    def get_position_filter(self, position):
+        """
+        Строит условие "строго после позиции" для составного ключа:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        order_by = self.get_order_by()
+        condition = Q()
+        equal = Q()
+        for name, value in zip(order_by, position):
+            column = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{column}__{lookup}': value})
+            equal &= Q(**{column: value})
+        # избыточное условие на первое поле превращает OR в диапазон
+        # индекса, иначе SQLite сканирует индекс с самого начала
+        name, value = order_by[0], position[0]
+        lookup = 'lte' if name.startswith('-') else 'gte'
+        return Q(**{f'{name.lstrip("-")}__{lookup}': value}) & condition
+
+    def encode_cursor(self, position):
+        values = [self.dump_value(value) for value in position]
+        data = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padding = '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(token + padding))
+            # только список скаляров по числу полей: None или вложенные
+            # значения дошли бы до запроса и дали бы 500
+            if (not isinstance(values, list)
+                    or len(values) != len(self.fields)
+                    or not all(isinstance(value, (str, int, float))
+                               for value in values)):
+                raise ValueError
+            return [field.to_python(value)
+                    for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def dump_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class PostPagination(KeysetPagination):
+    """
+    Посты: keyset по (pub_date, id) от новых к старым,
+    без параметров `cursor`/`page_size` — прежняя LimitOffset пагинация.
+    """
+    ordering = ('-pub_date', '-id')
+    fallback_class = pagination.LimitOffsetPagination
+
+
+class FeedPagination(PostPagination):
+    """
+    Лента: всегда постранично, тот же курсор (pub_date, id), но
+    сортировка по копиям этих полей из ленты пользователя
+    (см. posts.timeline.feed), чтобы страница читалась одним
+    диапазоном индекса timeline_user_pub_date_idx.
+    """
+    order_by = ('-feed_pub_date', '-feed_post_id')
+    fallback_class = None
+
+    def is_requested(self, request):
+        return True
+
+
+class CommentPagination(KeysetPagination):
+    """Комментарии: keyset по (created, id) в хронологическом порядке."""
+    ordering = ('created', 'id')
+
+
+class CommentTreePagination(KeysetPagination):
+    """
+    Дерево комментариев: всегда постранично, keyset по пути,
+    страница — отрезок обхода дерева в глубину.
+    """
+    ordering = ('path',)
+    page_size = 100
+    max_page_size = 1000
+
+    def is_requested(self, request):
+        return True
+
+
+class FollowPagination(KeysetPagination):
+    """Подписки: keyset по id."""
+    ordering = ('id',)
+
+
+class FollowGraphPagination(FollowPagination):
+    """Подписчики и подписки пользователя: всегда постранично."""
+
+    def is_requested(self, request):
+        return True
@@ -0,0 +1,36 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Разбирает поток NDJSON (один JSON объект на строку) в список.
+    Тело читается построчно, и чтение прекращается, как только
+    объектов становится больше API_BULK_MAX_ITEMS: слишком большой
+    запрос отклоняется, не попадая в память целиком.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        reader = codecs.getreader(encoding)(stream)
+        for number, line in enumerate(reader, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(items) == settings.API_BULK_MAX_ITEMS:
+                raise ParseError(
+                    f'Не больше {settings.API_BULK_MAX_ITEMS} объектов '
+                    f'за запрос.'
+                )
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'Строка {number}: {exc}')
+        return items
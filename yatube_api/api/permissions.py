@@ -1,11 +1,29 @@
 from rest_framework import permissions
 
 
-class IsOwnerOrReadOnly(permissions.BasePermission):
+class OwnerPermission(permissions.BasePermission):
+    """
+    Доступ к объекту только его владельцу. Владелец сравнивается
+    по значению внешнего ключа `owner_field`, без загрузки пользователя.
+    filter_queryset() переносит ту же проверку в запрос, чтобы чужой
+    объект отсекался условием WHERE (см. api.viewsets.OwnerLookupMixin).
+    """
+    owner_field = None
+
+    def is_owner(self, request, obj):
+        return getattr(obj, self.owner_field) == request.user.id
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.filter(**{self.owner_field: request.user.id})
+
+
+class IsOwnerOrReadOnly(OwnerPermission):
     """
     Запрет PUT/PATCH/DELETE запросов для не автора поста,
     запрет POST запроса для гостя.
     """
+    owner_field = 'author_id'
+
     def has_permission(self, request, view):
         return (
             request.method in permissions.SAFE_METHODS
@@ -15,13 +33,20 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
+            or self.is_owner(request, obj)
         )
 
+    def filter_queryset(self, request, queryset, view):
+        if request.method in permissions.SAFE_METHODS:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
 
-class FollowObjectPermission(permissions.BasePermission):
+
+class FollowObjectPermission(OwnerPermission):
     """
     Запрещает запросы пользователя к чужим подпискам.
     """
+    owner_field = 'user_id'
+
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.user
+        return self.is_owner(request, obj)
@@ -0,0 +1,198 @@
+"""
+Профилирование запросов к API: число и время SQL запросов, повторы
+одинаковых запросов (признак N+1) и время этапов обработки.
+
+ProfilingMiddleware профилирует долю API_PROFILING_SAMPLE_RATE
+запросов (0 — выключено, тогда цена — одно случайное число на запрос),
+пишет строку JSON в логгер `api.profiling` и, если включено
+API_PROFILING_SERVER_TIMING, добавляет заголовок Server-Timing.
+Этапы отмечает ProfilingMixin представлений:
+- auth — аутентификация, права и ограничения (APIView.initial);
+- queryset — get_queryset(), вместе с вызовами из get_object();
+- paginate — paginate_queryset(), обычно здесь выполняется выборка;
+- serialize — остальная работа обработчика, в основном сериализация;
+- render — JSONRenderer.
+SQL запросы считаются отдельно, время этапа включает время
+выполненных в нем запросов (sql в логе по этапам).
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('api_profile', default=None)
+
+# IN (%s, %s, ...) с разным числом параметров — один и тот же запрос
+_in_list = re.compile(r'IN \((?:%s, )*%s\)')
+
+PHASES = ('auth', 'queryset', 'paginate', 'serialize', 'render')
+
+
+def get_profile():
+    """Профиль текущего запроса или None, если запрос не профилируется."""
+    return _current.get()
+
+
+def fingerprint(sql):
+    """Текст запроса без параметров; Django передает их отдельно."""
+    return _in_list.sub('IN (...)', sql)
+
+
+class RequestProfile:
+    """Счетчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self.phases = defaultdict(float)
+        self.phase_sql = defaultdict(float)
+        self.current_phase = None
+
+    def execute(self, execute, sql, params, many, context):
+        """Обертка connection.execute_wrapper()."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.sql_time += elapsed
+            self.fingerprints[fingerprint(sql)] += 1
+            if self.current_phase is not None:
+                self.phase_sql[self.current_phase] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        outer = self.current_phase
+        self.current_phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+            self.current_phase = outer
+
+    def timed(self, name, func):
+        """func, время вызовов которой записывается в этап name."""
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def get_duplicates(self):
+        threshold = settings.API_PROFILING_DUPLICATE_THRESHOLD
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def as_dict(self, request, response):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': to_ms(time.perf_counter() - self.started),
+            'queries': self.queries,
+            'sql_ms': to_ms(self.sql_time),
+            'phases_ms': {name: to_ms(self.phases[name])
+                          for name in PHASES if name in self.phases},
+            'phases_sql_ms': {name: to_ms(self.phase_sql[name])
+                              for name in PHASES if name in self.phase_sql},
+            'duplicates': self.get_duplicates(),
+        }
+
+    def server_timing(self, data):
+        duplicates = sum(item['count'] - 1 for item in data['duplicates'])
+        entries = [
+            f'db;dur={data["sql_ms"]};desc="{data["queries"]} queries, '
+            f'{duplicates} duplicate"'
+        ]
+        entries += [f'{name};dur={value}'
+                    for name, value in data['phases_ms'].items()]
+        entries.append(f'total;dur={data["duration_ms"]}')
+        return ', '.join(entries)
+
+
+def to_ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class ProfilingMiddleware:
+    """Профилирует выборку запросов, см. описание модуля."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.API_PROFILING_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        data = profile.as_dict(request, response)
+        logger.info(json.dumps(data, ensure_ascii=False))
+        if settings.API_PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = profile.server_timing(data)
+        return response
+
+
+class ProfilingMixin:
+    """
+    Отмечает этапы обработки запроса в профиле. get_queryset()
+    и paginate_queryset() оборачиваются на экземпляре представления,
+    чтобы учесть их переопределения в самих представлениях.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        profile = get_profile()
+        if profile is None:
+            return super().initial(request, *args, **kwargs)
+        with profile.phase('auth'):
+            super().initial(request, *args, **kwargs)
+        self.get_queryset = profile.timed('queryset', self.get_queryset)
+        self.paginate_queryset = profile.timed(
+            'paginate', self.paginate_queryset
+        )
+        # запросы обработчика вне выборки и пагинации относятся к serialize
+        profile.current_phase = 'serialize'
+        self._handler_started = time.perf_counter()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        profile = get_profile()
+        if profile is None:
+            return response
+        if hasattr(self, '_handler_started'):
+            profile.current_phase = None
+            handler = time.perf_counter() - self._handler_started
+            nested = sum(profile.phases.get(name, 0.0)
+                         for name in ('queryset', 'paginate'))
+            profile.phases['serialize'] += max(0.0, handler - nested)
+        if hasattr(response, 'render') and not response.is_rendered:
+            with profile.phase('render'):
+                response.render()
+        return response
@@ -1,38 +1,105 @@
-import textwrap
-
-from posts.models import Comment, Follow, Group, Post, User
+from posts import follow_graph
+from posts.images import derivative_urls
+from posts.models import COMMENT_MAX_DEPTH, Comment, Follow, Group, Post, User
+from posts.search import render_highlight
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
 
 from yatube_api.settings import DATETIME_FORMAT
 
+from .fieldsets import ExpandableFieldsMixin
+
+SELF_FOLLOW_ERROR = 'Нельзя подписываться на самого себя.'
+FOLLOW_EXISTS_ERROR = 'Такая подписка уже есть.'
+
+
+class GroupSummaryFieldsMixin(serializers.Serializer):
+    """
+    Поля сводки по постам группы; значения приходят из аннотаций
+    queryset представления групп (см. GroupViewSet).
+    """
+    post_count = serializers.IntegerField(read_only=True)
+    last_post_at = serializers.DateTimeField(
+        read_only=True,
+        format=DATETIME_FORMAT
+    )
+
 
-class GroupDetailSerializer(serializers.ModelSerializer):
+class GroupDetailSerializer(GroupSummaryFieldsMixin,
+                            serializers.ModelSerializer):
     """
     Обслуживает модель 'Group',
     используется при просмотре группы по ID.
     """
     class Meta:
         model = Group
-        fields = '__all__'
+        fields = (
+            'id', 'title', 'slug', 'description',
+            'post_count', 'last_post_at'
+        )
 
 
 class GroupSerializer(serializers.ModelSerializer):
     """
     Обслуживает модель 'Group',
-    используется при просмотре групп списком.
+    используется при выводе группы внутри поста.
     """
     class Meta:
         model = Group
         fields = ('id', 'title')
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
+class GroupListSerializer(GroupSummaryFieldsMixin, GroupSerializer):
+    """
+    Обслуживает модель 'Group',
+    используется при просмотре групп списком.
+    """
+    class Meta(GroupSerializer.Meta):
+        fields = GroupSerializer.Meta.fields + ('post_count', 'last_post_at')
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """
+    Обслуживает модель 'User',
+    используется при встраивании автора (?expand=author).
+    """
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class ImageDerivativesField(serializers.Field):
+    """
+    Адреса уменьшенных копий картинки поста по ширине: {"320": url}.
+    Пока копии строятся, словарь пуст.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, post):
+        urls = derivative_urls(post.image.name, post.image_widths)
+        request = self.context.get('request')
+        if request is None:
+            return urls
+        return {width: request.build_absolute_uri(url)
+                for width, url in urls.items()}
+
+
+class PostDetailSerializer(ExpandableFieldsMixin,
+                           serializers.ModelSerializer):
     """
     Обслуживает модель 'Post',
     используется при работе с одним постом.
     """
+    expandable_fields = {
+        'author': lambda: AuthorSerializer(read_only=True),
+        'group': lambda: GroupDetailSerializer(read_only=True),
+        'comments': lambda: CommentSerializer(many=True, read_only=True),
+    }
     author = SlugRelatedField(
         slug_field='username',
         read_only=True
@@ -49,13 +116,14 @@ class PostDetailSerializer(serializers.ModelSerializer):
         read_only=True,
         format=DATETIME_FORMAT
     )
+    images = ImageDerivativesField()
 
     class Meta:
         fields = (
             'id', 'author',
             'text', 'pub_date',
             'group', 'group_info',
-            'comments'
+            'comments', 'image', 'images'
         )
         read_only_fields = ('author', 'group_info', 'pub_date', 'comments')
         model = Post
@@ -69,11 +137,12 @@ class PostDetailSerializer(serializers.ModelSerializer):
         return value
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
     Обслуживает модель 'Post',
     используется при работе со списком постов.
     """
+    expandable_fields = PostDetailSerializer.expandable_fields
     text = serializers.SerializerMethodField()
     author = SlugRelatedField(
         slug_field='username',
@@ -87,30 +156,32 @@ class PostSerializer(serializers.ModelSerializer):
         read_only=True,
         source='group'
     )
-    comments = serializers.SerializerMethodField(required=False)
+    comments = serializers.IntegerField(
+        source='comment_count',
+        read_only=True
+    )
     pub_date = serializers.DateTimeField(
         read_only=True,
         format=DATETIME_FORMAT
     )
+    images = ImageDerivativesField()
 
     class Meta:
         fields = (
             'id', 'author',
             'text', 'pub_date',
             'group', 'group_info',
-            'comments'
+            'comments', 'image', 'images'
         )
         read_only_fields = ('author', 'group_info', 'pub_date', 'comments')
         model = Post
 
     def get_text(self, obj):
-        """Сжимает текст до 100 символов при выводе постов списком."""
-        text = obj.text
-        return textwrap.shorten(text, width=100)
-
-    def get_comments(self, obj):
-        """Отображает количество комментариев к каждому посту."""
-        return obj.comments.all().count()
+        """
+        Отдает текст, сжатый до 100 символов при выводе постов списком.
+        Превью хранится в Post.preview, полный текст не загружается.
+        """
+        return obj.preview
 
     def validate_text(self, value):
         """Валидирует текст поста, он не должен быть пустым."""
@@ -121,11 +192,29 @@ class PostSerializer(serializers.ModelSerializer):
         return value
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class PostSearchSerializer(PostSerializer):
+    """
+    Обслуживает модель 'Post',
+    используется при поиске постов: добавляет фрагмент текста
+    с подсвеченными совпадениями.
+    """
+    highlight = serializers.SerializerMethodField()
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ('highlight',)
+
+    def get_highlight(self, obj):
+        return render_highlight(obj.search_highlight)
+
+
+class CommentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
     Обслуживаниет модель 'Comment',
     дает возможность управлять комментариями к постам.
     """
+    expandable_fields = {
+        'author': lambda: AuthorSerializer(read_only=True),
+    }
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -136,10 +225,34 @@ class CommentSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'author', 'created', 'text', 'post', 'parent',
+                  'reply_count')
         read_only_fields = ('author', 'created', 'post')
         model = Comment
 
+    def validate_parent(self, value):
+        """
+        Ответ возможен на комментарий того же поста, не глубже
+        COMMENT_MAX_DEPTH; перенести комментарий в другую ветку нельзя.
+        """
+        if self.instance is not None:
+            if (value.pk if value else None) != self.instance.parent_id:
+                raise serializers.ValidationError(
+                    'Нельзя перенести комментарий в другую ветку.'
+                )
+            return value
+        if value is None:
+            return value
+        if value.post_id != self.context.get('post_id'):
+            raise serializers.ValidationError(
+                'Можно отвечать только на комментарии этого поста.'
+            )
+        if value.depth >= COMMENT_MAX_DEPTH:
+            raise serializers.ValidationError(
+                'Слишком глубокая ветка ответов.'
+            )
+        return value
+
     def validate_text(self, value):
         """Валидирует текст комментария, он не должен быть пустым."""
         if not value:
@@ -153,9 +266,11 @@ class FollowSerializer(serializers.ModelSerializer):
     """
     Обслуживает модель 'Follow'
     - реализация подписки/отписки на авторов.
+    Повтор подписки и подписку на себя отсекают ограничения модели
+    при INSERT (см. follow_graph.follow), отдельных запросов на
+    проверку нет.
     """
     user = serializers.SlugRelatedField(
-        default=serializers.CurrentUserDefault(),
         slug_field='username',
         read_only=True
     )
@@ -167,13 +282,7 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('user', 'following')
         model = Follow
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=('user', 'following'),
-                message='Такая подписка уже есть.'
-            )
-        ]
+        validators = []
 
     def validate_following(self, value):
         """Проверяет и запрещает подписку на самого себя."""
@@ -181,7 +290,25 @@ class FollowSerializer(serializers.ModelSerializer):
         username = current_user.username.lower()
         following = value.username.lower()
         if username == following:
+            raise serializers.ValidationError(SELF_FOLLOW_ERROR)
+        return value
+
+    def create(self, validated_data):
+        try:
+            follow, created = follow_graph.follow(
+                validated_data['user_id'], validated_data['following'].pk
+            )
+        except follow_graph.SelfFollowError:
             raise serializers.ValidationError(
-                'Нельзя подписываться на самого себя.'
+                {'following': [SELF_FOLLOW_ERROR]}
             )
-        return value
+        if not created:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [FOLLOW_EXISTS_ERROR]}
+            )
+        # связанные записи для ответа: автор уже прочитан полем
+        # following, имя текущего пользователя есть в TokenUser
+        user = self.context['request'].user
+        follow.user = User(pk=user.id, username=user.username)
+        follow.following = validated_data['following']
+        return follow
@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from posts.models import Comment, Group, Post, User
+
+from .authentication import user_cache
+from .cache import invalidate
+
+# какие пространства имен кеша ответов зависят от модели
+CACHE_DEPENDENCIES = {
+    # сводки групп зависят от постов
+    Post: ('posts', 'groups'),
+    Comment: ('posts', 'comments'),
+    Group: ('posts', 'groups'),
+    # имя автора выводится в постах и комментариях
+    User: ('posts', 'comments'),
+}
+
+
+def invalidate_response_cache(sender, **kwargs):
+    """
+    Сбрасывает кеш ответов API при изменении постов, комментариев, групп
+    и пользователей.
+    Версии увеличиваются после фиксации транзакции: иначе параллельный
+    запрос успел бы сохранить старые данные под новой версией.
+    """
+    namespaces = CACHE_DEPENDENCIES[sender]
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+# приемник подключается только к перечисленным моделям: приемник
+# без sender мешает Collector удалять остальные модели (например,
+# записи ленты) одним DELETE без предварительного SELECT
+for model in CACHE_DEPENDENCIES:
+    post_save.connect(invalidate_response_cache, sender=model)
+    post_delete.connect(invalidate_response_cache, sender=model)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Убирает измененного пользователя из кеша аутентификации."""
+    user_cache.invalidate(instance.pk)
@@ -1,8 +1,12 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 from rest_framework.authtoken import views
+from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .views import CommentViewSet, FollowViewSet, GroupViewSet, PostViewSet
+from .authentication import TokenObtainPairSerializer
+from .views import (CacheStatsView, CommentViewSet, ExportView, FeedViewSet,
+                    FollowGraphView, FollowUserView, FollowViewSet,
+                    GroupViewSet, PostViewSet)
 
 router = routers.DefaultRouter()
 router.register(r'posts', PostViewSet)
@@ -13,11 +17,30 @@ router.register(
     basename='PostComments'
 )
 router.register(r'follow', FollowViewSet)
+router.register(r'feed', FeedViewSet, basename='feed')
 
 
 urlpatterns = [
     path('v1/', include(router.urls)),
+    path('v1/cache/stats/', CacheStatsView.as_view()),
+    re_path(r'^v1/export/(?P<kind>posts|comments)/$', ExportView.as_view()),
+    re_path(
+        r'^v1/users/(?P<username>[\w.@+-]+)/(?P<kind>followers|following)/$',
+        FollowGraphView.as_view()
+    ),
+    re_path(
+        r'^v1/users/(?P<username>[\w.@+-]+)/follow/$',
+        FollowUserView.as_view()
+    ),
     path('v1/api-token-auth/', views.obtain_auth_token),
     path('v1/', include('djoser.urls')),
+    # токены с утверждениями для TokenUserAuthentication
+    path(
+        'v1/jwt/create/',
+        TokenObtainPairView.as_view(
+            serializer_class=TokenObtainPairSerializer
+        ),
+        name='jwt-create'
+    ),
     path('v1/', include('djoser.urls.jwt')),
 ]
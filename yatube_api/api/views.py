@@ -1,93 +1,553 @@
-from django.shortcuts import get_object_or_404
-from posts.models import Follow, Group, Post
-from rest_framework import filters, pagination, permissions, viewsets
+from collections import OrderedDict
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.db.models.functions import Coalesce
+from django.http import Http404, StreamingHttpResponse
+from posts import export, follow_graph, threads, timeline
+from posts.bulk import (create_comments, create_follows, create_posts,
+                        delete_comments, delete_posts, unfollow)
+from posts.models import Comment, Follow, Group, Post, User
+from rest_framework import (filters, generics, mixins, permissions,
+                            serializers, status, views, viewsets)
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .authentication import TokenUserAuthentication
+from .bulk import (BULK_PARSER_CLASSES, bulk_response, get_ids, get_items,
+                   validate_items)
+from .cache import (CachedResponseMixin, ConditionalGetMixin, get_stats,
+                    invalidate)
+from .fastpath import (CommentListSerializer, CommentTreeSerializer,
+                       FastListMixin, FollowerListSerializer,
+                       FollowingListSerializer, FollowListSerializer,
+                       PostListSerializer)
+from .fieldsets import SparseFieldsetMixin
+from .filters import PostFilter, PostSearchFilter
+from .pagination import (CommentPagination, CommentTreePagination,
+                         FeedPagination, FollowGraphPagination,
+                         FollowPagination, PostPagination)
 from .permissions import FollowObjectPermission, IsOwnerOrReadOnly
-from .serializers import (CommentSerializer, FollowSerializer,
-                          GroupDetailSerializer, GroupSerializer,
-                          PostDetailSerializer, PostSerializer)
-from .viewsets import CreateListRetrieveDeleteViewSet
+from .profiling import ProfilingMixin
+from .serializers import (FOLLOW_EXISTS_ERROR, SELF_FOLLOW_ERROR,
+                          CommentSerializer, FollowSerializer,
+                          GroupDetailSerializer, GroupListSerializer,
+                          PostDetailSerializer, PostSearchSerializer,
+                          PostSerializer)
+from .signals import CACHE_DEPENDENCIES
+from .viewsets import CreateListRetrieveDeleteViewSet, OwnerLookupMixin
+
+
+# поля модели, нужные для встраивания автора (?expand=author)
+AUTHOR_SOURCES = (
+    'author__username', 'author__first_name', 'author__last_name'
+)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ProfilingMixin, CachedResponseMixin, ConditionalGetMixin,
+                  SparseFieldsetMixin, FastListMixin, OwnerLookupMixin,
+                  viewsets.ModelViewSet):
     """
     Обработка запросов к постам.
     """
+    authentication_classes = (TokenUserAuthentication,)
     queryset = Post.objects.all()
+    cache_namespaces = ('posts',)
     permission_classes = (IsOwnerOrReadOnly,)
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = PostPagination
+    filter_backends = (PostFilter, PostSearchFilter)
+    fast_serializer_class = PostListSerializer
+    expand_sources = {
+        'author': AUTHOR_SOURCES,
+        'group': ('group__title', 'group__slug', 'group__description'),
+        'comments': (
+            Prefetch(
+                'comments', queryset=Comment.objects.select_related('author')
+            ),
+        ),
+    }
 
-    def get_serializer_class(self):
+    def get_queryset(self):
+        if self.action == 'destroy':
+            return Post.objects.all()
+        queryset = Post.objects.select_related('author', 'group')
         if self.action == 'list':
-            return PostSerializer
-        return PostDetailSerializer
+            queryset = queryset.defer('text')
+        elif self.action == 'retrieve':
+            # после save() UpdateModelMixin сбрасывает предвыборку,
+            # поэтому при изменении комментарии читаются уже для ответа
+            queryset = queryset.prefetch_related(self.get_comment_ids())
+        return self.apply_fieldset(queryset)
+
+    def get_comment_ids(self):
+        return Prefetch(
+            'comments', queryset=Comment.objects.only('id', 'post')
+        )
+
+    def get_field_sources(self):
+        listing = self.action == 'list'
+        sources = {
+            'id': (),
+            'author': ('author__username',),
+            'text': ('preview',) if listing else ('text',),
+            'pub_date': ('pub_date',),
+            'group': ('group',),
+            'group_info': ('group__title',),
+            'comments': (
+                ('comment_count',) if listing else (self.get_comment_ids(),)
+            ),
+            'image': ('image',),
+            'images': ('image', 'image_widths'),
+        }
+        if self.get_serializer_class() is PostSearchSerializer:
+            sources['highlight'] = ()
+        return sources
+
+    def get_serializer_class(self):
+        if self.action != 'list':
+            return PostDetailSerializer
+        if self.request.query_params.get(PostSearchFilter.search_param):
+            return PostSearchSerializer
+        return PostSerializer
+
+    def get_etag_validator(self):
+        if self.action != 'retrieve':
+            return None
+        version = Post.objects.filter(pk=self.kwargs['pk']).values_list(
+            'version', flat=True
+        ).first()
+        if version is None:
+            return None
+        return f'post-{self.kwargs["pk"]}-{version}'
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(author_id=self.request.user.id)
+            timeline.fan_out(post)
 
     def perform_update(self, serializer):
-        serializer.save(author=self.request.user)
+        # пост только что прочитан, группа до изменения уже известна
+        # и не перечитывается в posts.signals.remember_post_group
+        serializer.instance._previous_group_id = serializer.instance.group_id
+        serializer.save(author_id=self.request.user.id)
+
+    @action(detail=False, methods=['post', 'delete'],
+            parser_classes=BULK_PARSER_CLASSES)
+    def bulk(self, request):
+        """
+        Массовое создание (POST) и удаление своих постов (DELETE)
+        по списку объектов в JSON или NDJSON.
+        """
+        if request.method == 'DELETE':
+            deleted = delete_posts(request.user.id, get_ids(request))
+            return Response({'deleted': deleted})
+        valid, errors = validate_items(
+            self.get_serializer(), get_items(request)
+        )
+        posts = create_posts(
+            request.user.id, [data for _, data in valid],
+            settings.API_BULK_CHUNK_SIZE
+        )
+        invalidate(*CACHE_DEPENDENCIES[Post])
+        created = [{'index': index, 'id': post.pk}
+                   for (index, _), post in zip(valid, posts)]
+        return bulk_response(created, errors)
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class FeedViewSet(ProfilingMixin, FastListMixin, mixins.ListModelMixin,
+                  viewsets.GenericViewSet):
+    """
+    Лента постов авторов, на которых подписан пользователь.
+    """
+    authentication_classes = (TokenUserAuthentication,)
+    serializer_class = PostSerializer
+    fast_serializer_class = PostListSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = FeedPagination
+
+    def get_queryset(self):
+        queryset = timeline.feed(self.request.user.id).defer('text')
+        return queryset.select_related('author', 'group').order_by(
+            *FeedPagination.order_by
+        )
+
+
+class GroupViewSet(ProfilingMixin, CachedResponseMixin,
+                   viewsets.ReadOnlyModelViewSet):
     """
     Обработка запросов к группам.
     """
-    queryset = Group.objects.all()
+    authentication_classes = (TokenUserAuthentication,)
+    # сводка по постам берется из posts_groupsummary одним LEFT JOIN
+    queryset = Group.objects.annotate(
+        post_count=Coalesce(F('summary__post_count'), 0),
+        last_post_at=F('summary__last_post_at')
+    )
+    cache_namespaces = ('groups',)
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return GroupSerializer
+            return GroupListSerializer
         return GroupDetailSerializer
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ProfilingMixin, CachedResponseMixin,
+                     ConditionalGetMixin, SparseFieldsetMixin, FastListMixin,
+                     OwnerLookupMixin, viewsets.ModelViewSet):
     """
     Обработка запросов к комментариям.
     """
+    authentication_classes = (TokenUserAuthentication,)
     serializer_class = CommentSerializer
+    cache_namespaces = ('comments',)
     permission_classes = (IsOwnerOrReadOnly,)
+    pagination_class = CommentPagination
+    fast_serializer_class = CommentListSerializer
+    expand_sources = {
+        'author': AUTHOR_SOURCES,
+    }
+    field_sources = {
+        'id': (),
+        'author': ('author__username',),
+        'created': ('created',),
+        'text': ('text',),
+        'post': ('post',),
+        'parent': ('parent',),
+        'reply_count': ('reply_count',),
+    }
+
+    def get_post_id(self):
+        # адрес пропускает только цифры
+        return int(self.kwargs['post_id'])
 
-    def get_post(self):
-        post_id = self.kwargs.get('post_id')
-        post = get_object_or_404(Post, pk=post_id)
-        return post
+    def get_post_version(self):
+        """
+        Версия поста или None, если поста нет. Читается один раз
+        за запрос и служит и валидатором ETag, и проверкой поста.
+        """
+        if not hasattr(self, '_post_version'):
+            self._post_version = Post.objects.filter(
+                pk=self.get_post_id()
+            ).values_list('version', flat=True).first()
+        return self._post_version
+
+    def check_post(self):
+        """404, если поста из адреса нет."""
+        if self.get_post_version() is None:
+            raise Http404
+
+    def get_etag_validator(self):
+        version = self.get_post_version()
+        if version is None:
+            return None
+        return f'comments-{self.get_post_id()}-{version}'
 
     def get_queryset(self):
-        post = self.get_post()
-        queryset = post.comments.all()
-        return queryset
+        # пост не читается: комментарии отбираются по post_id, а его
+        # существование проверяется, только если выборка пуста
+        queryset = Comment.objects.filter(post_id=self.get_post_id())
+        if self.action == 'destroy':
+            return queryset
+        return self.apply_fieldset(queryset.select_related('author'))
 
-    def perform_create(self, serializer):
-        serializer.save(
-            author=self.request.user,
-            post=self.get_post()
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # без пагинации queryset вычисляется здесь и переиспользуется
+        # сериализатором
+        if not (queryset if page is None else page):
+            self.check_post()
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # ответ возможен только на комментарий этого поста
+        context['post_id'] = self.get_post_id()
+        return context
+
+    def get_tree_params(self, request):
+        """Параметры root и depth, None — если не заданы."""
+        params = {}
+        for name, minimum in (('root', 1), ('depth', 0)):
+            value = request.query_params.get(name)
+            if value is None:
+                params[name] = None
+                continue
+            try:
+                params[name] = int(value)
+                if params[name] < minimum:
+                    raise ValueError
+            except ValueError:
+                raise serializers.ValidationError(
+                    {name: [f'Ожидается целое число не меньше {minimum}.']}
+                )
+        return params
+
+    @action(detail=False, pagination_class=CommentTreePagination)
+    def tree(self, request, post_id=None):
+        """
+        Дерево комментариев поста или ветка комментария `root`
+        не глубже `depth` уровней. Страница — отрезок обхода дерева
+        в глубину: ответы вложены в `replies`, а продолжение ветки
+        с прошлой страницы выводится на верхнем уровне с `parent`.
+        """
+        return self.conditional(self.get_tree, request)
+
+    def get_tree(self, request):
+        params = self.get_tree_params(request)
+        rows = threads.get_tree(self.get_post_id(), **params).values(
+            *CommentTreeSerializer.values
         )
+        page = self.paginate_queryset(rows)
+        if (not page and params['root'] is not None
+                and self.paginator.cursor_query_param
+                not in request.query_params):
+            # первой строкой ветки был бы сам root
+            raise Http404
+        return self.get_paginated_response(
+            CommentTreeSerializer(page, self.get_serializer_context()).data
+        )
+
+    def perform_create(self, serializer):
+        self.check_post()
+        with transaction.atomic():
+            serializer.save(
+                author_id=self.request.user.id,
+                post_id=self.get_post_id()
+            )
 
     def perform_update(self, serializer):
         serializer.save(
-            author=self.request.user,
-            post=self.get_post()
+            author_id=self.request.user.id,
+            post_id=self.get_post_id()
         )
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
-class FollowViewSet(CreateListRetrieveDeleteViewSet):
+    @action(detail=False, methods=['post', 'delete'],
+            parser_classes=BULK_PARSER_CLASSES)
+    def bulk(self, request, post_id=None):
+        """
+        Массовое создание (POST) и удаление своих комментариев (DELETE)
+        по списку объектов в JSON или NDJSON.
+        """
+        self.check_post()
+        post_id = self.get_post_id()
+        if request.method == 'DELETE':
+            deleted = delete_comments(
+                request.user.id, post_id, get_ids(request)
+            )
+            return Response({'deleted': deleted})
+        valid, errors = validate_items(
+            self.get_serializer(), get_items(request)
+        )
+        comments = create_comments(
+            request.user.id, post_id, [data for _, data in valid],
+            settings.API_BULK_CHUNK_SIZE
+        )
+        invalidate(*CACHE_DEPENDENCIES[Comment])
+        created = [{'index': index, 'id': comment.pk}
+                   for (index, _), comment in zip(valid, comments)]
+        return bulk_response(created, errors)
+
+
+class FollowViewSet(ProfilingMixin, FastListMixin,
+                    CreateListRetrieveDeleteViewSet):
     """
     Обработка запросов к подпискам.
     """
+    authentication_classes = (TokenUserAuthentication,)
     queryset = Follow.objects.all()
     serializer_class = FollowSerializer
     permission_classes = (
         permissions.IsAuthenticated,
         FollowObjectPermission,
     )
+    pagination_class = FollowPagination
+    fast_serializer_class = FollowListSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ('following__username',)
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = user.follower.all()
-        return queryset
+        return Follow.objects.filter(
+            user_id=self.request.user.id
+        ).select_related('user', 'following')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # без внешней транзакции: у INSERT подписки своя, без точки
+        # сохранения; дополнение ленты идемпотентно (ignore_conflicts)
+        follow = serializer.save(user_id=self.request.user.id)
+        timeline.backfill(follow)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            timeline.drop(instance)
+            instance.delete()
+
+    @action(detail=False, methods=['post', 'delete'],
+            parser_classes=BULK_PARSER_CLASSES)
+    def bulk(self, request):
+        """
+        Массовая подписка (POST, список объектов `following`)
+        и отписка (DELETE, список имен авторов).
+        """
+        if request.method == 'DELETE':
+            usernames = get_ids(request, child=serializers.CharField())
+            return Response({'deleted': unfollow(request.user.id, usernames)})
+        valid, errors = validate_items(
+            self.get_serializer(), get_items(request)
+        )
+        # повтор существующей подписки — ошибка, как у одиночной
+        # подписки; create_follows пропустил бы его молча
+        new = []
+        for index, data in valid:
+            if follow_graph.is_following(request.user.id,
+                                         data['following'].pk):
+                errors.append({'index': index, 'errors': {
+                    api_settings.NON_FIELD_ERRORS_KEY: [FOLLOW_EXISTS_ERROR]
+                }})
+            else:
+                new.append((index, data))
+        errors.sort(key=lambda error: error['index'])
+        # повторы внутри одного запроса создают одну подписку
+        authors = {data['following'].pk: (index, data['following'])
+                   for index, data in reversed(new)}
+        create_follows(
+            request.user.id, [author for _, author in authors.values()],
+            settings.API_BULK_CHUNK_SIZE
+        )
+        created = [
+            {'index': index, 'following': author.username}
+            for index, author in sorted(authors.values(), key=lambda x: x[0])
+        ]
+        return bulk_response(created, errors)
+
+
+class FollowGraphView(ProfilingMixin, generics.ListAPIView):
+    """
+    Подписчики (followers) или подписки (following) пользователя
+    постранично, с количеством тех и других из FollowSummary.
+    """
+    authentication_classes = (TokenUserAuthentication,)
+    pagination_class = FollowGraphPagination
+    serializer_classes = {
+        'followers': FollowerListSerializer,
+        'following': FollowingListSerializer,
+    }
+
+    def get_user(self):
+        """id пользователя и счетчики из сводки одним запросом."""
+        user = User.objects.filter(
+            username=self.kwargs['username']
+        ).values(
+            'pk', 'follow_summary__follower_count',
+            'follow_summary__following_count'
+        ).first()
+        if user is None:
+            raise Http404
+        if user['follow_summary__follower_count'] is None:
+            counts = follow_graph.get_counts(user['pk'])
+        else:
+            counts = {
+                'followers': user['follow_summary__follower_count'],
+                'following': user['follow_summary__following_count'],
+            }
+        return user['pk'], counts
+
+    def list(self, request, username, kind):
+        user_id, counts = self.get_user()
+        field, _ = follow_graph.DIRECTIONS[kind]
+        serializer_class = self.serializer_classes[kind]
+        rows = Follow.objects.filter(**{field: user_id}).values(
+            *serializer_class.values
+        )
+        page = self.paginate_queryset(rows)
+        return Response(OrderedDict([
+            ('followers_count', counts['followers']),
+            ('following_count', counts['following']),
+            ('next', self.paginator.get_next_link()),
+            ('results', serializer_class(page, {'request': request}).data),
+        ]))
+
+
+class FollowUserView(ProfilingMixin, views.APIView):
+    """
+    Идемпотентная подписка на пользователя (PUT) и отписка (DELETE).
+    PUT отвечает 201, если подписка создана, и 200, если она уже была;
+    DELETE отвечает 204, даже если подписки не было.
+    """
+    authentication_classes = (TokenUserAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def put(self, request, username):
+        author_id = User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        ).first()
+        if author_id is None:
+            raise Http404
+        try:
+            follow, created = follow_graph.follow(request.user.id, author_id)
+        except follow_graph.SelfFollowError:
+            raise serializers.ValidationError(
+                {'following': [SELF_FOLLOW_ERROR]}
+            )
+        if created:
+            timeline.backfill(follow)
+        return Response(
+            {'user': request.user.username, 'following': username},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def delete(self, request, username):
+        unfollow(request.user.id, [username])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsView(views.APIView):
+    """
+    Счетчики попаданий и промахов кеша ответов для мониторинга.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+class ExportView(views.APIView):
+    """
+    Потоковая выгрузка постов или комментариев в NDJSON
+    с фильтрами author, group, since, until.
+    Сжимается в gzip, если клиент передал Accept-Encoding: gzip.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+    filter_params = ('author', 'group', 'since', 'until')
+
+    def get_filters(self, request):
+        filters = {name: request.query_params.get(name)
+                   for name in self.filter_params}
+        try:
+            for name in ('since', 'until'):
+                if filters[name] is not None:
+                    filters[name] = export.parse_moment(filters[name])
+        except ValueError as exc:
+            raise serializers.ValidationError({name: str(exc)})
+        return filters
+
+    def get(self, request, kind):
+        blocks = export.iter_ndjson(kind, **self.get_filters(request))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        compress = 'gzip' in accept_encoding
+        if compress:
+            blocks = export.gzip_stream(blocks)
+        response = StreamingHttpResponse(
+            blocks, content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.ndjson"'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
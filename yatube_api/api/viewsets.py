@@ -1,4 +1,6 @@
-from rest_framework import mixins, viewsets
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from rest_framework import mixins, permissions, viewsets
 
 
 class CreateListRetrieveDeleteViewSet(
@@ -10,3 +12,37 @@ class CreateListRetrieveDeleteViewSet(
     Вьюсет, исключающий PUT/PATCH запросы.
     """
     pass
+
+
+class OwnerLookupMixin:
+    """
+    При PUT/PATCH/DELETE объект ищется сразу с условием на владельца
+    из разрешений с filter_queryset() (WHERE id = ? AND author_id = ?).
+    Если своего объекта нет, второй запрос отличает чужой объект (403)
+    от несуществующего (404), как это делает get_object() DRF.
+    """
+
+    def filter_owned(self, queryset):
+        for permission in self.get_permissions():
+            if hasattr(permission, 'filter_queryset'):
+                queryset = permission.filter_queryset(
+                    self.request, queryset, self
+                )
+        return queryset
+
+    def get_object(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return super().get_object()
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = self.filter_owned(queryset).get(**filter_kwargs)
+        except (TypeError, ValueError):
+            raise Http404
+        except ObjectDoesNotExist:
+            if queryset.filter(**filter_kwargs).exists():
+                self.permission_denied(self.request)
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
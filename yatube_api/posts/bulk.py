@@ -0,0 +1,166 @@
+"""
+Массовое создание и удаление записей.
+
+bulk_create не вызывает save() и сигналы, поэтому здесь вручную
+выполняется то, что для одиночных записей делают save() моделей,
+posts.signals и posts.timeline: превью, пути комментариев в дереве
+ответов, счетчики, ленты подписок, поисковый индекс, сводки групп
+и подписок.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from . import follow_graph, search, summaries, timeline
+from .models import (COMMENT_PATH_STEP, Comment, Follow, Post, User,
+                     make_comment_path, make_preview)
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_insert(model, objs):
+    """
+    bulk_create, после которого у объектов заполнены первичные ключи.
+    Если СУБД не возвращает ключи вставленных строк (SQLite), они
+    читаются в той же транзакции: пока она держит блокировку записи,
+    последние len(objs) ключей таблицы принадлежат только что
+    вставленным строкам, а AUTOINCREMENT выдает их по возрастанию.
+    """
+    objs = model.objects.bulk_create(objs)
+    if connection.features.can_return_ids_from_bulk_insert or not objs:
+        return objs
+    pks = model.objects.order_by('-pk').values_list('pk', flat=True)
+    for obj, pk in zip(objs, reversed(list(pks[:len(objs)]))):
+        obj.pk = pk
+    return objs
+
+
+def create_posts(author_id, items, chunk_size):
+    """Создает посты автора, каждая пачка — в отдельной транзакции."""
+    created = []
+    for chunk in chunks(items, chunk_size):
+        with transaction.atomic():
+            posts = _bulk_insert(Post, [
+                Post(author_id=author_id, preview=make_preview(data['text']),
+                     **data)
+                for data in chunk
+            ])
+            timeline.fan_out(*posts)
+            search.get_index(Post).index(*posts)
+            groups = Counter(post.group_id for post in posts)
+            for group_id, count in groups.items():
+                summaries.update(group_id, count)
+        created.extend(posts)
+    return created
+
+
+def _set_paths(comments):
+    """
+    Записывает пути после вставки, когда известны id: один UPDATE
+    на каждого родителя (путь родителя и id, дополненный нулями,
+    как в make_comment_path), обычно это один запрос.
+    """
+    siblings = defaultdict(list)
+    for comment in comments:
+        parent_path = comment.parent.path if comment.parent_id else ''
+        comment.path = make_comment_path(parent_path, comment.pk)
+        siblings[parent_path].append(comment.pk)
+    own_id = LPad(Cast('pk', CharField()), COMMENT_PATH_STEP, Value('0'))
+    for parent_path, ids in siblings.items():
+        Comment.objects.filter(pk__in=ids).update(
+            path=Concat(Value(parent_path), own_id) if parent_path
+            else own_id
+        )
+
+
+def _reply_depth(parent):
+    return 0 if parent is None else parent.depth + 1
+
+
+def create_comments(author_id, post_id, items, chunk_size):
+    """
+    Создает комментарии к посту, в том числе ответы, и обновляет
+    счетчики поста и родительских комментариев.
+    """
+    created = []
+    for chunk in chunks(items, chunk_size):
+        with transaction.atomic():
+            comments = _bulk_insert(Comment, [
+                Comment(author_id=author_id, post_id=post_id,
+                        depth=_reply_depth(data.get('parent')), **data)
+                for data in chunk
+            ])
+            _set_paths(comments)
+            replies = Counter(comment.parent_id for comment in comments
+                              if comment.parent_id is not None)
+            for parent_id, count in replies.items():
+                Comment.objects.filter(pk=parent_id).update(
+                    reply_count=F('reply_count') + count
+                )
+            Post.objects.filter(pk=post_id).update(
+                comment_count=F('comment_count') + len(comments),
+                version=F('version') + 1
+            )
+            search.get_index(Comment).index(*comments)
+        created.extend(comments)
+    return created
+
+
+def create_follows(user_id, following, chunk_size):
+    """
+    Подписывает пользователя на авторов.
+    Уже существующие подписки пропускаются.
+    """
+    created = []
+    for chunk in chunks(following, chunk_size):
+        with transaction.atomic():
+            follows = Follow.objects.bulk_create(
+                [Follow(user_id=user_id, following_id=author.pk)
+                 for author in chunk],
+                ignore_conflicts=True
+            )
+            # пропущенные подписки неизвестны, счетчики пересчитываются
+            follow_graph.rebuild(
+                [user_id, *(follow.following_id for follow in follows)]
+            )
+            follow_graph.invalidate(*follows)
+            for follow in follows:
+                timeline.backfill(follow)
+        created.extend(follows)
+    return created
+
+
+def delete_posts(author_id, ids):
+    """Удаляет посты автора по списку id, возвращает их количество."""
+    with transaction.atomic():
+        _, deleted = Post.objects.filter(
+            author_id=author_id, pk__in=ids
+        ).delete()
+    return deleted.get(Post._meta.label, 0)
+
+
+def delete_comments(author_id, post_id, ids):
+    """Удаляет комментарии автора к посту по списку id."""
+    with transaction.atomic():
+        _, deleted = Comment.objects.filter(
+            author_id=author_id, post_id=post_id, pk__in=ids
+        ).delete()
+    return deleted.get(Comment._meta.label, 0)
+
+
+def unfollow(user_id, usernames):
+    """Отписывает пользователя от авторов по списку имен."""
+    with transaction.atomic():
+        follows = Follow.objects.filter(
+            user_id=user_id,
+            following__in=User.objects.filter(username__in=usernames)
+        )
+        for follow in follows:
+            timeline.drop(follow)
+        _, deleted = follows.delete()
+    return deleted.get(Follow._meta.label, 0)
@@ -0,0 +1,122 @@
+"""
+Потоковая выгрузка постов и комментариев в NDJSON.
+
+Записи читаются через .iterator(chunk_size), строки склеиваются
+в блоки по BLOCK_SIZE байт, поэтому расход памяти не зависит
+от объема выгрузки.
+"""
+import zlib
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Post
+
+BLOCK_SIZE = 64 * 1024
+DEFAULT_CHUNK_SIZE = 2000
+
+POST_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'group': 'group_id',
+    'comments': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def parse_moment(value):
+    """Дата или дата со временем в формате ISO 8601."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}.')
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_posts(queryset, author=None, group=None, since=None, until=None):
+    """
+    Фильтрует посты по имени автора, slug группы
+    и полуоткрытому интервалу дат публикации [since, until).
+    """
+    if author is not None:
+        queryset = queryset.filter(author__username=author)
+    if group is not None:
+        queryset = queryset.filter(group__slug=group)
+    if since is not None:
+        queryset = queryset.filter(pub_date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(pub_date__lt=until)
+    return queryset
+
+
+def posts_queryset(author=None, group=None, since=None, until=None):
+    return filter_posts(Post.objects.all(), author, group, since, until)
+
+
+def comments_queryset(author=None, group=None, since=None, until=None):
+    """Комментарии автора к постам группы за интервал дат создания."""
+    queryset = Comment.objects.all()
+    if author is not None:
+        queryset = queryset.filter(author__username=author)
+    if group is not None:
+        queryset = queryset.filter(post__group__slug=group)
+    if since is not None:
+        queryset = queryset.filter(created__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created__lt=until)
+    return queryset
+
+
+EXPORTS = {
+    'posts': (posts_queryset, POST_FIELDS),
+    'comments': (comments_queryset, COMMENT_FIELDS),
+}
+
+
+def iter_ndjson(kind, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Блоки байтов NDJSON с записями выбранного типа."""
+    get_queryset, fields = EXPORTS[kind]
+    rows = (
+        get_queryset(**filters)
+        .order_by('pk')
+        .values_list(*fields.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    names = list(fields)
+    block = []
+    size = 0
+    for row in rows:
+        line = encoder.encode(dict(zip(names, row))).encode() + b'\n'
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block = []
+            size = 0
+    if block:
+        yield b''.join(block)
+
+
+def gzip_stream(blocks):
+    """Сжимает поток блоков в gzip на лету."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
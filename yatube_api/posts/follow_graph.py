@@ -0,0 +1,203 @@
+"""
+Граф подписок.
+
+Количество подписчиков и подписок хранится в FollowSummary и меняется
+атомарным UPDATE на разницу при создании и удалении подписки
+(см. posts.signals). Изменения в обход сигналов (bulk_create,
+queryset.update()) исправляет rebuild() или команда
+rebuild_follow_summaries.
+
+Множества id подписок и подписчиков пользователя кешируются
+(FOLLOW_GRAPH_CACHE_ALIAS), поэтому проверка «A подписан на B» —
+поиск в множестве из кеша без запроса к базе. Ключи удаляются при
+изменении подписки и еще раз после фиксации транзакции: иначе
+параллельный запрос мог бы записать в кеш состояние до нее.
+
+Подписка создается одним INSERT без предварительных проверок (см.
+follow()): повтор и подписку на себя отсекают ограничения модели
+Follow, поэтому одновременные запросы не создают дублей.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, FollowSummary, User
+
+KEY_PREFIX = 'follow-graph'
+
+# поле Follow с пользователем и поле Follow с его соседями в графе
+DIRECTIONS = {
+    'following': ('user_id', 'following_id'),
+    'followers': ('following_id', 'user_id'),
+}
+COUNT_FIELDS = {
+    'following': 'following_count',
+    'followers': 'follower_count',
+}
+# ограничение Follow, запрещающее подписку на самого себя
+SELF_FOLLOW_CONSTRAINT = 'user_not_following'
+
+
+class SelfFollowError(ValueError):
+    """Подписка на самого себя."""
+
+
+def get_cache():
+    return caches[settings.FOLLOW_GRAPH_CACHE_ALIAS]
+
+
+def _key(direction, user_id):
+    return f'{KEY_PREFIX}:{direction}:{user_id}'
+
+
+def _get_ids(direction, user_id, limit=None):
+    cache = get_cache()
+    key = _key(direction, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        if (limit is not None
+                and get_counts(user_id)[direction] > limit):
+            return None
+        field, other = DIRECTIONS[direction]
+        ids = frozenset(
+            Follow.objects.filter(**{field: user_id})
+            .values_list(other, flat=True)
+        )
+        # огромные множества подписчиков не держим в кеше
+        if len(ids) <= settings.FOLLOW_GRAPH_CACHE_MAX_IDS:
+            cache.set(key, ids, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+    if limit is not None and len(ids) > limit:
+        return None
+    return ids
+
+
+def get_following_ids(user_id):
+    """id авторов, на которых подписан пользователь."""
+    return _get_ids('following', user_id)
+
+
+def get_follower_ids(user_id, limit=None):
+    """
+    id подписчиков пользователя. Если их больше limit, возвращает
+    None, не выбирая их из базы.
+    """
+    return _get_ids('followers', user_id, limit)
+
+
+def is_following(user_id, author_id):
+    """Подписан ли пользователь на автора."""
+    return author_id in get_following_ids(user_id)
+
+
+def get_counts(user_id):
+    """Словарь с количеством подписчиков (followers) и подписок."""
+    counts = FollowSummary.objects.filter(user_id=user_id).values(
+        'follower_count', 'following_count'
+    ).first()
+    if counts is None:
+        # пользователь создан в обход сигналов и без подписок через
+        # них; чтение не пишет в базу, сводку исправит rebuild()
+        counts = {'follower_count': 0, 'following_count': 0}
+    return {direction: counts[field]
+            for direction, field in COUNT_FIELDS.items()}
+
+
+def get_follower_count(user_id):
+    return get_counts(user_id)['followers']
+
+
+def invalidate(*follows):
+    """Удаляет из кеша множества пользователей из подписок follows."""
+    keys = set()
+    for follow in follows:
+        keys.add(_key('following', follow.user_id))
+        keys.add(_key('followers', follow.following_id))
+    if not keys:
+        return
+    cache = get_cache()
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def follow(user_id, author_id):
+    """
+    Подписывает пользователя на автора. Возвращает пару (подписка,
+    создана ли); если подписка уже была, у возвращенной нет id.
+    """
+    instance = Follow(user_id=user_id, following_id=author_id)
+    try:
+        # внутри внешней транзакции — точка сохранения, ошибка INSERT
+        # ее не прерывает
+        with transaction.atomic():
+            instance.save(force_insert=True)
+    except IntegrityError as exc:
+        if SELF_FOLLOW_CONSTRAINT in str(exc):
+            raise SelfFollowError(str(exc)) from exc
+        # запрос только на редком пути: отличает повтор (re_follow_check)
+        # от других нарушений, например удаленного автора
+        if not Follow.objects.filter(
+            user_id=user_id, following_id=author_id
+        ).exists():
+            raise
+        return instance, False
+    return instance, True
+
+
+def create_summary(user_id):
+    """
+    Пустая сводка, если ее еще нет: INSERT с пропуском конфликта,
+    поэтому одновременные вызовы не ломают друг другу транзакции.
+    """
+    FollowSummary.objects.bulk_create(
+        [FollowSummary(user_id=user_id)], ignore_conflicts=True
+    )
+
+
+def _update(user_id, field, delta):
+    changes = {field: Greatest(F(field) + delta, 0)}
+    updated = FollowSummary.objects.filter(user_id=user_id).update(**changes)
+    if not updated and delta > 0:
+        # сводки еще нет, пользователь создан в обход сигналов; при
+        # отписке ее может не быть потому, что пользователь удаляется
+        create_summary(user_id)
+        FollowSummary.objects.filter(user_id=user_id).update(**changes)
+
+
+def followed(follow):
+    """Учитывает новую подписку."""
+    _update(follow.user_id, 'following_count', 1)
+    _update(follow.following_id, 'follower_count', 1)
+    invalidate(follow)
+
+
+def unfollowed(follow):
+    """Учитывает удаленную подписку."""
+    _update(follow.user_id, 'following_count', -1)
+    _update(follow.following_id, 'follower_count', -1)
+    invalidate(follow)
+
+
+def _count(field):
+    return Coalesce(Subquery(
+        Follow.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+def rebuild(user_ids=None):
+    """Пересчитывает сводки заданных пользователей, по умолчанию — всех."""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    rows = users.annotate(
+        follower_total=_count('following'), following_total=_count('user')
+    ).values_list('pk', 'follower_total', 'following_total')
+    with transaction.atomic():
+        FollowSummary.objects.filter(user__in=users).delete()
+        FollowSummary.objects.bulk_create(
+            FollowSummary(user_id=pk, follower_count=followers,
+                          following_count=following)
+            for pk, followers, following in rows
+        )
@@ -0,0 +1,137 @@
+"""
+Уменьшенные копии картинок постов для списков и мобильных клиентов.
+
+После загрузки картинки (см. Post.save и posts.signals) копии
+шириной POST_IMAGE_WIDTHS строятся в пуле из POST_IMAGE_WORKERS
+потоков, когда транзакция уже зафиксирована; при нуле потоков —
+сразу после фиксации в том же потоке. Готовые ширины записываются
+в Post.image_widths, адреса копий вычисляются из имени оригинала
+без обращения к хранилищу (см. derivative_urls).
+
+Копии сохраняются в WebP, если Pillow собран с его поддержкой,
+иначе в JPEG. Копии шире оригинала не строятся.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_format():
+    """Формат копий и расширение файла."""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def derivative_name(name, width):
+    """Имя копии в хранилище: posts/derivatives/<оригинал>_<ширина>.<ext>."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    extension = get_format()[1]
+    return os.path.join(
+        directory, DERIVATIVES_DIR, f'{stem}_{width}.{extension}'
+    )
+
+
+def parse_widths(value):
+    return [int(width) for width in value.split(',') if width]
+
+
+def derivative_urls(name, widths):
+    """Ширина -> адрес копии, по возрастанию ширины."""
+    if not name:
+        return {}
+    return {
+        str(width): default_storage.url(derivative_name(name, width))
+        for width in parse_widths(widths)
+    }
+
+
+def generate(name):
+    """
+    Строит копии картинки `name` и возвращает их ширины.
+    JPEG декодируется сразу в уменьшенном масштабе (Image.draft),
+    каждая следующая копия уменьшается из предыдущей.
+    """
+    image_format, _ = get_format()
+    with default_storage.open(name) as file, Image.open(file) as image:
+        largest = max(settings.POST_IMAGE_WIDTHS)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        widths = sorted(
+            (width for width in settings.POST_IMAGE_WIDTHS
+             if width < image.width),
+            reverse=True
+        )
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(
+                buffer, image_format, quality=settings.POST_IMAGE_QUALITY
+            )
+            target = derivative_name(name, width)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    return sorted(widths)
+
+
+def process(post_id, name):
+    """Строит копии и записывает их ширины, если картинку не заменили."""
+    from .models import Post
+
+    widths = generate(name)
+    with transaction.atomic():
+        post = Post.objects.select_for_update().filter(
+            pk=post_id, image=name
+        ).first()
+        if post is None:
+            return
+        post.image_widths = ','.join(str(width) for width in widths)
+        post.save(update_fields=['image_widths'])
+
+
+def process_in_worker(post_id, name):
+    try:
+        process(post_id, name)
+    except Exception:
+        logger.exception('Не удалось построить копии картинки %s', name)
+    finally:
+        # у каждого потока пула свое соединение с базой
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.POST_IMAGE_WORKERS, thread_name_prefix='post-images'
+            )
+        return _executor
+
+
+def schedule(post_id, name):
+    """Ставит построение копий в очередь после фиксации транзакции."""
+    if not settings.POST_IMAGE_WORKERS:
+        transaction.on_commit(lambda: process(post_id, name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(process_in_worker, post_id, name)
+    )
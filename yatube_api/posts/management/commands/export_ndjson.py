@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument('--author', help='Имя автора.')
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--since', help='Начало интервала, ISO 8601.')
+        parser.add_argument('--until', help='Конец интервала, ISO 8601.')
+        parser.add_argument(
+            '--output', '-o', help='Файл выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать выгрузку в gzip.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        filters = {name: options[name]
+                   for name in ('author', 'group', 'since', 'until')}
+        try:
+            for name in ('since', 'until'):
+                if filters[name] is not None:
+                    filters[name] = export.parse_moment(filters[name])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        blocks = export.iter_ndjson(
+            options['kind'], chunk_size=options['chunk_size'], **filters
+        )
+        if options['gzip']:
+            blocks = export.gzip_stream(blocks)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(blocks)
+        else:
+            sys.stdout.buffer.writelines(blocks)
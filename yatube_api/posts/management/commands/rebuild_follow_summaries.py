@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from posts import follow_graph
+from posts.models import FollowSummary
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает количество подписчиков и подписок пользователей.'
+
+    def handle(self, *args, **options):
+        follow_graph.rebuild()
+        self.stdout.write(
+            f'Пересчитано сводок: {FollowSummary.objects.count()}.'
+        )
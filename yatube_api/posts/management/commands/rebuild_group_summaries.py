@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from posts import summaries
+from posts.models import GroupSummary
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки групп: количество постов и дату последнего.'
+
+    def handle(self, *args, **options):
+        summaries.rebuild()
+        self.stdout.write(
+            f'Пересчитано сводок: {GroupSummary.objects.count()}.'
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        for model in search.SEARCH_FIELDS:
+            with transaction.atomic():
+                search.get_index(model).rebuild()
+            self.stdout.write(
+                f'Индекс {model._meta.label} перестроен.'
+            )
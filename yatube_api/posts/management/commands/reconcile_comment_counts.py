@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Post.comment_count с фактическим числом комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество постов, проверяемых за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        actual_count = Coalesce(
+            Subquery(
+                Comment.objects.filter(post=OuterRef('pk'))
+                .order_by()
+                .values('post')
+                .annotate(total=Count('pk'))
+                .values('total')
+            ),
+            0
+        )
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Post.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .annotate(actual=actual_count)
+                    .values_list('pk', 'comment_count', 'actual')
+                    [:batch_size]
+                )
+                if not batch:
+                    break
+                drifted = [pk for pk, stored, actual in batch
+                           if stored != actual]
+                if drifted:
+                    # пересчет одним UPDATE, чтобы не затереть комментарии,
+                    # добавленные между чтением и записью
+                    Post.objects.filter(pk__in=drifted).update(
+                        comment_count=actual_count
+                    )
+            last_pk = batch[-1][0]
+            checked += len(batch)
+            fixed += len(drifted)
+        self.stdout.write(
+            f'Проверено постов: {checked}, исправлено: {fixed}.'
+        )
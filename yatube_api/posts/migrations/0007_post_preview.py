@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:47
+
+import textwrap
+
+from django.db import migrations, models
+
+
+def fill_preview(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'text').iterator(chunk_size=1000):
+        post.preview = textwrap.shorten(post.text, width=100)
+        batch.append(post)
+        if len(batch) == 1000:
+            Post.objects.bulk_update(batch, ['preview'])
+            batch = []
+    Post.objects.bulk_update(batch, ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Превью'),
+        ),
+        migrations.RunPython(fill_preview, migrations.RunPython.noop),
+    ]
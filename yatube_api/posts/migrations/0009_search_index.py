@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# таблица и поле, по которому ведется поиск
+SEARCH_TABLES = (
+    ('posts_post', 'text'),
+    ('posts_comment', 'text'),
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column in SEARCH_TABLES:
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {table}_search '
+                f'USING fts5({column}, tokenize="unicode61")'
+            )
+            schema_editor.execute(
+                f'INSERT INTO {table}_search (rowid, {column}) '
+                f'SELECT id, {column} FROM {table}'
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX {table}_search ON {table} '
+                f"USING GIN (to_tsvector('russian', {column}))"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, _ in SEARCH_TABLES:
+        if vendor == 'sqlite':
+            schema_editor.execute(f'DROP TABLE {table}_search')
+        elif vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX {table}_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
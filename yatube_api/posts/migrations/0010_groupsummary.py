@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def fill_summaries(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupSummary = apps.get_model('posts', 'GroupSummary')
+    rows = Group.objects.annotate(
+        total=Count('posts'), latest=Max('posts__pub_date')
+    ).values_list('pk', 'total', 'latest')
+    GroupSummary.objects.bulk_create(
+        [GroupSummary(group_id=pk, post_count=total, last_post_at=latest)
+         for pk, total, latest in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupSummary',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='posts.Group')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+            ],
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_groupsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_widths',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='Ширины копий картинки'),
+        ),
+    ]
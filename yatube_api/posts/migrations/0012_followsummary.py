@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:39
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_summaries(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    FollowSummary = apps.get_model('posts', 'FollowSummary')
+    counts = defaultdict(lambda: [0, 0])
+    for index, field in enumerate(('following', 'user')):
+        rows = Follow.objects.order_by().values(field).annotate(
+            total=Count('id')
+        ).values_list(field, 'total')
+        for user_id, total in rows:
+            counts[user_id][index] = total
+    FollowSummary.objects.bulk_create(
+        [FollowSummary(user_id=user_id, follower_count=followers,
+                       following_count=following)
+         for user_id, (followers, following) in counts.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_post_image_widths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('follower_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписок')),
+            ],
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_comment_threads'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_following_user_idx',
+        ),
+    ]
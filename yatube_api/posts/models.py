@@ -1,9 +1,37 @@
+import textwrap
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import F, Q
 
 User = get_user_model()
 
+PREVIEW_WIDTH = 100
+
+_preview_wrapper = textwrap.TextWrapper(width=PREVIEW_WIDTH, max_lines=1)
+
+
+def make_preview(text):
+    """
+    То же, что textwrap.shorten(text, width=100),
+    но без создания TextWrapper на каждый вызов.
+    """
+    text = ' '.join(text.strip().split())
+    if len(text) <= PREVIEW_WIDTH:
+        return text
+    return _preview_wrapper.fill(text)
+
+
+# сегмент материализованного пути комментария — id, дополненный
+# нулями (см. posts.threads)
+COMMENT_PATH_STEP = 10
+COMMENT_PATH_MAX_LENGTH = 255
+COMMENT_MAX_DEPTH = COMMENT_PATH_MAX_LENGTH // COMMENT_PATH_STEP - 1
+
+
+def make_comment_path(parent_path, pk):
+    return f'{parent_path}{pk:0{COMMENT_PATH_STEP}d}'
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -14,8 +42,30 @@ class Group(models.Model):
         return self.title
 
 
+class GroupSummary(models.Model):
+    """
+    Материализованная сводка по постам группы.
+    Обновляется сигналами при создании, удалении и переносе постов
+    между группами (см. posts.summaries), удаляется вместе с группой.
+    """
+    group = models.OneToOneField(
+        Group, on_delete=models.CASCADE, primary_key=True,
+        related_name='summary'
+    )
+    post_count = models.PositiveIntegerField(
+        'Количество постов', default=0
+    )
+    last_post_at = models.DateTimeField(
+        'Дата последнего поста', null=True, blank=True
+    )
+
+
 class Post(models.Model):
     text = models.TextField()
+    # сокращенный текст для списков, пересчитывается в save()
+    preview = models.CharField(
+        'Превью', max_length=PREVIEW_WIDTH, blank=True, editable=False
+    )
     pub_date = models.DateTimeField(
         'Дата публикации', auto_now_add=True
     )
@@ -25,14 +75,87 @@ class Post(models.Model):
     image = models.ImageField(
         upload_to='posts/', null=True, blank=True
     )
+    # ширины готовых уменьшенных копий картинки через запятую,
+    # их записывает фоновый обработчик, см. posts.images
+    image_widths = models.CharField(
+        'Ширины копий картинки', max_length=64, blank=True, default='',
+        editable=False
+    )
     group = models.ForeignKey(
         Group, on_delete=models.SET_NULL,
         related_name="posts", blank=True, null=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    # растет при каждом изменении поста или его комментариев,
+    # служит дешевым валидатором для ETag
+    version = models.PositiveIntegerField(
+        'Версия', default=1, editable=False
+    )
+
+    # счетчики меняются только атомарными UPDATE
+    counter_fields = ('comment_count', 'version')
+    # поля, которые пишет фоновый обработчик картинок
+    worker_fields = ('image_widths',)
+
+    class Meta:
+        ordering = ('pub_date', 'id')
+        indexes = [
+            # ключ курсорной пагинации постов; SQLite читает индекс
+            # в обе стороны, поэтому он же обслуживает сортировку
+            # от новых к старым
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает превью. При обновлении поста не перезаписывает
+        счетчики и ширины копий картинки, чтобы не затереть изменения
+        из параллельных запросов и фонового обработчика,
+        и атомарно увеличивает версию. Новая картинка сбрасывает
+        ширины копий, копии строит posts.signals.build_image_derivatives.
+        """
+        self.preview = make_preview(self.text)
+        # FieldFile.pre_save сохранит файл и пометит его зафиксированным
+        image_changed = not (self.image and self.image._committed)
+        update_fields = kwargs.get('update_fields')
+        self._image_uploaded = bool(self.image) and image_changed and (
+            update_fields is None or 'image' in update_fields
+        )
+        updating = not self._state.adding
+        if updating:
+            if update_fields is None:
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name not in self.counter_fields
+                    and field.name not in self.worker_fields
+                ]
+                if image_changed:
+                    self.image_widths = ''
+                    update_fields.append('image_widths')
+            elif 'text' in update_fields:
+                update_fields = [*update_fields, 'preview']
+            kwargs['update_fields'] = [*update_fields, 'version']
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if updating:
+            self.refresh_from_db(fields=['version'])
+
 
 class Comment(models.Model):
     author = models.ForeignKey(
@@ -45,6 +168,63 @@ class Comment(models.Model):
     created = models.DateTimeField(
         'Дата добавления', auto_now_add=True, db_index=True
     )
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True,
+        related_name='replies', verbose_name='Ответ на'
+    )
+    # id предков и свой, заполняется в save() после INSERT
+    path = models.CharField(
+        'Путь в дереве', max_length=COMMENT_PATH_MAX_LENGTH, blank=True,
+        editable=False
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Глубина', default=0, editable=False
+    )
+    reply_count = models.PositiveIntegerField(
+        'Количество ответов', default=0, editable=False
+    )
+
+    # поля, которые меняют только сигналы и save() при создании
+    tree_fields = ('path', 'depth', 'reply_count')
+
+    class Meta:
+        ordering = ('created', 'id')
+        indexes = [
+            # комментарии поста в порядке добавления
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+            # дерево и ветки поста в порядке обхода в глубину
+            models.Index(
+                fields=['post', 'path', 'depth'],
+                name='comment_post_path_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Новому ответу задает глубину, а после INSERT — путь: в нем
+        есть собственный id. При обновлении поля дерева
+        не перезаписываются, чтобы не затереть счетчик ответов
+        из параллельных запросов.
+        """
+        if not self._state.adding:
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name not in self.tree_fields
+                ]
+            super().save(*args, **kwargs)
+            return
+        parent_path = ''
+        if self.parent_id is not None:
+            self.depth = self.parent.depth + 1
+            parent_path = self.parent.path
+        super().save(*args, **kwargs)
+        self.path = make_comment_path(parent_path, self.pk)
+        Comment.objects.filter(pk=self.pk).update(path=self.path)
 
 
 class Follow(models.Model):
@@ -60,6 +240,7 @@ class Follow(models.Model):
     )
 
     class Meta:
+        ordering = ('id',)
         constraints = [
             models.CheckConstraint(
                 check=~Q(user=F('following')),
@@ -70,8 +251,60 @@ class Follow(models.Model):
                 name='re_follow_check'
             ),
         ]
+        # подписчиков автора выбирает индекс внешнего ключа following:
+        # в SQLite он продолжается rowid и сразу отдает подписчиков
+        # в порядке id, как их листает FollowGraphPagination;
+        # подписки пользователя обслуживает индекс re_follow_check
 
     def __str__(self):
         user = self.user
         following = self.following
         return f'{user} подписан на {following}'
+
+
+class FollowSummary(models.Model):
+    """
+    Количество подписчиков и подписок пользователя.
+    Обновляется сигналами при создании и удалении подписок
+    (см. posts.follow_graph), удаляется вместе с пользователем.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='follow_summary'
+    )
+    # индекс выбирает немногих авторов, чьи посты попадают в ленты
+    # при чтении (см. posts.timeline)
+    follower_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, db_index=True
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0
+    )
+
+
+class TimelineEntry(models.Model):
+    """
+    Запись в предрассчитанной ленте пользователя:
+    пост автора, на которого пользователь подписан.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
@@ -0,0 +1,220 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND (путь к классу) или,
+если она не задана, по СУБД:
+- SQLite: виртуальная таблица FTS5 на каждую модель, строки в ней
+  обновляются сигналами (см. posts.signals) и массовыми операциями
+  (см. posts.bulk);
+- PostgreSQL: GIN индекс по выражению to_tsvector(), который СУБД
+  поддерживает сама;
+- остальные: LIKE без ранжирования.
+
+Таблицы и индексы создает миграция 0009_search_index, пересобрать
+их можно командой rebuild_search_index.
+
+СУБД отмечает совпадения во фрагменте символами HIGHLIGHT_START и
+HIGHLIGHT_END, а не тегами: текст поста пишет пользователь, поэтому
+render_highlight сначала экранирует фрагмент и только потом заменяет
+маркеры на <mark>.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+# символы из области для частного использования Unicode
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+# модели с поиском и поле, по которому ищем
+SEARCH_FIELDS = {
+    Post: 'text',
+    Comment: 'text',
+}
+
+_word = re.compile(r'\w+')
+
+
+def render_highlight(snippet):
+    """Фрагмент из search_highlight как HTML с совпадениями в <mark>."""
+    if snippet is None:
+        return None
+    return str(escape(snippet)).replace(
+        HIGHLIGHT_START, '<mark>'
+    ).replace(HIGHLIGHT_END, '</mark>')
+
+
+def get_terms(query):
+    """Слова из строки запроса, без операторов языка запросов СУБД."""
+    return _word.findall(query.lower())
+
+
+class SearchIndex:
+    """
+    Поисковый индекс по текстовому полю модели.
+    search() отбирает записи, в которых есть все слова запроса
+    (последнее — как префикс), добавляет к ним `search_rank`
+    и `search_highlight` (неэкранированный текст с маркерами,
+    см. render_highlight) и сортирует по релевантности.
+    """
+    rank_ordering = 'search_rank'
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.table = model._meta.db_table
+        self.column = model._meta.get_field(field).column
+
+    def search(self, queryset, query):
+        terms = get_terms(query)
+        if not terms:
+            return queryset.none()
+        return self.filter(queryset, terms).order_by(self.rank_ordering)
+
+    def filter(self, queryset, terms):
+        raise NotImplementedError
+
+    def index(self, *objs):
+        """Добавляет или обновляет записи в индексе."""
+
+    def remove(self, *pks):
+        """Удаляет записи из индекса."""
+
+    def rebuild(self):
+        """Заново строит индекс по всей таблице."""
+
+
+class LikeSearchIndex(SearchIndex):
+    """Запасной вариант без индекса: LIKE по каждому слову."""
+    rank_ordering = '-pk'
+
+    def filter(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(
+                **{f'{self.field}__icontains': term}
+            )
+        return queryset.extra(select={
+            'search_rank': '0',
+            'search_highlight': f'{self.table}.{self.column}',
+        })
+
+
+class SQLiteSearchIndex(SearchIndex):
+    """
+    Таблица FTS5 `<таблица>_search`, rowid строки совпадает
+    с первичным ключом записи. rank в FTS5 — bm25 со знаком минус,
+    поэтому лучшие совпадения идут первыми при сортировке по возрастанию.
+    """
+    snippet_tokens = 32
+
+    def __init__(self, model, field):
+        super().__init__(model, field)
+        self.fts_table = f'{self.table}_search'
+
+    def get_match(self, terms):
+        *words, last = terms
+        return ' '.join([*(f'"{word}"' for word in words), f'"{last}"*'])
+
+    def filter(self, queryset, terms):
+        fts = self.fts_table
+        pk = f'{self.table}.{self.model._meta.pk.column}'
+        return queryset.extra(
+            tables=[fts],
+            where=[f'{fts}.rowid = {pk}', f'{fts} MATCH %s'],
+            params=[self.get_match(terms)],
+            select={
+                'search_rank': f'{fts}.rank',
+                'search_highlight': (
+                    f"snippet({fts}, 0, '{HIGHLIGHT_START}', "
+                    f"'{HIGHLIGHT_END}', '...', {self.snippet_tokens})"
+                ),
+            },
+        )
+
+    def index(self, *objs):
+        rows = [(obj.pk, getattr(obj, self.field)) for obj in objs]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.fts_table} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.fts_table} (rowid, {self.column}) '
+                f'VALUES (%s, %s)',
+                rows
+            )
+
+    def remove(self, *pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.fts_table} WHERE rowid = %s',
+                [(pk,) for pk in pks]
+            )
+
+    def rebuild(self):
+        pk = self.model._meta.pk.column
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.fts_table}')
+            cursor.execute(
+                f'INSERT INTO {self.fts_table} (rowid, {self.column}) '
+                f'SELECT {pk}, {self.column} FROM {self.table}'
+            )
+
+
+class PostgresSearchIndex(SearchIndex):
+    """
+    GIN индекс `<таблица>_search` по to_tsvector(config, поле);
+    выражение в запросе совпадает с индексным, иначе индекс
+    не будет использован.
+    """
+    rank_ordering = '-search_rank'
+    config = 'russian'
+
+    def get_match(self, terms):
+        *words, last = terms
+        return ' & '.join([*(f"'{word}'" for word in words), f"'{last}':*"])
+
+    def filter(self, queryset, terms):
+        column = f'{self.table}.{self.column}'
+        vector = f"to_tsvector('{self.config}', {column})"
+        tsquery = f"to_tsquery('{self.config}', %s)"
+        match = self.get_match(terms)
+        options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}'
+        return queryset.extra(
+            where=[f'{vector} @@ {tsquery}'],
+            params=[match],
+            select={
+                'search_rank': f'ts_rank({vector}, {tsquery})',
+                'search_highlight': (
+                    f"ts_headline('{self.config}', {column}, {tsquery}, "
+                    f"'{options}')"
+                ),
+            },
+            select_params=[match, match],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchIndex,
+    'postgresql': PostgresSearchIndex,
+}
+
+
+def get_backend_class():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)
+    return BACKENDS.get(connection.vendor, LikeSearchIndex)
+
+
+def get_index(model):
+    return get_backend_class()(model, SEARCH_FIELDS[model])
+
+
+def search(queryset, query):
+    """Записи queryset, подходящие под запрос, по убыванию релевантности."""
+    return get_index(queryset.model).search(queryset, query)
@@ -0,0 +1,176 @@
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import follow_graph, images, search, summaries, timeline
+from .models import Comment, Follow, Group, GroupSummary, Post, User
+
+# поля пользователя, которые выводятся в постах и комментариях
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик комментариев поста при создании комментария
+    и версию поста при любом изменении комментария.
+    """
+    changes = {'version': F('version') + 1}
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    Post.objects.filter(pk=instance.post_id).update(**changes)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик комментариев поста при удалении комментария,
+    в том числе при каскадном удалении вместе с автором.
+    """
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        version=F('version') + 1
+    )
+
+
+@receiver(post_save, sender=Comment)
+def increment_reply_count(sender, instance, created, **kwargs):
+    """Увеличивает счетчик ответов родителя при создании ответа."""
+    if created and instance.parent_id is not None:
+        Comment.objects.filter(pk=instance.parent_id).update(
+            reply_count=F('reply_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_reply_count(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик ответов родителя при удалении ответа; при
+    каскадном удалении ветки родитель уже удален, UPDATE ничего не меняет.
+    """
+    if instance.parent_id is not None:
+        Comment.objects.filter(pk=instance.parent_id).update(
+            reply_count=Greatest(F('reply_count') - 1, 0)
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, created, update_fields, **kwargs):
+    """Обновляет запись в поисковом индексе при изменении текста."""
+    field = search.SEARCH_FIELDS[sender]
+    if created or update_fields is None or field in update_fields:
+        search.get_index(sender).index(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.get_index(sender).remove(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def create_group_summary(sender, instance, created, **kwargs):
+    if created:
+        GroupSummary.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=User)
+def create_follow_summary(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.create_summary(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_group_posts_version(sender, instance, created=False, **kwargs):
+    """
+    Увеличивает версию постов группы при ее изменении и удалении:
+    название группы входит в ответ с постом, а SET_NULL при удалении
+    обновляет посты без сигналов.
+    """
+    if not created:
+        Post.objects.filter(group_id=instance.pk).update(
+            version=F('version') + 1
+        )
+
+
+@receiver(post_save, sender=User)
+def bump_author_posts_version(sender, instance, created, update_fields,
+                              **kwargs):
+    """
+    Увеличивает версию постов, в которых пользователь автор поста
+    или комментария, при изменении его полей из AUTHOR_FIELDS.
+    """
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    commented = Comment.objects.filter(author_id=instance.pk).values('post')
+    Post.objects.filter(
+        Q(author_id=instance.pk) | Q(pk__in=commented)
+    ).update(version=F('version') + 1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, update_fields, **kwargs):
+    """Запоминает группу поста до изменения, чтобы перенести его в сводках."""
+    if instance._state.adding:
+        return
+    if update_fields is not None and 'group' not in update_fields:
+        return
+    if '_previous_group_id' in instance.__dict__:
+        # группу уже запомнил тот, кто загрузил пост для изменения
+        return
+    instance._previous_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def update_group_summary(sender, instance, created, **kwargs):
+    """Обновляет сводки групп при публикации поста и смене его группы."""
+    if created:
+        summaries.update(instance.group_id, 1)
+        return
+    if '_previous_group_id' not in instance.__dict__:
+        return
+    previous = instance.__dict__.pop('_previous_group_id')
+    if previous != instance.group_id:
+        summaries.update(previous, -1)
+        summaries.update(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_group_summary(sender, instance, **kwargs):
+    """
+    Обновляет сводку группы при удалении поста. При удалении группы
+    посты отвязываются через SET_NULL, а сводка удаляется каскадно.
+    """
+    summaries.update(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def build_image_derivatives(sender, instance, **kwargs):
+    """Ставит в очередь построение уменьшенных копий новой картинки."""
+    if instance.__dict__.pop('_image_uploaded', False):
+        images.schedule(instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    """Обновляет счетчики и кеш графа подписок при подписке."""
+    if created:
+        follow_graph.followed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    """
+    Обновляет счетчики и кеш графа подписок при отписке,
+    в том числе при каскадном удалении вместе с пользователем.
+    """
+    follow_graph.unfollowed(instance)
+    timeline.unfollowed(instance)
@@ -0,0 +1,57 @@
+"""
+Сводки по группам: количество постов и дата последнего поста.
+
+Счетчик меняется атомарным UPDATE на разницу, дата последнего поста
+пересчитывается в том же запросе подзапросом по индексу
+post_group_pub_date_idx, поэтому обновление не зависит от размера
+группы. Изменения в обход сигналов (queryset.update()) исправляет
+команда rebuild_group_summaries.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+from .models import Group, GroupSummary, Post
+
+
+def latest_pub_date():
+    return Subquery(
+        Post.objects.filter(group_id=OuterRef('group_id'))
+        .order_by('-pub_date')
+        .values('pub_date')[:1]
+    )
+
+
+def update(group_id, delta):
+    """Меняет количество постов группы на delta."""
+    if group_id is None:
+        return
+    summary = GroupSummary.objects.filter(group_id=group_id)
+    changes = {
+        'post_count': Greatest(F('post_count') + delta, 0),
+        'last_post_at': latest_pub_date(),
+    }
+    if not summary.update(**changes) and delta > 0:
+        # сводки еще нет, группа создана в обход сигналов: пустая
+        # сводка через INSERT с пропуском конфликта, без гонки
+        # одновременных вставок
+        GroupSummary.objects.bulk_create(
+            [GroupSummary(group_id=group_id)], ignore_conflicts=True
+        )
+        summary.update(**changes)
+
+
+def rebuild(group_ids=None):
+    """Пересчитывает сводки заданных групп, по умолчанию — всех."""
+    groups = Group.objects.all()
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+    rows = groups.annotate(
+        total=Count('posts'), latest=Max('posts__pub_date')
+    ).values_list('pk', 'total', 'latest')
+    with transaction.atomic():
+        GroupSummary.objects.filter(group__in=groups).delete()
+        GroupSummary.objects.bulk_create(
+            GroupSummary(group_id=pk, post_count=total, last_post_at=latest)
+            for pk, total, latest in rows
+        )
@@ -0,0 +1,44 @@
+"""
+Ветки ответов на комментарии.
+
+Комментарий хранит материализованный путь: id всех предков и свой,
+каждый дополнен нулями до COMMENT_PATH_STEP цифр (см. Comment.save).
+Сортировка по пути дает обход дерева в глубину с ответами в порядке
+добавления, а ветка комментария — это диапазон путей
+[path, path + PATH_END), поэтому дерево поста или любая его ветка
+читаются одним упорядоченным запросом по индексу (post, path, depth).
+
+Путь содержит собственный id, поэтому задается вторым запросом после
+INSERT; перенести комментарий в другую ветку нельзя. Счетчик прямых
+ответов reply_count обновляют posts.signals и posts.bulk.
+"""
+from django.db.models import Subquery, Value
+from django.db.models.functions import Concat
+
+from .models import Comment
+
+# символ сразу после цифр: все пути ветки меньше path + PATH_END
+PATH_END = ':'
+
+
+def get_tree(post_id, root=None, depth=None):
+    """
+    Комментарии поста в порядке обхода в глубину. Если задан root —
+    только его ветка вместе с ним, depth ограничивает глубину
+    относительно root (или верхнего уровня). Путь и глубина root
+    подставляются подзапросами, так что выборка остается одним
+    запросом по диапазону индекса.
+    """
+    comments = Comment.objects.filter(post_id=post_id)
+    max_depth = depth
+    if root is not None:
+        root_row = Comment.objects.filter(pk=root, post_id=post_id).order_by()
+        path = Subquery(root_row.values('path'))
+        comments = comments.filter(
+            path__gte=path, path__lt=Concat(path, Value(PATH_END))
+        )
+        if depth is not None:
+            max_depth = Subquery(root_row.values('depth')) + Value(depth)
+    if max_depth is not None:
+        comments = comments.filter(depth__lte=max_depth)
+    return comments.order_by('path')
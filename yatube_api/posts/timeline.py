@@ -0,0 +1,132 @@
+"""
+Ленты подписок.
+
+Посты раскладываются по лентам подписчиков при публикации
+(fan-out-on-write), поэтому чтение ленты — выборка по индексу
+`timeline_user_pub_date_idx` независимо от числа подписок.
+Для авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+раскладка не делается: их посты подмешиваются при чтении
+(fan-out-on-read). Когда после отписки подписчиков снова становится
+FEED_FANOUT_LIMIT, последние посты автора раскладываются по всем
+лентам (refill): опубликованные при большем числе подписчиков иначе
+пропали бы из лент.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from . import follow_graph
+from .models import FollowSummary, Post, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def fan_out(*posts):
+    """Добавляет новые посты одного автора в ленты его подписчиков."""
+    if not posts:
+        return
+    follower_ids = follow_graph.get_follower_ids(
+        posts[0].author_id, limit=settings.FEED_FANOUT_LIMIT
+    )
+    if follower_ids is None:
+        return
+    entries = [
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for post in posts
+        for user_id in follower_ids
+    ]
+    # Django 2.2 не ограничивает явный batch_size пределом СУБД,
+    # а SQLite принимает не больше 999 параметров на запрос
+    fields = TimelineEntry._meta.concrete_fields
+    batch_size = min(
+        FANOUT_BATCH_SIZE,
+        max(connection.ops.bulk_batch_size(fields, entries), 1)
+    )
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=batch_size, ignore_conflicts=True
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту последние посты автора после подписки на него."""
+    if is_fanned_out_on_read(follow.following_id):
+        return
+    posts = (
+        Post.objects.filter(author_id=follow.following_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                          pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+
+
+def refill(author_id):
+    """Раскладывает последние посты автора по лентам всех подписчиков."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'id', 'author_id', 'pub_date'
+    ).order_by('-pub_date', '-id')[:settings.FEED_BACKFILL_SIZE]
+    fan_out(*posts)
+
+
+def unfollowed(follow):
+    """
+    Возвращает автора к раскладке при записи, если после отписки
+    у него ровно FEED_FANOUT_LIMIT подписчиков.
+    """
+    count = follow_graph.get_follower_count(follow.following_id)
+    if count and count == settings.FEED_FANOUT_LIMIT:
+        refill(follow.following_id)
+
+
+def drop(follow):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.following_id
+    ).delete()
+
+
+def is_fanned_out_on_read(author_id):
+    return follow_graph.get_follower_count(author_id) > (
+        settings.FEED_FANOUT_LIMIT
+    )
+
+
+def fanned_out_on_read_authors(user_id):
+    """Авторы из подписок пользователя, чьи посты не раскладываются."""
+    following = follow_graph.get_following_ids(user_id)
+    if not following:
+        return []
+    return FollowSummary.objects.filter(
+        user_id__in=following,
+        follower_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('user_id', flat=True)
+
+
+def feed(user_id):
+    """
+    Посты авторов, на которых подписан пользователь, с ключом
+    сортировки feed_pub_date, feed_post_id. Если все посты ленты
+    разложены при записи, ключ — копии даты и id поста из
+    TimelineEntry: отбор и сортировка идут одним проходом по индексу
+    timeline_user_pub_date_idx. С авторами, чьи посты добавляются при
+    чтении, ключ — поля самого поста.
+    """
+    authors = list(fanned_out_on_read_authors(user_id))
+    if not authors:
+        # аннотации используют то же соединение, что и фильтр
+        return Post.objects.filter(
+            timeline_entries__user_id=user_id
+        ).annotate(
+            feed_pub_date=F('timeline_entries__pub_date'),
+            feed_post_id=F('timeline_entries__post_id')
+        )
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    return Post.objects.filter(
+        Q(pk__in=entries.values('post')) | Q(author_id__in=authors)
+    ).annotate(feed_pub_date=F('pub_date'), feed_post_id=F('id'))
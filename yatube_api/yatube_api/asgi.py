@@ -3,14 +3,14 @@ ASGI config for yatube_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
-For more information on this file, see
-https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+Django 2.2 has no django.core.asgi, the application is provided
+by api.asgi and runs the regular Django views in thread pools.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube_api.settings')
 
+from api.asgi import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
@@ -18,13 +18,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'posts',
-    'api',
+    'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'djoser',
     'rest_framework_simplejwt',
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +62,73 @@ DATABASES = {
     }
 }
 
+# в продакшене используется Redis, например
+# 'BACKEND': 'django_redis.cache.RedisCache',
+# 'LOCATION': 'redis://127.0.0.1:6379/1',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# списки постов, комментариев и подписок строятся из queryset.values()
+# без полей DRF, см. api.fastpath
+API_FAST_LIST_SERIALIZATION = True
+
+# массовые операции: размер запроса и пачки в одной транзакции
+API_BULK_MAX_ITEMS = 5000
+API_BULK_CHUNK_SIZE = 500
+
+# кеш ответов API для анонимных GET запросов, см. api.cache
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60
+
+# записи пользователей для аутентификации по токену, см. api.authentication
+API_USER_CACHE_SIZE = 1024
+API_USER_CACHE_TTL = 60
+
+# ASGI: потоки для чтения постов, комментариев и групп, для остальных
+# запросов и предел запросов в очереди каждого пула, см. api.asgi
+API_ASGI_READ_THREADS = 8
+API_ASGI_THREADS = 4
+API_ASGI_MAX_PENDING = 256
+
+# профилирование доли запросов: SQL, повторы запросов, этапы обработки;
+# 0 — выключено, см. api.profiling
+API_PROFILING_SAMPLE_RATE = 0.0
+API_PROFILING_SERVER_TIMING = True
+API_PROFILING_DUPLICATE_THRESHOLD = 2
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'profiling': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['profiling'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# уменьшенные копии картинок постов: ширины, качество и потоки,
+# 0 потоков — копии строятся сразу после сохранения, см. posts.images
+POST_IMAGE_WIDTHS = (320, 640, 1280)
+POST_IMAGE_QUALITY = 80
+POST_IMAGE_WORKERS = 2
+
+# полнотекстовый поиск, см. posts.search; None — бэкенд по СУБД
+SEARCH_BACKEND = None
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -89,6 +157,15 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# загрузки пишутся во временный файл блоками, а не собираются в памяти;
+# FileSystemStorage затем переносит этот файл без копирования
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 
 REST_FRAMEWORK = {
@@ -100,6 +177,18 @@ REST_FRAMEWORK = {
     ],
 }
 
+# авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты добавляются в ленту при чтении
+FEED_FANOUT_LIMIT = 1000
+# сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_SIZE = 100
+
+# кеш множеств подписок и подписчиков, см. posts.follow_graph
+FOLLOW_GRAPH_CACHE_ALIAS = 'default'
+FOLLOW_GRAPH_CACHE_TIMEOUT = 300
+# множества больше этого не кешируются
+FOLLOW_GRAPH_CACHE_MAX_IDS = 10000
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=100),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
@@ -11,3 +13,6 @@ urlpatterns = [
         name='redoc'
     ),
 ]
+
+# картинки постов и их копии; в продакшене их отдает веб-сервер
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)